@@ -0,0 +1,117 @@
+"""
+Benchmark: turning 1M search_results rows into python objects
+
+Run from the repository root:
+    python -m benchmarks.bench_bulk_reads --rows 1000000
+
+The rows are synthetic tuples, shaped like the rows asyncpg hands to YahooSearchDAO
+- Fetching them from postgres costs the same whichever object they become,
+so it is left out; this measures only what the DAO does with each row
+- --result-bytes 0 (the default) matches stream_searches(include_result=False);
+with the html in, its string dominates bytes/row for every variant
+
+Variants
+- parse_obj: SearchResults.parse_obj on a dict per row; what fetch_all_searches did
+- validated: SearchResults(...) per row
+- model_construct: SearchResults.model_construct(...) per row, no validation
+- record: a SearchRecord (NamedTuple) per row; what the DAO's *_records methods return
+
+Reports rows/sec, and bytes/row held by the list of objects (tracemalloc)
+"""
+
+import argparse
+import time
+import tracemalloc
+import warnings
+from collections.abc import Callable
+from datetime import datetime, timedelta
+from typing import Any
+
+from src.models.search_results import SearchResults
+from src.services.yahoo_search_dao import YahooSearchDAO
+
+
+def parse_obj(row: tuple) -> Any:
+    return SearchResults.parse_obj(
+        {
+            "search_id": row[0],
+            "user_id": row[1],
+            "search_term": row[2],
+            "result": YahooSearchDAO._result_from_columns(row[3], row[4]),
+            "created_at": row[5],
+        }
+    )
+
+
+def validated(row: tuple) -> Any:
+    return SearchResults(
+        search_id=row[0],
+        user_id=row[1],
+        search_term=row[2],
+        result=YahooSearchDAO._result_from_columns(row[3], row[4]),
+        created_at=row[5],
+    )
+
+
+def model_construct(row: tuple) -> Any:
+    return SearchResults.model_construct(
+        search_id=row[0],
+        user_id=row[1],
+        search_term=row[2],
+        result=YahooSearchDAO._result_from_columns(row[3], row[4]),
+        created_at=row[5],
+    )
+
+
+def record(row: tuple) -> Any:
+    return YahooSearchDAO._search_record(row)
+
+
+def run(label: str, convert: Callable[[tuple], Any], rows: list[tuple]) -> None:
+    start: float = time.perf_counter()
+    converted: list[Any] = [convert(row) for row in rows]
+    seconds: float = time.perf_counter() - start
+    del converted
+
+    tracemalloc.start()
+    before: int = tracemalloc.get_traced_memory()[0]
+    converted = [convert(row) for row in rows]
+    held: int = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del converted
+    print(
+        f"{label:<16} {len(rows) / seconds:12.0f} rows/sec "
+        f"{held / len(rows):8.0f} bytes/row"
+    )
+
+
+def main(rows: int, result_bytes: int) -> None:
+    start: datetime = datetime(year=2024, month=1, day=1)
+    result: str | None = "x" * result_bytes if result_bytes else None
+    synthetic: list[tuple] = [
+        (
+            f"search-{i}",
+            f"user-{i % 1000}",
+            f"term {i % 5000}",
+            result,
+            None,
+            start + timedelta(seconds=i),
+        )
+        for i in range(rows)
+    ]
+    print(f"{rows} rows, result of {result_bytes} bytes")
+    with warnings.catch_warnings():
+        # parse_obj is deprecated; that's the point of the comparison
+        warnings.simplefilter("ignore")
+        run("parse_obj", parse_obj, synthetic)
+    run("validated", validated, synthetic)
+    run("model_construct", model_construct, synthetic)
+    run("record", record, synthetic)
+
+
+if __name__ == "__main__":
+    parser: argparse.ArgumentParser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--result-bytes", type=int, default=0)
+    args: argparse.Namespace = parser.parse_args()
+    main(args.rows, args.result_bytes)
@@ -0,0 +1,76 @@
+"""
+Benchmark: zlib compression of search results html, per compression level
+
+Run from the repository root, on stored results (see benchmarks/save_pages.py):
+    python -m benchmarks.save_pages --out benchmarks/stored --from-database 200
+    python -m benchmarks.bench_compression --pages benchmarks/stored
+
+Without --pages, it falls back to the unit test fixtures, padded by --pad-kb
+- SYNTHETIC: a trimmed ~14 KB page; its ratio and MB/sec say little about stored results,
+and --pad-kb filler is repetitive and compresses far better than a live page does
+
+Reports the pages' sizes (min / p50 / max), then for each level:
+- compression ratio (raw bytes / compressed bytes), and compressed KB p50
+- encode MB/sec (compress_result) and decode MB/sec (decompress_result), in raw html MB
+"""
+
+import argparse
+import statistics
+import time
+from pathlib import Path
+
+from benchmarks.bench_search_parser import describe_pages, load_pages
+from src.utils.compression import compress_result, decompress_result
+
+
+def main(pages_dir: Path | None, fixtures: Path, pad_kb: int, rounds: int) -> None:
+    if pages_dir is not None:
+        raw_pages: list[bytes] = load_pages(pages_dir, 0)
+        source: str = f"saved pages in {pages_dir}"
+    else:
+        raw_pages = load_pages(fixtures, pad_kb)
+        source = (
+            f"SYNTHETIC: {fixtures} padded by {pad_kb} KB; "
+            "pass --pages for stored results (see benchmarks/save_pages.py)"
+        )
+    if not raw_pages:
+        raise SystemExit(f"No *.html pages found in {pages_dir or fixtures}")
+    print(f"{source}\n{describe_pages(raw_pages)}, {rounds} rounds")
+    pages: list[str] = [page.decode("utf-8") for page in raw_pages]
+    raw_mb: float = sum(len(page) for page in raw_pages) / 1024 / 1024
+    for level in (1, 3, 6, 9):
+        start: float = time.perf_counter()
+        for _ in range(rounds):
+            compressed: list[bytes | None] = [
+                compress_result(page, level) for page in pages
+            ]
+        encode_seconds: float = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for blob in compressed:
+                decompress_result(blob)
+        decode_seconds: float = time.perf_counter() - start
+
+        compressed_mb: float = (
+            sum(len(blob) for blob in compressed if blob) / 1024 / 1024
+        )
+        compressed_kb: float = statistics.median(
+            len(blob) / 1024 for blob in compressed if blob
+        )
+        print(
+            f"level {level}: ratio={raw_mb / compressed_mb:6.2f}x "
+            f"p50={compressed_kb:6.1f} KB "
+            f"encode={raw_mb * rounds / encode_seconds:8.1f} MB/sec "
+            f"decode={raw_mb * rounds / decode_seconds:8.1f} MB/sec"
+        )
+
+
+if __name__ == "__main__":
+    parser: argparse.ArgumentParser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=Path, default=None)
+    parser.add_argument("--fixtures", type=Path, default=Path("unit_tests/fixtures"))
+    parser.add_argument("--pad-kb", type=int, default=0)
+    parser.add_argument("--rounds", type=int, default=200)
+    args: argparse.Namespace = parser.parse_args()
+    main(args.pages, args.fixtures, args.pad_kb, args.rounds)
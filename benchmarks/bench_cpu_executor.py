@@ -0,0 +1,78 @@
+"""
+Benchmark: event-loop lag and parse throughput, inline vs offloaded to CpuExecutor
+
+Run from the repository root:
+    python -m benchmarks.bench_cpu_executor --pages 400 --workers 4
+
+For each CpuExecutor kind (inline, thread, process), parses --pages padded
+results pages with 16 in flight, while a probe coroutine measures event-loop lag
+- The probe sleeps 1ms in a loop; lag is how late it wakes up
+- Lag is what every other in-flight /search waits, on top of its own work
+"""
+
+import argparse
+import asyncio
+import time
+from pathlib import Path
+
+from benchmarks.bench_search_parser import load_pages
+from benchmarks.latency import percentiles
+from src.services.yahoo_search_parser import parse_search_hits
+from src.utils.cpu_executor import CpuExecutor, CpuExecutorConfig
+
+
+async def probe_lag(lags: list[float], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        start: float = time.perf_counter()
+        await asyncio.sleep(0.001)
+        lags.append((time.perf_counter() - start - 0.001) * 1000)
+
+
+async def run(kind: str, pages: list[bytes], count: int, workers: int) -> None:
+    executor: CpuExecutor = CpuExecutor(
+        CpuExecutorConfig(kind=kind, max_workers=workers)  # type: ignore[arg-type]
+    )
+    executor.start()
+    # warm the pool up, so worker start-up isn't measured
+    await asyncio.gather(
+        *(executor.run(parse_search_hits, pages[0]) for _ in range(workers))
+    )
+
+    lags: list[float] = []
+    stop: asyncio.Event = asyncio.Event()
+    probe: asyncio.Task[None] = asyncio.create_task(probe_lag(lags, stop))
+    semaphore: asyncio.Semaphore = asyncio.Semaphore(16)
+
+    async def parse(page: bytes) -> None:
+        async with semaphore:
+            await executor.run(parse_search_hits, page)
+
+    start: float = time.perf_counter()
+    await asyncio.gather(*(parse(pages[i % len(pages)]) for i in range(count)))
+    seconds: float = time.perf_counter() - start
+    stop.set()
+    await probe
+    await executor.close()
+
+    p50, p99 = percentiles(lags)
+    print(
+        f"{kind:<8} pages/sec={count / seconds:8.1f} "
+        f"loop lag p50={p50:7.2f}ms p99={p99:7.2f}ms "
+        f"max={max(lags):7.2f}ms"
+    )
+
+
+async def main(fixtures: Path, pad_kb: int, count: int, workers: int) -> None:
+    pages: list[bytes] = load_pages(fixtures, pad_kb)
+    for kind in ("inline", "thread", "process"):
+        await run(kind, pages, count, workers)
+
+
+if __name__ == "__main__":
+    parser: argparse.ArgumentParser = argparse.ArgumentParser()
+    parser.add_argument("--fixtures", type=Path, default=Path("unit_tests/fixtures"))
+    parser.add_argument("--pad-kb", type=int, default=400)
+    parser.add_argument("--pages", type=int, default=400)
+    parser.add_argument("--workers", type=int, default=4)
+    args: argparse.Namespace = parser.parse_args()
+    asyncio.run(main(args.fixtures, args.pad_kb, args.pages, args.workers))
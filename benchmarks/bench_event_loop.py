@@ -0,0 +1,90 @@
+"""
+Benchmark: /search on asyncio's default event loop vs uvloop
+
+Run from the repository root:
+    python -m benchmarks.bench_event_loop --requests 4000 --concurrency 64
+
+The same setup as bench_workers, with one server worker, run once per loop kind
+- The stub upstream and the load generators stay on asyncio's default loop;
+only the server under test changes
+- uvloop is optional; without it, only the asyncio row is printed
+"""
+
+import argparse
+import asyncio
+from typing import Any
+
+import toml
+
+from benchmarks.bench_workers import load, start_server, stop_server
+from benchmarks.stub_upstream import StubUpstream, format_result
+from src.main import create_app
+from src.server import PreforkServer, ServerConfig
+from src.utils.event_loop import EventLoopConfig, new_event_loop, uvloop
+
+
+def main(
+    config: dict[str, Any],
+    requests: int,
+    concurrency: int,
+    clients: int,
+    html_size_bytes: int,
+    upstream_delay_ms: float,
+) -> None:
+    upstream: StubUpstream = StubUpstream(
+        html_size_bytes=html_size_bytes, delay_seconds=upstream_delay_ms / 1000
+    )
+    upstream_master, upstream_port = start_server(
+        PreforkServer(
+            ServerConfig(host="127.0.0.1", port=0, workers=2),
+            lambda index: upstream.create_app(),
+            asyncio.new_event_loop,
+        )
+    )
+    config["http_client"] = {
+        **config.get("http_client", {}),
+        "base_url": f"http://127.0.0.1:{upstream_port}/search",
+    }
+    config["search_cache"] = {**config.get("search_cache", {}), "enabled": False}
+    config["analytics"] = {**config.get("analytics", {}), "enabled": False}
+    config["cpu_executor"] = {"kind": "inline"}
+    kinds: list[str] = ["asyncio", "uvloop"] if uvloop is not None else ["asyncio"]
+    try:
+        for kind in kinds:
+            event_loop_config: EventLoopConfig = EventLoopConfig(kind=kind)  # type: ignore[arg-type]
+            master, port = start_server(
+                PreforkServer(
+                    ServerConfig(host="127.0.0.1", port=0, workers=1),
+                    lambda index: create_app(config, worker_index=index),
+                    lambda: new_event_loop(event_loop_config),
+                )
+            )
+            try:
+                load(port, min(requests, 200), concurrency, clients)
+                result: dict[str, float] = load(port, requests, concurrency, clients)
+            finally:
+                stop_server(master)
+            print(format_result(kind, result))
+    finally:
+        stop_server(upstream_master)
+    if uvloop is None:
+        print("uvloop is not installed; poetry install -E uvloop to compare")
+
+
+if __name__ == "__main__":
+    parser: argparse.ArgumentParser = argparse.ArgumentParser()
+    parser.add_argument("--config", default="local_config/config.toml")
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--clients", type=int, default=2)
+    parser.add_argument("--html-size-bytes", type=int, default=100_000)
+    parser.add_argument("--upstream-delay-ms", type=float, default=0.0)
+    args: argparse.Namespace = parser.parse_args()
+    main(
+        toml.load(args.config),
+        args.requests,
+        args.concurrency,
+        args.clients,
+        args.html_size_bytes,
+        args.upstream_delay_ms,
+    )
@@ -0,0 +1,69 @@
+"""
+Benchmark: one ClientSession per search vs a shared, pooled ClientSession
+
+Run from the repository root:
+    python -m benchmarks.bench_http_session --requests 2000 --concurrency 50
+
+Both variants fetch the same page from a local StubUpstream
+- before: the original YahooSearchService._search, a new ClientSession per call
+- after: YahooSearchService._fetch with the shared session from start()
+(_fetch, not _search, so concurrent identical searches aren't coalesced into one)
+
+The stub serves plain http, so the gap seen here is TCP connect + session setup only
+- Against Yahoo, every new session also pays DNS resolution and a TLS handshake
+"""
+
+import argparse
+import asyncio
+
+import aiohttp
+import toml
+
+from benchmarks.stub_upstream import StubUpstream, format_result, measure
+from src.services.yahoo_search_dao import YahooSearchDAO
+from src.services.yahoo_search_service import YahooSearchService
+from src.utils.http_client import HttpClientConfig
+
+
+async def main(requests: int, concurrency: int, html_size_bytes: int) -> None:
+    upstream: StubUpstream = StubUpstream(html_size_bytes=html_size_bytes)
+    await upstream.start()
+    url: str = YahooSearchService.create_url("coffee", upstream.base_url)
+
+    async def session_per_search() -> str:
+        async with aiohttp.ClientSession() as client:
+            async with client.get(url, ssl=False) as response:
+                return await response.text()
+
+    # _fetch never touches the database; the DAO's engine never connects
+    service: YahooSearchService = YahooSearchService(
+        yahoo_search_dao=YahooSearchDAO(
+            toml.load("local_config/config.toml")["database"]
+        ),
+        http_client_config=HttpClientConfig(base_url=upstream.base_url),
+    )
+    await service.start()
+
+    async def shared_session() -> object:
+        return await service._fetch("coffee")
+
+    try:
+        before: dict[str, float] = await measure(
+            session_per_search, requests, concurrency
+        )
+        after: dict[str, float] = await measure(shared_session, requests, concurrency)
+    finally:
+        await service.close()
+        await upstream.close()
+
+    print(format_result("before: session per search", before))
+    print(format_result("after: shared pooled session", after))
+
+
+if __name__ == "__main__":
+    parser: argparse.ArgumentParser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--html-size-bytes", type=int, default=300_000)
+    args: argparse.Namespace = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency, args.html_size_bytes))
@@ -0,0 +1,102 @@
+"""
+Benchmark: serializing a /search response with a large html payload
+
+Run from the repository root:
+    python -m benchmarks.bench_json_response --pad-kb 500
+
+Serializes a SearchResults per *.html page in --fixtures, padded by --pad-kb
+- before: model_dump(), strftime created_at, web.json_response (json.dumps, then encode)
+- after: src.utils.json_response.json_response (pydantic_core.to_json, straight to bytes)
+- orjson: model_dump() + orjson.dumps, for comparison; only if orjson is installed
+
+Reports time per response, and the peak memory allocated while building one (tracemalloc)
+"""
+
+import argparse
+import time
+import tracemalloc
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from aiohttp import web
+
+from benchmarks.bench_search_parser import load_pages
+from src.models.api_datetime import API_DATETIME_FORMAT
+from src.models.search_results import SearchResults
+from src.utils.json_response import json_response
+
+try:
+    import orjson
+except ImportError:  # optional; poetry install -E orjson
+    orjson = None  # type: ignore[assignment]
+
+
+def before(result: SearchResults) -> web.Response:
+    final_result: dict[str, Any] = result.model_dump()
+    final_result["created_at"] = final_result["created_at"].strftime(
+        API_DATETIME_FORMAT
+    )
+    return web.json_response(data=final_result)
+
+
+def after(result: SearchResults) -> web.Response:
+    return json_response(result)
+
+
+def with_orjson(result: SearchResults) -> web.Response:
+    final_result: dict[str, Any] = result.model_dump()
+    final_result["created_at"] = final_result["created_at"].strftime(
+        API_DATETIME_FORMAT
+    )
+    return web.Response(
+        body=orjson.dumps(final_result), content_type="application/json"
+    )
+
+
+def run(
+    label: str,
+    serialize: Callable[[SearchResults], web.Response],
+    results: list[SearchResults],
+    rounds: int,
+) -> None:
+    start: float = time.perf_counter()
+    for _ in range(rounds):
+        for result in results:
+            serialize(result)
+    seconds: float = time.perf_counter() - start
+
+    peaks: list[int] = []
+    for result in results:
+        tracemalloc.start()
+        serialize(result)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    print(
+        f"{label:<8} {seconds * 1000 / (rounds * len(results)):8.3f} ms/response "
+        f"peak={max(peaks) / 1024:8.0f} KB"
+    )
+
+
+def main(fixtures: Path, pad_kb: int, rounds: int) -> None:
+    results: list[SearchResults] = [
+        SearchResults.create("dummy_user_id", "tea", page.decode("utf-8"))
+        for page in load_pages(fixtures, pad_kb)
+    ]
+    if not results:
+        raise SystemExit(f"No *.html fixtures found in {fixtures}")
+    size_kb: float = sum(len(r.result or "") for r in results) / len(results) / 1024
+    print(f"{len(results)} results, {size_kb:.0f} KB of html on average")
+    run("before", before, results, rounds)
+    run("after", after, results, rounds)
+    if orjson is not None:
+        run("orjson", with_orjson, results, rounds)
+
+
+if __name__ == "__main__":
+    parser: argparse.ArgumentParser = argparse.ArgumentParser()
+    parser.add_argument("--fixtures", type=Path, default=Path("unit_tests/fixtures"))
+    parser.add_argument("--pad-kb", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=200)
+    args: argparse.Namespace = parser.parse_args()
+    main(args.fixtures, args.pad_kb, args.rounds)
@@ -0,0 +1,114 @@
+"""
+Benchmark: event-loop lag with heavy logging, handlers on the loop vs queued
+
+Run from the repository root:
+    python -m benchmarks.bench_logging --records 50000 --tasks 50
+
+--tasks coroutines log --records records in total, one per search-like step,
+while a probe coroutine measures event-loop lag (see bench_cpu_executor)
+- before: the original setup_logging; a FileHandler on the logger, and
+eager f-string messages; formatting and the write run on the event loop
+- after: setup_logging's QueueHandler, %-style arguments; formatting and the
+write run on the listener's thread
+
+--slow-sink-ms emulates a slow log destination (e.g a full pipe,
+a network filesystem) by sleeping in the handler, per record
+"""
+
+import argparse
+import asyncio
+import logging
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.bench_cpu_executor import probe_lag
+from benchmarks.latency import percentiles
+from src.utils import logging_utils
+from src.utils.logging_utils import (
+    LoggingConfig,
+    configure_logging,
+    setup_logging,
+    stop_logging,
+)
+
+
+class SlowFileHandler(logging.FileHandler):
+    def __init__(self, path: str, delay_seconds: float) -> None:
+        super().__init__(path)
+        self.__delay_seconds: float = delay_seconds
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if self.__delay_seconds:
+            time.sleep(self.__delay_seconds)
+        super().emit(record)
+
+
+async def run(
+    label: str, logger: logging.Logger, records: int, tasks: int, eager: bool
+) -> None:
+    lags: list[float] = []
+    stop: asyncio.Event = asyncio.Event()
+    probe: asyncio.Task[None] = asyncio.create_task(probe_lag(lags, stop))
+
+    async def search(task: int) -> None:
+        for i in range(records // tasks):
+            term: str = f"term {task}-{i}"
+            if eager:
+                logger.info(f"Started google_search for {term}")
+            else:
+                logger.info("Started google_search for %s", term)
+            await asyncio.sleep(0)
+
+    start: float = time.perf_counter()
+    await asyncio.gather(*(search(task) for task in range(tasks)))
+    seconds: float = time.perf_counter() - start
+    stop.set()
+    await probe
+    p50, p99 = percentiles(lags)
+    print(
+        f"{label:<8} records/sec={records / seconds:10.1f} "
+        f"loop lag p50={p50:7.2f}ms p99={p99:7.2f}ms "
+        f"max={max(lags):7.2f}ms"
+    )
+
+
+def main(records: int, tasks: int, slow_sink_ms: float) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        before_path: str = str(Path(directory) / "before.logs")
+        before: logging.Logger = logging.Logger("bench_logging_before")
+        before.setLevel(logging.INFO)
+        handler: logging.Handler = SlowFileHandler(before_path, slow_sink_ms / 1000)
+        handler.setFormatter(
+            logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+        )
+        before.addHandler(handler)
+        asyncio.run(run("before", before, records, tasks, eager=True))
+        handler.close()
+
+        after_path: str = str(Path(directory) / "after.logs")
+        configure_logging(LoggingConfig(log_to_file=True, file_path=after_path))
+        after: logging.Logger = logging.getLogger("bench_logging_after")
+        setup_logging(after)
+        # the same slow handler, behind the queue; so off the event loop
+        slow_handler: logging.Handler = SlowFileHandler(after_path, slow_sink_ms / 1000)
+        slow_handler.setFormatter(handler.formatter)
+        assert logging_utils._listener is not None
+        logging_utils._listener.handlers = (slow_handler,)
+        began: float = time.perf_counter()
+        asyncio.run(run("after", after, records, tasks, eager=False))
+        stop_logging()
+        drained: float = time.perf_counter() - began
+        print(
+            f"after: every record written {drained:.2f}s after the first was logged "
+            f"(dropped: {logging_utils.logging_stats.dropped})"
+        )
+
+
+if __name__ == "__main__":
+    parser: argparse.ArgumentParser = argparse.ArgumentParser()
+    parser.add_argument("--records", type=int, default=50_000)
+    parser.add_argument("--tasks", type=int, default=50)
+    parser.add_argument("--slow-sink-ms", type=float, default=0.0)
+    args: argparse.Namespace = parser.parse_args()
+    main(args.records, args.tasks, args.slow_sink_ms)
@@ -0,0 +1,137 @@
+"""
+Benchmark: the cost of metrics_middleware and the stage timers, per request
+
+Run from the repository root:
+    python -m benchmarks.bench_metrics --requests 5000 --concurrency 20
+
+1) Per call, in-process: the middleware around a handler that does nothing,
+a stage timer (with STAGE_SECONDS.labels(...).time()) and a counter increment
+- before: the bare handler call
+2) End to end: GET /hello_world over HTTP, on an app with and without the middleware
+- Rounds alternate between the two, to spread noise (e.g CPU frequency) evenly
+- And a scrape of /metrics, with every route and stage observed
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from collections.abc import Awaitable, Callable
+
+import aiohttp
+from aiohttp import web
+from aiohttp.test_utils import TestServer, make_mocked_request
+
+from src.utils.metrics import (
+    STAGE_SECONDS,
+    UPSTREAM_RESPONSES,
+    metrics_middleware,
+    registry,
+    render_metrics,
+)
+
+
+async def hello_world_handle(request: web.Request) -> web.Response:
+    return web.Response(text="Hello World")
+
+
+async def time_per_call(
+    label: str, call: Callable[[], Awaitable[object]], calls: int
+) -> float:
+    start: float = time.perf_counter()
+    for _ in range(calls):
+        await call()
+    per_call_us: float = (time.perf_counter() - start) / calls * 1e6
+    print(f"{label:<28} {per_call_us:8.3f}us per call")
+    return per_call_us
+
+
+async def in_process(calls: int) -> None:
+    app: web.Application = web.Application()
+    app.router.add_get("/hello_world", hello_world_handle)
+    request: web.Request = make_mocked_request("GET", "/hello_world", app=app)
+    # resolve the route once, as aiohttp does before the middlewares run
+    request._match_info = await app.router.resolve(request)
+
+    async def bare() -> object:
+        return await hello_world_handle(request)
+
+    async def middleware() -> object:
+        return await metrics_middleware(request, hello_world_handle)
+
+    async def timer_and_counter() -> object:
+        with STAGE_SECONDS.labels("upstream_fetch").time():
+            UPSTREAM_RESPONSES.labels("200").inc()
+        return None
+
+    before: float = await time_per_call("before (bare handler)", bare, calls)
+    after: float = await time_per_call("after (metrics_middleware)", middleware, calls)
+    print(f"{'middleware overhead':<28} {after - before:8.3f}us per request")
+    await time_per_call("stage timer + counter", timer_and_counter, calls)
+
+
+async def http_round(
+    session: aiohttp.ClientSession, url: str, requests: int, concurrency: int
+) -> float:
+    async def worker(count: int) -> None:
+        for _ in range(count):
+            async with session.get(url) as response:
+                await response.read()
+
+    start: float = time.perf_counter()
+    await asyncio.gather(*(worker(requests // concurrency) for _ in range(concurrency)))
+    return requests / (time.perf_counter() - start)
+
+
+async def over_http(requests: int, concurrency: int, rounds: int) -> None:
+    servers: dict[str, TestServer] = {}
+    for label, middlewares in (("before", []), ("after", [metrics_middleware])):
+        app: web.Application = web.Application(middlewares=middlewares)
+        app.router.add_get("/hello_world", hello_world_handle)
+        servers[label] = TestServer(app)
+        await servers[label].start_server()
+    throughput: dict[str, list[float]] = {label: [] for label in servers}
+    async with aiohttp.ClientSession() as session:
+        for _ in range(rounds):
+            for label, server in servers.items():
+                throughput[label].append(
+                    await http_round(
+                        session,
+                        str(server.make_url("/hello_world")),
+                        requests,
+                        concurrency,
+                    )
+                )
+    for server in servers.values():
+        await server.close()
+    medians: dict[str, float] = {
+        label: statistics.median(values) for label, values in throughput.items()
+    }
+    for label, median in medians.items():
+        print(
+            f"{label:<8} requests/sec={median:10.1f} "
+            f"({1e6 / median:7.1f}us per request, median of {rounds} rounds)"
+        )
+    print(f"after / before throughput: {medians['after'] / medians['before']:.3f}")
+
+    start: float = time.perf_counter()
+    text: str = render_metrics(registry.collect())
+    print(
+        f"/metrics render: {(time.perf_counter() - start) * 1000:.2f}ms "
+        f"for {len(text.splitlines())} lines"
+    )
+
+
+def main(requests: int, concurrency: int, rounds: int, calls: int) -> None:
+    asyncio.run(in_process(calls))
+    asyncio.run(over_http(requests, concurrency, rounds))
+
+
+if __name__ == "__main__":
+    parser: argparse.ArgumentParser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--calls", type=int, default=200_000)
+    args: argparse.Namespace = parser.parse_args()
+    main(args.requests, args.concurrency, args.rounds, args.calls)
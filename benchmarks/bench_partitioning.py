@@ -0,0 +1,242 @@
+"""
+Benchmark: search_results as one heap table vs range-partitioned by day
+
+Needs a scratch postgres database, e.g the integration test one
+Run from the repository root:
+    python -m benchmarks.bench_partitioning --config integration_tests/config.toml --rows 10000000
+
+Seeds two tables with the same --rows synthetic searches, spread over --days
+- bench_search_results_heap: one table, with the indexes of search_results
+- bench_search_results_partitioned: the same, partitioned by created_at, one partition a day
+
+Then, against each table, reports
+- insert rate: rows/sec of --inserts rows, in multi-row batches like SearchResultsWriter
+- cache-window lookup: p50 / p99 latency of YahooSearchDAO's fetch_recent_search query
+for a random term, over the last hour
+
+Both tables are dropped at the end, unless --keep
+- 10M rows with --result-bytes 512 take ~6 GB, and a long while to seed
+- Results depend on shared_buffers / RAM; the heap gets slower once its
+indexes no longer fit in memory, which partitioning is meant to delay
+"""
+
+import argparse
+import asyncio
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any
+
+import toml
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from benchmarks.stub_upstream import format_result, measure
+from src.services.yahoo_search_dao import YahooSearchDAO
+from src.utils.construct_connection_string import (
+    construct_sqlalchemy_url_from_db_config,
+)
+
+HEAP: str = "bench_search_results_heap"
+PARTITIONED: str = "bench_search_results_partitioned"
+COLUMNS: str = (
+    "search_id VARCHAR NOT NULL, user_id VARCHAR NOT NULL, "
+    "search_term VARCHAR NOT NULL, result VARCHAR, result_compressed BYTEA, "
+    "created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL"
+)
+INDEXES: list[str] = [
+    "(search_term, created_at DESC)",
+    "(user_id, created_at)",
+    "(created_at, search_id)",
+    "USING brin (created_at)",
+]
+
+
+async def create_tables(engine: AsyncEngine, start: datetime, days: int) -> None:
+    async with engine.begin() as connection:
+        await connection.execute(text(f"DROP TABLE IF EXISTS {HEAP}, {PARTITIONED}"))
+        await connection.execute(
+            text(f"CREATE TABLE {HEAP} ({COLUMNS}, PRIMARY KEY (search_id))")
+        )
+        await connection.execute(
+            text(
+                f"CREATE TABLE {PARTITIONED} ({COLUMNS}, "
+                "PRIMARY KEY (search_id, created_at)) PARTITION BY RANGE (created_at)"
+            )
+        )
+        # one extra day, for the rows inserted by the insert rate benchmark
+        for day in range(days + 1):
+            partition_start: datetime = start + timedelta(days=day)
+            partition_end: datetime = partition_start + timedelta(days=1)
+            await connection.execute(
+                text(
+                    f"CREATE TABLE {PARTITIONED}_p{partition_start:%Y%m%d} "
+                    f"PARTITION OF {PARTITIONED} FOR VALUES "
+                    f"FROM ('{partition_start.isoformat(sep=' ')}') "
+                    f"TO ('{partition_end.isoformat(sep=' ')}')"
+                )
+            )
+
+
+async def seed(
+    engine: AsyncEngine,
+    table: str,
+    rows: int,
+    terms: int,
+    start: datetime,
+    days: int,
+    result_bytes: int,
+) -> float:
+    """
+    Rows are generated by postgres, 1M per statement, in created_at order;
+    indexes are built afterwards, like a table that grew over time would have them
+    :return: seconds taken
+    """
+    seconds_per_row: float = days * 86400 / rows
+    began: float = time.perf_counter()
+    for chunk_start in range(0, rows, 1_000_000):
+        async with engine.begin() as connection:
+            await connection.execute(
+                text(
+                    f"INSERT INTO {table} "
+                    "(search_id, user_id, search_term, result, created_at) "
+                    "SELECT 'search-' || g, 'user-' || (g % 1000), "
+                    "'term ' || abs(hashint4(CAST(g AS int)) % :terms), "
+                    "repeat('x', :result_bytes), "
+                    "CAST(:start AS timestamp) "
+                    "+ g * CAST(:seconds_per_row AS float8) * interval '1 second' "
+                    "FROM generate_series(:first, :last) AS g"
+                ),
+                {
+                    "terms": terms,
+                    "result_bytes": result_bytes,
+                    "start": start,
+                    "seconds_per_row": seconds_per_row,
+                    "first": chunk_start,
+                    "last": min(chunk_start + 1_000_000, rows) - 1,
+                },
+            )
+    async with engine.begin() as connection:
+        for i, columns in enumerate(INDEXES):
+            await connection.execute(
+                text(f"CREATE INDEX {table}_ix_{i} ON {table} {columns}")
+            )
+    async with engine.connect() as connection:
+        autocommit = await connection.execution_options(isolation_level="AUTOCOMMIT")
+        await autocommit.execute(text(f"VACUUM ANALYZE {table}"))
+    return time.perf_counter() - began
+
+
+async def insert_rate(
+    engine: AsyncEngine, table: str, inserts: int, batch_size: int, now: datetime
+) -> float:
+    """
+    :return: rows inserted per second
+    """
+    insert_clause = text(
+        YahooSearchDAO._insert_search_clause().text.replace("search_results", table, 1)
+    )
+    began: float = time.perf_counter()
+    for batch_start in range(0, inserts, batch_size):
+        async with engine.begin() as connection:
+            await connection.execute(
+                insert_clause,
+                [
+                    {
+                        "search_id": str(uuid.uuid4()),
+                        "user_id": "user-1",
+                        "search_term": f"term {random.randrange(1000)}",
+                        "result": "x" * 512,
+                        "result_compressed": None,
+                        "created_at": now + timedelta(milliseconds=batch_start + i),
+                    }
+                    for i in range(min(batch_size, inserts - batch_start))
+                ],
+            )
+    return inserts / (time.perf_counter() - began)
+
+
+async def main(
+    db_config: dict[str, Any],
+    rows: int,
+    terms: int,
+    days: int,
+    result_bytes: int,
+    inserts: int,
+    batch_size: int,
+    lookups: int,
+    concurrency: int,
+    keep: bool,
+) -> None:
+    engine: AsyncEngine = create_async_engine(
+        construct_sqlalchemy_url_from_db_config(db_config, use_async_pg=True),
+        pool_size=concurrency,
+    )
+    start: datetime = datetime(year=2024, month=1, day=1)
+    end: datetime = start + timedelta(days=days)
+    await create_tables(engine, start, days)
+    lookup_text: str = YahooSearchDAO._fetch_recent_search_clause().text
+    try:
+        for table in (HEAP, PARTITIONED):
+            seconds: float = await seed(
+                engine, table, rows, terms, start, days, result_bytes
+            )
+            print(f"{table}: seeded {rows} rows in {seconds:.0f}s")
+
+            lookup_clause = text(lookup_text.replace("search_results", table, 1))
+
+            async def lookup() -> None:
+                async with engine.connect() as connection:
+                    await connection.execute(
+                        lookup_clause,
+                        {
+                            "search_term": f"term {random.randrange(terms)}",
+                            "since": end - timedelta(hours=1),
+                        },
+                    )
+
+            print(
+                format_result(
+                    f"{table} lookup",
+                    await measure(lookup, lookups, concurrency),
+                )
+            )
+            rows_per_second: float = await insert_rate(
+                engine, table, inserts, batch_size, end
+            )
+            print(f"{table} insert: {rows_per_second:.0f} rows/sec")
+    finally:
+        if not keep:
+            async with engine.begin() as connection:
+                await connection.execute(text(f"DROP TABLE {HEAP}, {PARTITIONED}"))
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser: argparse.ArgumentParser = argparse.ArgumentParser()
+    parser.add_argument("--config", default="local_config/config.toml")
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--terms", type=int, default=100_000)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--result-bytes", type=int, default=512)
+    parser.add_argument("--inserts", type=int, default=20_000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--keep", action="store_true")
+    args: argparse.Namespace = parser.parse_args()
+    asyncio.run(
+        main(
+            toml.load(args.config)["database"],
+            args.rows,
+            args.terms,
+            args.days,
+            args.result_bytes,
+            args.inserts,
+            args.batch_size,
+            args.lookups,
+            args.concurrency,
+            args.keep,
+        )
+    )
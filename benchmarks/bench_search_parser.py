@@ -0,0 +1,110 @@
+"""
+Benchmark: YahooSearchParser over saved search results pages
+
+Run from the repository root, on real pages (see benchmarks/save_pages.py):
+    python -m benchmarks.bench_search_parser --pages benchmarks/pages
+
+Every *.html file in --pages is parsed, as saved
+
+Without --pages, it falls back to the unit test fixtures, padded by --pad-kb
+- SYNTHETIC: a trimmed page with script + markup filler inserted into the <head>,
+so each page is the size of a live Yahoo page (300 - 800 KB);
+but not its markup, so only a rough idea of the parser's cost on a live page
+
+Reports the pages' sizes (min / p50 / max) and hits per page, then,
+for the block-sliced parser and for a full-page HTMLParser pass:
+- pages/sec and MB/sec
+- peak memory allocated while parsing one page (tracemalloc)
+"""
+
+import argparse
+import statistics
+import time
+import tracemalloc
+from collections.abc import Callable
+from html.parser import HTMLParser
+from pathlib import Path
+
+from src.services.yahoo_search_parser import YahooSearchParser
+
+
+def load_pages(fixtures: Path, pad_kb: int) -> list[bytes]:
+    # half inline script, half page chrome markup, like a live page
+    script: bytes = b"<script>" + b"var x=1;" * (pad_kb * 64) + b"</script>"
+    markup: bytes = b'<div class="nav"><a href="#">link</a></div>' * (pad_kb * 12)
+    filler: bytes = script + markup
+    return [
+        path.read_bytes().replace(b"</head>", filler + b"</head>", 1)
+        for path in sorted(fixtures.glob("*.html"))
+    ]
+
+
+def full_page_parse(html: bytes) -> None:
+    """
+    Baseline: tokenize the whole page, as a naive HTMLParser / soup approach would
+    """
+    parser: HTMLParser = HTMLParser()
+    parser.feed(html.decode("utf-8", errors="replace"))
+    parser.close()
+
+
+def run(
+    label: str, parse: Callable[[bytes], object], pages: list[bytes], rounds: int
+) -> None:
+    start: float = time.perf_counter()
+    for _ in range(rounds):
+        for page in pages:
+            parse(page)
+    seconds: float = time.perf_counter() - start
+    parsed: int = rounds * len(pages)
+    total_mb: float = rounds * sum(len(page) for page in pages) / 1024 / 1024
+
+    peaks: list[int] = []
+    for page in pages:
+        tracemalloc.start()
+        parse(page)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    print(
+        f"{label:<24} pages/sec={parsed / seconds:10.1f} "
+        f"MB/sec={total_mb / seconds:8.1f} "
+        f"peak KB/page={max(peaks) / 1024:8.1f}"
+    )
+
+
+def describe_pages(pages: list[bytes]) -> str:
+    sizes: list[float] = sorted(len(page) / 1024 for page in pages)
+    return (
+        f"{len(pages)} pages, KB min={sizes[0]:.0f} "
+        f"p50={statistics.median(sizes):.0f} max={sizes[-1]:.0f}"
+    )
+
+
+def main(pages_dir: Path | None, fixtures: Path, pad_kb: int, rounds: int) -> None:
+    if pages_dir is not None:
+        pages: list[bytes] = load_pages(pages_dir, 0)
+        source: str = f"saved pages in {pages_dir}"
+    else:
+        pages = load_pages(fixtures, pad_kb)
+        source = (
+            f"SYNTHETIC: {fixtures} padded by {pad_kb} KB; "
+            "pass --pages for real ones (see benchmarks/save_pages.py)"
+        )
+    if not pages:
+        raise SystemExit(f"No *.html pages found in {pages_dir or fixtures}")
+    print(f"{source}\n{describe_pages(pages)}, {rounds} rounds")
+    # a page the parser finds no hits in is a change in Yahoo's markup, not a fast parse
+    hits: list[int] = [len(YahooSearchParser.parse(page)) for page in pages]
+    print(f"hits/page min={min(hits)} mean={statistics.mean(hits):.1f}")
+    run("YahooSearchParser.parse", YahooSearchParser.parse, pages, rounds)
+    run("full-page HTMLParser", full_page_parse, pages, rounds)
+
+
+if __name__ == "__main__":
+    parser: argparse.ArgumentParser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=Path, default=None)
+    parser.add_argument("--fixtures", type=Path, default=Path("unit_tests/fixtures"))
+    parser.add_argument("--pad-kb", type=int, default=400)
+    parser.add_argument("--rounds", type=int, default=50)
+    args: argparse.Namespace = parser.parse_args()
+    main(args.pages, args.fixtures, args.pad_kb, args.rounds)
@@ -0,0 +1,137 @@
+"""
+Benchmark: searches against a throttling upstream, with and without UpstreamLimiter
+
+Run from the repository root:
+    python -m benchmarks.bench_upstream_limiter --searches 600 --concurrency 100
+
+A local StubUpstream accepts --upstream-rate requests per second,
+and answers a 429 above that (as Yahoo throttles us)
+- before: no limiter; every search calls the stub at once
+- fixed: a token bucket at --upstream-rate, known in advance
+- adaptive: AIMD, starting at --limiter-rate, above what the stub accepts;
+it has to find the stub's rate from the 429s
+
+Each search is one YahooSearchService._fetch (a distinct term, no coalescing)
+Reports the searches that got their html (200) per second of wall time,
+and how many came back empty because of a 429
+"""
+
+import argparse
+import asyncio
+import time
+
+import toml
+
+from benchmarks.stub_upstream import StubUpstream
+from src.services.yahoo_search_dao import YahooSearchDAO
+from src.services.yahoo_search_service import YahooSearchService
+from src.utils.http_client import HttpClientConfig
+from src.utils.logging_utils import LoggingConfig, configure_logging
+from src.utils.upstream_limiter import UpstreamLimiter, UpstreamLimiterConfig
+
+
+async def run(
+    label: str,
+    limiter: UpstreamLimiter | None,
+    searches: int,
+    concurrency: int,
+    upstream_rate: float,
+    delay_seconds: float,
+) -> None:
+    upstream: StubUpstream = StubUpstream(
+        html_size_bytes=10_000,
+        delay_seconds=delay_seconds,
+        rate_limit_per_second=upstream_rate,
+    )
+    await upstream.start()
+    # _fetch never touches the database; the DAO's engine never connects
+    dao: YahooSearchDAO = YahooSearchDAO(
+        toml.load("local_config/config.toml")["database"]
+    )
+    service: YahooSearchService = YahooSearchService(
+        yahoo_search_dao=dao,
+        http_client_config=HttpClientConfig(base_url=upstream.base_url),
+        upstream_limiter=limiter,
+    )
+    await service.start()
+    semaphore: asyncio.Semaphore = asyncio.Semaphore(concurrency)
+    found: int = 0
+
+    async def search(index: int) -> None:
+        nonlocal found
+        async with semaphore:
+            if await service._fetch(f"term {index}") is not None:
+                found += 1
+
+    start: float = time.perf_counter()
+    try:
+        await asyncio.gather(*(search(index) for index in range(searches)))
+    finally:
+        await service.close()
+        await upstream.close()
+        await dao.close()
+    seconds: float = time.perf_counter() - start
+    rate: str = (
+        f" rate now={limiter.stats.rate_per_second:5.1f}/s"
+        if limiter is not None
+        else ""
+    )
+    print(
+        f"{label:<9} found={found:5d}/{searches} throttled={upstream.throttled:5d} "
+        f"found/sec={found / seconds:7.1f} wall={seconds:6.2f}s{rate}"
+    )
+
+
+def main(
+    searches: int,
+    concurrency: int,
+    upstream_rate: float,
+    limiter_rate: float,
+    delay_seconds: float,
+) -> None:
+    # every 429 logs an error; keep them out of the results
+    configure_logging(LoggingConfig(level="CRITICAL"))
+    asyncio.run(
+        run("before", None, searches, concurrency, upstream_rate, delay_seconds)
+    )
+    fixed: UpstreamLimiter = UpstreamLimiter(
+        UpstreamLimiterConfig(
+            rate_per_second=upstream_rate,
+            burst=1,
+            adaptive=False,
+            max_queue_wait_seconds=None,
+        )
+    )
+    asyncio.run(
+        run("fixed", fixed, searches, concurrency, upstream_rate, delay_seconds)
+    )
+    adaptive: UpstreamLimiter = UpstreamLimiter(
+        UpstreamLimiterConfig(
+            rate_per_second=limiter_rate,
+            burst=1,
+            max_queue_wait_seconds=None,
+            cooldown_seconds=0.5,
+            increase_interval_seconds=0.5,
+            additive_increase=limiter_rate / 20,
+        )
+    )
+    asyncio.run(
+        run("adaptive", adaptive, searches, concurrency, upstream_rate, delay_seconds)
+    )
+
+
+if __name__ == "__main__":
+    parser: argparse.ArgumentParser = argparse.ArgumentParser()
+    parser.add_argument("--searches", type=int, default=600)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--upstream-rate", type=float, default=100.0)
+    parser.add_argument("--limiter-rate", type=float, default=400.0)
+    parser.add_argument("--delay-ms", type=float, default=20.0)
+    args: argparse.Namespace = parser.parse_args()
+    main(
+        args.searches,
+        args.concurrency,
+        args.upstream_rate,
+        args.limiter_rate,
+        args.delay_ms / 1000,
+    )
@@ -0,0 +1,190 @@
+"""
+Benchmark: /search requests/sec with 1, 2, 4 ... server worker processes
+
+Run from the repository root:
+    python -m benchmarks.bench_workers --workers 1 2 4 --requests 4000 --concurrency 64
+
+For each worker count, the app of src.main runs under PreforkServer, configured
+from --config, except that
+- http_client.base_url points at a StubUpstream, itself run by PreforkServer
+- search_cache and analytics are off, so every /search fetches from the stub
+- html is parsed inline (only "parse": true parses, and this doesn't send it)
+
+Every query is distinct; single-flight would coalesce identical ones in flight
+Load comes from --clients processes, so the load generator isn't the bottleneck
+
+Scaling is near-linear only while there are idle cores: give it at least
+workers + upstream_workers + clients of them
+Search results are still written behind to --config's database; without a
+reachable one, the inserts fail and are logged, and /search keeps answering
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import time
+import urllib.request
+from multiprocessing.process import BaseProcess
+from typing import Any
+
+import aiohttp
+import toml
+
+from benchmarks.latency import percentiles
+from benchmarks.stub_upstream import StubUpstream, format_result
+from src.main import create_app
+from src.server import PreforkServer, ServerConfig
+
+FORK: Any = multiprocessing.get_context("fork")
+
+
+def start_server(server: PreforkServer) -> tuple[BaseProcess, int]:
+    """
+    Runs the server's master in a forked process
+    :return: (the master process, the port it listens on)
+    """
+    port: int = server.bind()
+    master: BaseProcess = FORK.Process(target=server.run)
+    master.start()
+    deadline: float = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            # any http answer, even a 404, means a worker is accepting
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1)
+            break
+        except urllib.error.HTTPError:
+            break
+        except OSError:
+            time.sleep(0.1)
+    return master, port
+
+
+def stop_server(master: BaseProcess) -> None:
+    os.kill(master.pid, signal.SIGTERM)  # type: ignore[arg-type]
+    master.join()
+
+
+async def client_load(
+    port: int, client: int, requests: int, concurrency: int
+) -> list[float]:
+    """
+    :return: the latency of each /search, in milliseconds
+    """
+    latencies: list[float] = []
+    semaphore: asyncio.Semaphore = asyncio.Semaphore(concurrency)
+    connector: aiohttp.TCPConnector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+
+        async def search(i: int) -> None:
+            async with semaphore:
+                start: float = time.perf_counter()
+                async with session.post(
+                    f"http://127.0.0.1:{port}/search",
+                    json={"user_id": "bench-user", "query": f"q{client}-{i}"},
+                ) as response:
+                    await response.read()
+                    response.raise_for_status()
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        await asyncio.gather(*(search(i) for i in range(requests)))
+    return latencies
+
+
+def run_client(args: tuple[int, int, int, int]) -> list[float]:
+    return asyncio.run(client_load(*args))
+
+
+def load(port: int, requests: int, concurrency: int, clients: int) -> dict[str, float]:
+    per_client: int = requests // clients
+    with FORK.Pool(clients) as pool:
+        wall_start: float = time.perf_counter()
+        results: list[list[float]] = pool.map(
+            run_client,
+            [
+                (port, client, per_client, max(1, concurrency // clients))
+                for client in range(clients)
+            ],
+        )
+        wall_seconds: float = time.perf_counter() - wall_start
+    latencies: list[float] = [latency for result in results for latency in result]
+    p50, p99 = percentiles(latencies)
+    return {
+        "p50_ms": p50,
+        "p99_ms": p99,
+        "rps": len(latencies) / wall_seconds,
+    }
+
+
+def main(
+    config: dict[str, Any],
+    workers: list[int],
+    requests: int,
+    concurrency: int,
+    clients: int,
+    upstream_workers: int,
+    html_size_bytes: int,
+    upstream_delay_ms: float,
+) -> None:
+    upstream: StubUpstream = StubUpstream(
+        html_size_bytes=html_size_bytes, delay_seconds=upstream_delay_ms / 1000
+    )
+    upstream_master, upstream_port = start_server(
+        PreforkServer(
+            ServerConfig(host="127.0.0.1", port=0, workers=upstream_workers),
+            lambda index: upstream.create_app(),
+        )
+    )
+    config["http_client"] = {
+        **config.get("http_client", {}),
+        "base_url": f"http://127.0.0.1:{upstream_port}/search",
+    }
+    config["search_cache"] = {**config.get("search_cache", {}), "enabled": False}
+    config["analytics"] = {**config.get("analytics", {}), "enabled": False}
+    config["cpu_executor"] = {"kind": "inline"}
+    try:
+        baseline: float | None = None
+        for worker_count in workers:
+            master, port = start_server(
+                PreforkServer(
+                    ServerConfig(host="127.0.0.1", port=0, workers=worker_count),
+                    lambda index: create_app(config, worker_index=index),
+                )
+            )
+            try:
+                # warm up: connection pools, imports, first-request paths
+                load(port, min(requests, 200), concurrency, clients)
+                result: dict[str, float] = load(port, requests, concurrency, clients)
+            finally:
+                stop_server(master)
+            baseline = baseline or result["rps"]
+            print(
+                format_result(f"{worker_count} workers", result)
+                + f" speedup={result['rps'] / baseline:5.2f}x"
+            )
+    finally:
+        stop_server(upstream_master)
+
+
+if __name__ == "__main__":
+    parser: argparse.ArgumentParser = argparse.ArgumentParser()
+    parser.add_argument("--config", default="local_config/config.toml")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--clients", type=int, default=2)
+    parser.add_argument("--upstream-workers", type=int, default=2)
+    parser.add_argument("--html-size-bytes", type=int, default=100_000)
+    parser.add_argument("--upstream-delay-ms", type=float, default=0.0)
+    args: argparse.Namespace = parser.parse_args()
+    main(
+        toml.load(args.config),
+        args.workers,
+        args.requests,
+        args.concurrency,
+        args.clients,
+        args.upstream_workers,
+        args.html_size_bytes,
+        args.upstream_delay_ms,
+    )
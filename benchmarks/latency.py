@@ -0,0 +1,15 @@
+import statistics
+
+
+def percentiles(samples: list[float]) -> tuple[float, float]:
+    """
+    p50 and p99 of samples, e.g latencies in milliseconds
+
+    statistics.quantiles' default method, "exclusive", extrapolates
+    past the smallest and largest samples; its p99 can be above the max
+    - "inclusive" keeps every percentile within the samples
+    """
+    if len(samples) < 2:
+        return samples[0], samples[0]
+    quantiles: list[float] = statistics.quantiles(samples, n=100, method="inclusive")
+    return quantiles[49], quantiles[98]
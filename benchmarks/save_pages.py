@@ -0,0 +1,99 @@
+"""
+Saves real search results pages, for the benchmarks to run on
+
+Run from the repository root:
+    python -m benchmarks.save_pages --out benchmarks/pages tea "euro 2024" "iphone 15 price"
+    python -m benchmarks.save_pages --out benchmarks/stored --from-database 200
+
+Searches Yahoo for each term (YahooSearchService._fetch, with the [http_client] config)
+and writes the html, as is, to --out/<term>.html
+- Then e.g: python -m benchmarks.bench_search_parser --pages benchmarks/pages
+
+--from-database N samples N stored results from search_results instead,
+html from result or result_compressed, decompressed, to --out/<search_id>.html
+- What bench_compression should run on: the pages as they are actually stored
+- ORDER BY random() reads the whole table once; fine for a one-off sample
+- Save a spread of terms (news, shopping, definitions, people ...);
+pages differ in size and markup from one kind of query to the next
+- benchmarks/pages/ is git-ignored; the pages are Yahoo's, not ours to commit
+"""
+
+import argparse
+import asyncio
+import re
+from pathlib import Path
+from typing import Any
+
+import toml
+from sqlalchemy import CursorResult, text
+
+from src.services.yahoo_search_dao import YahooSearchDAO
+from src.services.yahoo_search_service import YahooSearchService
+from src.utils.http_client import HttpClientConfig
+
+
+def page_path(out: Path, name: str) -> Path:
+    return out / f"{re.sub(r'[^a-z0-9]+', '_', name.casefold()).strip('_')}.html"
+
+
+async def save_from_yahoo(config: dict[str, Any], terms: list[str], out: Path) -> None:
+    # _fetch never touches the database; the DAO's engine never connects
+    dao: YahooSearchDAO = YahooSearchDAO(config["database"])
+    service: YahooSearchService = YahooSearchService(
+        yahoo_search_dao=dao,
+        http_client_config=HttpClientConfig(**config.get("http_client", {})),
+    )
+    try:
+        for term in terms:
+            html: str | None = await service._fetch(term)
+            if html is None:
+                print(f"{term!r}: no page, Yahoo answered with an error")
+                continue
+            path: Path = page_path(out, term)
+            path.write_text(html, encoding="utf-8")
+            print(f"{term!r}: {len(html.encode('utf-8')) / 1024:.0f} KB -> {path}")
+    finally:
+        await service.close()
+        await dao.close()
+
+
+async def save_from_database(config: dict[str, Any], count: int, out: Path) -> None:
+    dao: YahooSearchDAO = YahooSearchDAO(config["database"])
+    try:
+        async with dao._engine.connect() as connection:
+            rows: CursorResult = await connection.execute(
+                text(
+                    "SELECT search_id, result, result_compressed "
+                    "FROM search_results "
+                    "WHERE result IS NOT NULL OR result_compressed IS NOT NULL "
+                    "ORDER BY random() "
+                    "LIMIT :count"
+                ),
+                {"count": count},
+            )
+            for search_id, result, result_compressed in rows:
+                html: str | None = YahooSearchDAO._result_from_columns(
+                    result, result_compressed
+                )
+                if html is not None:
+                    page_path(out, str(search_id)).write_text(html, encoding="utf-8")
+    finally:
+        await dao.close()
+    print(f"{len(list(out.glob('*.html')))} pages in {out}")
+
+
+if __name__ == "__main__":
+    parser: argparse.ArgumentParser = argparse.ArgumentParser()
+    parser.add_argument("terms", nargs="*")
+    parser.add_argument("--out", type=Path, default=Path("benchmarks/pages"))
+    parser.add_argument("--from-database", type=int, default=0, metavar="N")
+    parser.add_argument("--config", default="local_config/config.toml")
+    args: argparse.Namespace = parser.parse_args()
+    if not args.terms and not args.from_database:
+        parser.error("give search terms, or --from-database N")
+    args.out.mkdir(parents=True, exist_ok=True)
+    config: dict[str, Any] = toml.load(args.config)
+    if args.from_database:
+        asyncio.run(save_from_database(config, args.from_database, args.out))
+    else:
+        asyncio.run(save_from_yahoo(config, args.terms, args.out))
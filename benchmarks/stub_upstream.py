@@ -0,0 +1,112 @@
+"""
+A local stand-in for sg.search.yahoo.com
+
+Benchmarks must not hammer the real Yahoo, and its latency is too noisy
+to compare two implementations against each other
+- StubUpstream serves a fixed HTML page on /search
+- An optional artificial delay emulates Yahoo's server-side latency
+- An optional rate limit emulates Yahoo's throttling; requests above it get a 429
+"""
+
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+
+from aiohttp import web
+
+from benchmarks.latency import percentiles
+
+
+class StubUpstream:
+    def __init__(
+        self,
+        html_size_bytes: int = 300_000,
+        delay_seconds: float = 0.0,
+        rate_limit_per_second: float = 0.0,
+    ) -> None:
+        self.__body: str = "<html><body>" + ("x" * html_size_bytes) + "</body></html>"
+        self.__delay_seconds: float = delay_seconds
+        self.__rate_limit_per_second: float = rate_limit_per_second
+        # a token bucket of one second's worth of requests
+        self.__tokens: float = rate_limit_per_second
+        self.__refilled_at: float = time.monotonic()
+        self.throttled: int = 0
+        self.__runner: web.AppRunner | None = None
+        self.port: int = 0
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/search"
+
+    def _over_rate_limit(self) -> bool:
+        if not self.__rate_limit_per_second:
+            return False
+        now: float = time.monotonic()
+        self.__tokens = min(
+            self.__rate_limit_per_second,
+            self.__tokens + (now - self.__refilled_at) * self.__rate_limit_per_second,
+        )
+        self.__refilled_at = now
+        if self.__tokens < 1:
+            self.throttled += 1
+            return True
+        self.__tokens -= 1
+        return False
+
+    async def _handle_search(self, request: web.Request) -> web.Response:
+        if self._over_rate_limit():
+            return web.Response(status=429, text="Too Many Requests")
+        if self.__delay_seconds:
+            await asyncio.sleep(self.__delay_seconds)
+        return web.Response(text=self.__body, content_type="text/html")
+
+    def create_app(self) -> web.Application:
+        app: web.Application = web.Application()
+        app.add_routes([web.get("/search", self._handle_search)])
+        return app
+
+    async def start(self) -> None:
+        self.__runner = web.AppRunner(self.create_app(), access_log=None)
+        await self.__runner.setup()
+        site: web.TCPSite = web.TCPSite(self.__runner, "127.0.0.1", 0)
+        await site.start()
+        # port 0 lets the OS pick a free port; read back the one it chose
+        self.port = site._server.sockets[0].getsockname()[1]  # type: ignore[union-attr]
+
+    async def close(self) -> None:
+        if self.__runner is not None:
+            await self.__runner.cleanup()
+
+
+async def measure(
+    call: Callable[[], Awaitable[object]], requests: int, concurrency: int
+) -> dict[str, float]:
+    """
+    Fires `requests` calls with at most `concurrency` in flight
+    and reports p50 / p99 latency in milliseconds and requests per second
+    """
+    latencies: list[float] = []
+    semaphore: asyncio.Semaphore = asyncio.Semaphore(concurrency)
+
+    async def timed_call() -> None:
+        async with semaphore:
+            start: float = time.perf_counter()
+            await call()
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    wall_start: float = time.perf_counter()
+    await asyncio.gather(*(timed_call() for _ in range(requests)))
+    wall_seconds: float = time.perf_counter() - wall_start
+    p50, p99 = percentiles(latencies)
+    return {
+        "p50_ms": p50,
+        "p99_ms": p99,
+        "rps": requests / wall_seconds,
+    }
+
+
+def format_result(label: str, result: dict[str, float]) -> str:
+    return (
+        f"{label:<32} p50={result['p50_ms']:8.2f}ms "
+        f"p99={result['p99_ms']:8.2f}ms rps={result['rps']:10.1f}"
+    )
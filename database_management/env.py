@@ -1,3 +1,4 @@
+import re
 from logging.config import fileConfig
 from typing import Any
 
@@ -27,6 +28,26 @@ if config.config_file_name is not None:
 # target_metadata = mymodel.Base.metadata
 target_metadata = main_metadata
 
+# partitions of search_results, managed by src.services.search_results_partitions
+SEARCH_RESULTS_PARTITION: re.Pattern[str] = re.compile(
+    r"^search_results_(p\d{8}|legacy|default)$"
+)
+
+
+def include_object(
+    object_: Any, name: str | None, type_: str, reflected: bool, compare_to: Any
+) -> bool:
+    """
+    Keeps autogenerate from proposing to drop the partitions of search_results
+    """
+    return not (
+        type_ == "table"
+        and reflected
+        and name is not None
+        and SEARCH_RESULTS_PARTITION.match(name) is not None
+    )
+
+
 # other values from the local_config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = local_config.get_main_option("my_important_option")
@@ -48,6 +69,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -78,7 +100,11 @@ def run_migrations_online() -> None:
     )
 
     with connectable.connect() as connection:
-        context.configure(connection=connection, target_metadata=target_metadata)
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            include_object=include_object,
+        )
 
         with context.begin_transaction():
             context.run_migrations()
@@ -8,10 +8,27 @@
 - user_id -> (Let's omit this for now)
 - search_term -> str (not nullable)
 - result -> str | None (google search engine can fail)
-- created_at -> datetime (the time the search occurred)
+- result_compressed -> bytes | None (zlib compressed result, when compression is on)
+- created_at -> datetime (the time the search occurred, and the partition key)
+
+## (Analytics rollups)
+- search_terms_hourly / user_searches_hourly -> number of searches
+per search_term / user_id, per hour
+- analytics_rollup_status -> up to when search_results has been rolled up
 """
 
-from sqlalchemy import Table, MetaData, String, Column, DateTime, ForeignKey
+from sqlalchemy import (
+    Table,
+    MetaData,
+    String,
+    Column,
+    DateTime,
+    BigInteger,
+    ForeignKey,
+    LargeBinary,
+    Index,
+    text,
+)
 from sqlalchemy.ext.declarative import declarative_base
 
 Base = declarative_base()
@@ -24,6 +41,8 @@ user_table: Table = Table(
     Column("created_at", DateTime, nullable=False),
 )
 
+# range-partitioned by created_at; the partitions themselves are created and
+# dropped by python -m src.services.search_results_partitions, not by alembic
 search_results_table = Table(
     "search_results",
     main_metadata,
@@ -36,7 +55,17 @@ search_results_table = Table(
     ),
     Column("search_term", String, nullable=False),
     Column("result", String, nullable=True),
-    Column("created_at", DateTime, nullable=False),
+    Column("result_compressed", LargeBinary, nullable=True),
+    Column("created_at", DateTime, primary_key=True),
+    Index(
+        "ix_search_results_search_term_created_at",
+        "search_term",
+        text("created_at DESC"),
+    ),
+    Index("ix_search_results_user_id_created_at", "user_id", "created_at"),
+    Index("ix_search_results_created_at_search_id", "created_at", "search_id"),
+    Index("ix_search_results_created_at_brin", "created_at", postgresql_using="brin"),
+    postgresql_partition_by="RANGE (created_at)",
 )
 
 extracted_search_results_table = Table(
@@ -55,6 +84,7 @@ extracted_search_results_table = Table(
     Column("date", String, nullable=True),
     Column("body", String, nullable=True),
     Column("created_at", DateTime, nullable=False),
+    Index("ix_extracted_search_results_user_id_created_at", "user_id", "created_at"),
 )
 
 
@@ -70,4 +100,32 @@ last_extracted_user_status = Table(
         nullable=False,
     ),
     Column("last_run", DateTime, nullable=False),
+    Index("ix_last_extracted_user_status_user_id", "user_id", unique=True),
+)
+
+
+# searches per search term, per hour; refreshed incrementally from search_results
+search_terms_hourly_table = Table(
+    "search_terms_hourly",
+    main_metadata,
+    Column("bucket", DateTime, primary_key=True),
+    Column("search_term", String, primary_key=True),
+    Column("searches", BigInteger, nullable=False),
+)
+
+# searches per user, per hour
+user_searches_hourly_table = Table(
+    "user_searches_hourly",
+    main_metadata,
+    Column("bucket", DateTime, primary_key=True),
+    Column("user_id", String, primary_key=True),
+    Column("searches", BigInteger, nullable=False),
+)
+
+# tracks up to when search_results has been rolled up
+analytics_rollup_status_table = Table(
+    "analytics_rollup_status",
+    main_metadata,
+    Column("name", String, primary_key=True),
+    Column("last_run", DateTime, nullable=False),
 )
@@ -0,0 +1,47 @@
+"""Add hourly search analytics rollup tables
+
+Revision ID: 2b7d9e4f6a13
+Revises: 8e4b2c6d1f70
+Create Date: 2024-06-14 19:02:31.774190
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "2b7d9e4f6a13"
+down_revision: Union[str, None] = "8e4b2c6d1f70"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "search_terms_hourly",
+        sa.Column("bucket", sa.DateTime(), nullable=False),
+        sa.Column("search_term", sa.String(), nullable=False),
+        sa.Column("searches", sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint("bucket", "search_term"),
+    )
+    op.create_table(
+        "user_searches_hourly",
+        sa.Column("bucket", sa.DateTime(), nullable=False),
+        sa.Column("user_id", sa.String(), nullable=False),
+        sa.Column("searches", sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint("bucket", "user_id"),
+    )
+    op.create_table(
+        "analytics_rollup_status",
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("last_run", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("name"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("analytics_rollup_status")
+    op.drop_table("user_searches_hourly")
+    op.drop_table("search_terms_hourly")
@@ -0,0 +1,164 @@
+"""Range-partition search_results by created_at
+
+Revision ID: 6f3a8c1e5d24
+Revises: 2b7d9e4f6a13
+Create Date: 2024-06-18 22:10:43.519207
+
+"""
+
+from datetime import datetime, timedelta
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "6f3a8c1e5d24"
+down_revision: Union[str, None] = "2b7d9e4f6a13"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# daily partitions created up front; later ones are created by
+# python -m src.services.search_results_partitions
+INITIAL_PARTITIONS: int = 7
+
+INDEXES: list[tuple[str, str]] = [
+    ("ix_search_results_search_term_created_at", "(search_term, created_at DESC)"),
+    ("ix_search_results_user_id_created_at", "(user_id, created_at)"),
+    ("ix_search_results_created_at_search_id", "(created_at, search_id)"),
+    ("ix_search_results_created_at_brin", "USING brin (created_at)"),
+]
+
+
+def upgrade() -> None:
+    """
+    No row is copied
+    - The existing table becomes search_results_legacy, the partition of
+    every row before cutover (the day after its newest row)
+    - It is dropped by the retention of the maintenance command, like any partition
+
+    Everything runs in one transaction, holding an ACCESS EXCLUSIVE lock on
+    search_results; stop the server (or expect /search to wait) while it runs
+    - The CHECK constraint added before ATTACH PARTITION lets postgres skip
+    scanning the legacy rows to validate the partition bound
+    - Building the (search_id, created_at) primary key on the legacy rows
+    is the slow part; roughly one index build over the table
+    """
+    connection: sa.Connection = op.get_bind()
+    newest: datetime | None = connection.execute(
+        sa.text("SELECT max(created_at) FROM search_results")
+    ).scalar_one()
+    today: datetime = datetime.utcnow().replace(
+        hour=0, minute=0, second=0, microsecond=0
+    )
+    cutover: datetime = max(
+        today + timedelta(days=1),
+        (newest or today).replace(hour=0, minute=0, second=0, microsecond=0)
+        + timedelta(days=1),
+    )
+
+    op.rename_table("search_results", "search_results_legacy")
+    op.execute(
+        "ALTER TABLE search_results_legacy RENAME CONSTRAINT "
+        "search_results_pkey TO search_results_legacy_pkey"
+    )
+    op.execute(
+        "ALTER TABLE search_results_legacy RENAME CONSTRAINT "
+        "search_results_user_id_to_users_user_id_fk "
+        "TO search_results_legacy_user_id_to_users_user_id_fk"
+    )
+    for index_name, _ in INDEXES:
+        op.execute(
+            f"ALTER INDEX {index_name} RENAME TO "
+            f"{index_name.replace('search_results', 'search_results_legacy')}"
+        )
+
+    op.execute(
+        "CREATE TABLE search_results ("
+        "search_id VARCHAR NOT NULL, "
+        "user_id VARCHAR NOT NULL, "
+        "search_term VARCHAR NOT NULL, "
+        "result VARCHAR, "
+        "result_compressed BYTEA, "
+        "created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL, "
+        "CONSTRAINT search_results_pkey PRIMARY KEY (search_id, created_at), "
+        "CONSTRAINT search_results_user_id_to_users_user_id_fk "
+        "FOREIGN KEY (user_id) REFERENCES users (user_id)"
+        ") PARTITION BY RANGE (created_at)"
+    )
+    for index_name, columns in INDEXES:
+        op.execute(f"CREATE INDEX {index_name} ON search_results {columns}")
+
+    # a partition must match its parent: its primary key becomes (search_id, created_at)
+    op.execute(
+        "ALTER TABLE search_results_legacy DROP CONSTRAINT search_results_legacy_pkey"
+    )
+    op.execute(
+        "ALTER TABLE search_results_legacy ADD CONSTRAINT search_results_legacy_pkey "
+        "PRIMARY KEY (search_id, created_at)"
+    )
+    # and user_id is NOT NULL, as e28b60583ea8 made it; a no-op unless the
+    # database drifted from it, then a scan for NULLs (failing if there are any)
+    op.execute("ALTER TABLE search_results_legacy ALTER COLUMN user_id SET NOT NULL")
+    op.execute(
+        "ALTER TABLE search_results_legacy ADD CONSTRAINT search_results_legacy_bound "
+        f"CHECK (created_at < '{cutover.isoformat(sep=' ')}')"
+    )
+    op.execute(
+        "ALTER TABLE search_results ATTACH PARTITION search_results_legacy "
+        f"FOR VALUES FROM (MINVALUE) TO ('{cutover.isoformat(sep=' ')}')"
+    )
+    op.execute(
+        "ALTER TABLE search_results_legacy DROP CONSTRAINT search_results_legacy_bound"
+    )
+    # the legacy FK and indexes, equal to search_results', became its partition's
+    # on ATTACH; the rows are not checked against users again, nor re-indexed
+
+    for day in range(INITIAL_PARTITIONS):
+        start: datetime = cutover + timedelta(days=day)
+        end: datetime = start + timedelta(days=1)
+        op.execute(
+            f"CREATE TABLE search_results_p{start:%Y%m%d} "
+            "PARTITION OF search_results "
+            f"FOR VALUES FROM ('{start.isoformat(sep=' ')}') "
+            f"TO ('{end.isoformat(sep=' ')}')"
+        )
+    # catches rows outside every partition, if the maintenance command stops running
+    op.execute(
+        "CREATE TABLE search_results_default PARTITION OF search_results DEFAULT"
+    )
+
+
+def downgrade() -> None:
+    """
+    Copies every row back into one plain table, as it was at 2b7d9e4f6a13
+    - user_id stays NOT NULL; e28b60583ea8's downgrade is the one that drops it
+    """
+    op.execute(
+        "CREATE TABLE search_results_unpartitioned ("
+        "search_id VARCHAR NOT NULL, "
+        "user_id VARCHAR NOT NULL, "
+        "search_term VARCHAR NOT NULL, "
+        "result VARCHAR, "
+        "result_compressed BYTEA, "
+        "created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL"
+        ")"
+    )
+    op.execute(
+        "INSERT INTO search_results_unpartitioned "
+        "SELECT search_id, user_id, search_term, result, result_compressed, "
+        "created_at FROM search_results"
+    )
+    # drops every partition with it
+    op.drop_table("search_results")
+    op.rename_table("search_results_unpartitioned", "search_results")
+    op.create_primary_key("search_results_pkey", "search_results", ["search_id"])
+    op.create_foreign_key(
+        "search_results_user_id_to_users_user_id_fk",
+        "search_results",
+        "users",
+        ["user_id"],
+        ["user_id"],
+    )
+    for index_name, columns in INDEXES:
+        op.execute(f"CREATE INDEX {index_name} ON search_results {columns}")
@@ -0,0 +1,86 @@
+"""Add indexes for the cache lookup, extraction and analytics queries
+
+Revision ID: 8e4b2c6d1f70
+Revises: 5c1f7d2a9b3e
+Create Date: 2024-06-10 20:41:55.108263
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "8e4b2c6d1f70"
+down_revision: Union[str, None] = "5c1f7d2a9b3e"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """
+    CREATE INDEX CONCURRENTLY doesn't lock search_results against writes
+    - It can't run inside a transaction, hence the autocommit_block
+    """
+    with op.get_context().autocommit_block():
+        # cache lookup: WHERE search_term = ? AND created_at >= ? ORDER BY created_at DESC
+        op.create_index(
+            "ix_search_results_search_term_created_at",
+            "search_results",
+            ["search_term", sa.text("created_at DESC")],
+            postgresql_concurrently=True,
+        )
+        # extraction and per-user analytics: WHERE user_id = ? AND created_at ...
+        op.create_index(
+            "ix_search_results_user_id_created_at",
+            "search_results",
+            ["user_id", "created_at"],
+            postgresql_concurrently=True,
+        )
+        # keyset pagination: ORDER BY created_at, search_id
+        op.create_index(
+            "ix_search_results_created_at_search_id",
+            "search_results",
+            ["created_at", "search_id"],
+            postgresql_concurrently=True,
+        )
+        # time-period analytics; rows are appended in created_at order,
+        # so a BRIN index of a few pages covers the whole table
+        op.create_index(
+            "ix_search_results_created_at_brin",
+            "search_results",
+            ["created_at"],
+            postgresql_using="brin",
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_extracted_search_results_user_id_created_at",
+            "extracted_search_results",
+            ["user_id", "created_at"],
+            postgresql_concurrently=True,
+        )
+        # one watermark per user
+        op.create_index(
+            "ix_last_extracted_user_status_user_id",
+            "last_extracted_user_status",
+            ["user_id"],
+            unique=True,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for table, index in [
+            ("last_extracted_user_status", "ix_last_extracted_user_status_user_id"),
+            (
+                "extracted_search_results",
+                "ix_extracted_search_results_user_id_created_at",
+            ),
+            ("search_results", "ix_search_results_created_at_brin"),
+            ("search_results", "ix_search_results_created_at_search_id"),
+            ("search_results", "ix_search_results_user_id_created_at"),
+            ("search_results", "ix_search_results_search_term_created_at"),
+        ]:
+            op.drop_index(index, table_name=table, postgresql_concurrently=True)
@@ -0,0 +1,137 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import text
+
+from integration_tests.src.utils.clear_tables import ClearTables
+from integration_tests.src.utils.query_plan import QueryPlan
+
+from src.services.yahoo_search_dao import YahooSearchDAO
+
+SEED_START: datetime = datetime(year=2024, month=4, day=1)
+# SEED_START is long before the partitioning cutover: every seeded row is in here
+SEEDED_PARTITION: str = "search_results_legacy"
+
+
+class TestQueryPlans:
+    """
+    Asserts the hot queries of YahooSearchDAO are served by an index,
+    not a sequential scan over every html blob in search_results
+
+    Seeds 20k synthetic rows first
+    - On a near-empty table, a sequential scan is genuinely the cheapest plan
+
+    Run with the rest of the integration tests:
+    pytest -p no:asyncio --max-asyncio-tasks 1 integration_tests
+    """
+
+    @staticmethod
+    async def seed() -> None:
+        await ClearTables.clear_extraction_tables()
+        await ClearTables.clear_search_table()
+        await ClearTables.clear_user_table()
+        await QueryPlan.seed_search_results(
+            users=200, searches_per_user=100, terms=500, start=SEED_START
+        )
+
+    @staticmethod
+    async def assert_index_scan(
+        plan: dict, index_names: set[str], partitions: set[str]
+    ) -> None:
+        """
+        search_results is partitioned by created_at: the plan scans its partitions,
+        each through its own copy of the index, named after the partition
+        - index_names are the partitioned table's indexes, the ones the migrations name
+        - partitions are exactly the ones the planner may not prune away
+        - Only the scan of SEEDED_PARTITION has to use index_names; the other
+        partitions are empty, any index costs nothing there
+        """
+        scans: list[tuple[str, str | None, str | None]] = QueryPlan.scans(plan)
+        all_partitions: set[str] = await QueryPlan.partitions("search_results")
+        search_results_scans = [scan for scan in scans if scan[1] in all_partitions]
+        assert {scan[1] for scan in search_results_scans} == partitions, scans
+        parent_indexes: dict[str, str] = await QueryPlan.parent_indexes(
+            {scan[2] for scan in search_results_scans if scan[2] is not None}
+        )
+        seeded_index_names: set[str] = {
+            parent_indexes[index_name]
+            for _, relation, index_name in search_results_scans
+            if relation == SEEDED_PARTITION and index_name is not None
+        }
+        assert seeded_index_names and seeded_index_names <= index_names, scans
+        for node_type, _, _ in search_results_scans:
+            assert node_type != "Seq Scan", scans
+
+    @pytest.mark.asyncio_cooperative
+    async def test_query_plans(self) -> None:
+        """
+        One test, so the 20k rows are seeded once for every query
+        """
+        await self.seed()
+        # no upper bound on created_at (cache lookup, keyset page): nothing to prune
+        every_partition: set[str] = await QueryPlan.partitions("search_results")
+
+        # cache lookup
+        await self.assert_index_scan(
+            await QueryPlan.explain(
+                YahooSearchDAO._fetch_recent_search_clause(),
+                {
+                    "search_term": "seed term 42",
+                    "since": SEED_START + timedelta(hours=12),
+                },
+            ),
+            {"ix_search_results_search_term_created_at"},
+            every_partition,
+        )
+
+        # incremental extraction of one user
+        await self.assert_index_scan(
+            await QueryPlan.explain(
+                YahooSearchDAO._extract_searches_clause(),
+                {
+                    "user_id": "seed-user-7",
+                    "last_run": SEED_START + timedelta(hours=20),
+                    "until": SEED_START + timedelta(hours=30),
+                },
+            ),
+            {"ix_search_results_user_id_created_at"},
+            {SEEDED_PARTITION},
+        )
+
+        # keyset pagination, page somewhere in the middle of the table
+        await self.assert_index_scan(
+            await QueryPlan.explain(
+                YahooSearchDAO._searches_page_clause(True, True),
+                {
+                    "batch_size": 1000,
+                    "after_created_at": SEED_START + timedelta(hours=25),
+                    "after_search_id": "",
+                },
+            ),
+            {"ix_search_results_created_at_search_id"},
+            every_partition,
+        )
+
+        # analytics over a time period
+        await self.assert_index_scan(
+            await QueryPlan.explain(
+                text(
+                    "SELECT date_trunc('hour', created_at), COUNT(*) "
+                    "FROM search_results "
+                    "WHERE created_at >= :start AND created_at < :end "
+                    "GROUP BY 1"
+                ),
+                {
+                    "start": SEED_START + timedelta(hours=10),
+                    "end": SEED_START + timedelta(hours=11),
+                },
+            ),
+            {
+                "ix_search_results_created_at_brin",
+                "ix_search_results_created_at_search_id",
+            },
+            {SEEDED_PARTITION},
+        )
+
+        await ClearTables.clear_search_table()
+        await ClearTables.clear_user_table()
@@ -1,4 +1,7 @@
+from collections.abc import Awaitable, Sequence
 from datetime import datetime
+from pathlib import Path
+
 import pytest
 
 from integration_tests.conftest import integration_test_db_config
@@ -6,9 +9,16 @@ from integration_tests.src.utils.clear_tables import ClearTables
 from integration_tests.src.utils.engine import dummy_uuid
 from integration_tests.src.utils.fetch import Fetch
 
+from src.models.extracted_search_result import ExtractedSearchResult
+from src.models.search_analytics import (
+    SearchPeriodCount,
+    SearchTermCount,
+    UserSearchCount,
+)
 from src.models.search_results import SearchResults
 from src.models.user import User
 from src.services.yahoo_search_dao import YahooSearchDAO
+from src.services.yahoo_search_etl import YahooSearchETL, YahooSearchETLConfig
 
 # Initialize service here,
 # to reuse it across all tests here
@@ -81,3 +91,303 @@ class TestYahooSearchDAO:
         assert results_row == search_results
         await ClearTables.clear_search_table()
         await ClearTables.clear_user_table()
+
+    @pytest.mark.asyncio_cooperative
+    async def test_fetch_recent_search(self) -> None:
+        await ClearTables.clear_search_table()
+        await ClearTables.clear_user_table()
+        user: User = User(
+            user_id=str(dummy_uuid),
+            created_at=datetime(year=2024, month=4, day=10, hour=12),
+        )
+        await yahoo_search_dao.insert_user(user)
+        search_results: list[SearchResults] = [
+            SearchResults(
+                search_id="stale_search_id",
+                user_id=str(dummy_uuid),
+                search_term="coffee bean tea leaf",
+                result="stale results",
+                created_at=datetime(year=2024, month=4, day=10, hour=10),
+            ),
+            SearchResults(
+                search_id="failed_search_id",
+                user_id=str(dummy_uuid),
+                search_term="coffee bean tea leaf",
+                result=None,
+                created_at=datetime(year=2024, month=4, day=10, hour=12, minute=30),
+            ),
+            SearchResults(
+                search_id="fresh_search_id",
+                user_id=str(dummy_uuid),
+                search_term="coffee bean tea leaf",
+                result="fresh results",
+                created_at=datetime(year=2024, month=4, day=10, hour=12),
+            ),
+        ]
+        for search_result in search_results:
+            await yahoo_search_dao.insert_search(search_result)
+
+        # the latest non-null result within the window is served
+        cached: SearchResults | None = await yahoo_search_dao.fetch_recent_search(
+            "coffee bean tea leaf", datetime(year=2024, month=4, day=10, hour=11)
+        )
+        assert cached == search_results[2]
+        # by the normalized term, as the search_cache's memory tier
+        assert (
+            await yahoo_search_dao.fetch_recent_search(
+                " Coffee  Bean Tea leaf", datetime(year=2024, month=4, day=10, hour=11)
+            )
+            == search_results[2]
+        )
+        missing: SearchResults | None = await yahoo_search_dao.fetch_recent_search(
+            "coffee bean tea leaf", datetime(year=2024, month=4, day=10, hour=13)
+        )
+        assert missing is None
+        await ClearTables.clear_search_table()
+        await ClearTables.clear_user_table()
+
+    @pytest.mark.asyncio_cooperative
+    async def test_insert_searches(self) -> None:
+        await ClearTables.clear_search_table()
+        await ClearTables.clear_user_table()
+        await yahoo_search_dao.insert_user(
+            User(
+                user_id=str(dummy_uuid),
+                created_at=datetime(year=2024, month=4, day=10, hour=12),
+            )
+        )
+        search_results: list[SearchResults] = [
+            SearchResults(
+                search_id=f"dummy_search_id_{i}",
+                user_id=str(dummy_uuid),
+                search_term="coffee bean tea leaf",
+                result=f"dummy results {i}",
+                created_at=datetime(year=2024, month=4, day=10, hour=12, minute=i),
+            )
+            for i in range(3)
+        ]
+        await yahoo_search_dao.insert_searches(search_results)
+
+        results_row: list[SearchResults] = await Fetch.fetch_all_searches()
+        assert sorted(results_row, key=lambda row: row.search_id) == search_results
+        await ClearTables.clear_search_table()
+        await ClearTables.clear_user_table()
+
+    @pytest.mark.asyncio_cooperative
+    async def test_extract_searches_for_user(self) -> None:
+        await ClearTables.clear_extraction_tables()
+        await ClearTables.clear_search_table()
+        await ClearTables.clear_user_table()
+        await yahoo_search_dao.insert_user(
+            User(
+                user_id=str(dummy_uuid),
+                created_at=datetime(year=2024, month=4, day=10, hour=12),
+            )
+        )
+        fixture_html: str = Path(
+            "unit_tests/fixtures/yahoo_search_tea.html"
+        ).read_text()
+        await yahoo_search_dao.insert_searches(
+            [
+                SearchResults(
+                    search_id=f"dummy_search_id_{hour}",
+                    user_id=str(dummy_uuid),
+                    search_term="tea",
+                    result=fixture_html,
+                    created_at=datetime(year=2024, month=4, day=10, hour=hour),
+                )
+                for hour in (12, 13)
+            ]
+        )
+
+        def extract(
+            rows: Sequence[tuple[str, str | None, datetime]],
+        ) -> Awaitable[list[ExtractedSearchResult]]:
+            return YahooSearchETL(yahoo_search_dao, YahooSearchETLConfig()).transform(
+                rows, str(dummy_uuid)
+            )
+
+        # the first run only reaches up to 12:30
+        first_run: tuple[int, int] = await yahoo_search_dao.extract_searches_for_user(
+            str(dummy_uuid),
+            datetime(year=2024, month=4, day=10, hour=12, minute=30),
+            extract,
+            1,
+        )
+        assert first_run == (1, 10)
+        assert await Fetch.fetch_last_run(str(dummy_uuid)) == datetime(
+            year=2024, month=4, day=10, hour=12, minute=30
+        )
+        # the second run only picks up the search made after the watermark
+        second_run: tuple[int, int] = await yahoo_search_dao.extract_searches_for_user(
+            str(dummy_uuid), datetime(year=2024, month=4, day=10, hour=14), extract, 1
+        )
+        assert second_run == (1, 10)
+        extracted: list[ExtractedSearchResult] = (
+            await Fetch.fetch_all_extracted_search_results()
+        )
+        assert len(extracted) == 20
+        await ClearTables.clear_extraction_tables()
+        await ClearTables.clear_search_table()
+        await ClearTables.clear_user_table()
+
+    @pytest.mark.asyncio_cooperative
+    async def test_stream_searches(self) -> None:
+        await ClearTables.clear_search_table()
+        await ClearTables.clear_user_table()
+        await yahoo_search_dao.insert_user(
+            User(
+                user_id=str(dummy_uuid),
+                created_at=datetime(year=2024, month=4, day=10, hour=12),
+            )
+        )
+        # two searches share a created_at, so the search_id tie-breaker is exercised
+        search_results: list[SearchResults] = [
+            SearchResults(
+                search_id=f"dummy_search_id_{i}",
+                user_id=str(dummy_uuid),
+                search_term="coffee bean tea leaf",
+                result=f"dummy results {i}",
+                created_at=datetime(year=2024, month=4, day=10, hour=12, minute=i // 2),
+            )
+            for i in range(5)
+        ]
+        await yahoo_search_dao.insert_searches(search_results)
+
+        streamed: list[SearchResults] = [
+            search async for search in yahoo_search_dao.stream_searches(batch_size=2)
+        ]
+        assert streamed == search_results
+
+        without_result: list[SearchResults] = [
+            search
+            async for search in yahoo_search_dao.stream_searches(
+                batch_size=2,
+                include_result=False,
+                after=(search_results[2].created_at, search_results[2].search_id),
+            )
+        ]
+        assert [search.search_id for search in without_result] == [
+            "dummy_search_id_3",
+            "dummy_search_id_4",
+        ]
+        assert all(search.result is None for search in without_result)
+
+        users: list[User] = [user async for user in yahoo_search_dao.stream_users()]
+        assert [user.user_id for user in users] == [str(dummy_uuid)]
+        await ClearTables.clear_search_table()
+        await ClearTables.clear_user_table()
+
+    @pytest.mark.asyncio_cooperative
+    async def test_compressed_results(self) -> None:
+        await ClearTables.clear_search_table()
+        await ClearTables.clear_user_table()
+        compressing_dao: YahooSearchDAO = YahooSearchDAO(
+            {**integration_test_db_config(), "compress_results": True}
+        )
+        await yahoo_search_dao.insert_user(
+            User(
+                user_id=str(dummy_uuid),
+                created_at=datetime(year=2024, month=4, day=10, hour=12),
+            )
+        )
+        uncompressed: SearchResults = SearchResults(
+            search_id="uncompressed_search_id",
+            user_id=str(dummy_uuid),
+            search_term="coffee bean tea leaf",
+            result="dummy results " * 100,
+            created_at=datetime(year=2024, month=4, day=10, hour=12),
+        )
+        compressed: SearchResults = uncompressed.model_copy(
+            update={
+                "search_id": "compressed_search_id",
+                "created_at": datetime(year=2024, month=4, day=10, hour=13),
+            }
+        )
+        await yahoo_search_dao.insert_search(uncompressed)
+        await compressing_dao.insert_search(compressed)
+        # both storage formats read back the same, through either DAO
+        assert await yahoo_search_dao.fetch_all_searches() in (
+            [uncompressed, compressed],
+            [compressed, uncompressed],
+        )
+        assert sorted(
+            await Fetch.fetch_all_searches(), key=lambda search: search.search_id
+        ) == [compressed, uncompressed]
+
+        # the backfill converts the remaining uncompressed row
+        assert (await compressing_dao.compress_results_chunk(10))[0] == 1
+        assert (await compressing_dao.compress_results_chunk(10))[0] == 0
+        streamed: list[SearchResults] = [
+            search async for search in yahoo_search_dao.stream_searches()
+        ]
+        assert streamed == [uncompressed, compressed]
+        await ClearTables.clear_search_table()
+        await ClearTables.clear_user_table()
+
+    @pytest.mark.asyncio_cooperative
+    async def test_search_rollups(self) -> None:
+        await ClearTables.clear_analytics_tables()
+        await ClearTables.clear_search_table()
+        await ClearTables.clear_user_table()
+        for user_id in ["user_a", "user_b"]:
+            await yahoo_search_dao.insert_user(
+                User(
+                    user_id=user_id,
+                    created_at=datetime(year=2024, month=4, day=10, hour=12),
+                )
+            )
+        await yahoo_search_dao.insert_searches(
+            [
+                SearchResults(
+                    search_id=f"search_id_{i}",
+                    user_id=user_id,
+                    search_term=search_term,
+                    result=None,
+                    created_at=created_at,
+                )
+                for i, (user_id, search_term, created_at) in enumerate(
+                    [
+                        ("user_a", "tea", datetime(2024, 4, 10, 12, 5)),
+                        ("user_a", "tea", datetime(2024, 4, 10, 12, 50)),
+                        ("user_b", "tea", datetime(2024, 4, 10, 13, 5)),
+                        ("user_b", "coffee", datetime(2024, 4, 10, 13, 10)),
+                        ("user_b", "coffee", datetime(2024, 4, 10, 13, 20)),
+                        ("user_b", "milo", datetime(2024, 4, 11, 9, 0)),
+                    ]
+                )
+            ]
+        )
+        start: datetime = datetime(2024, 4, 10)
+        end: datetime = datetime(2024, 4, 12)
+
+        # incremental: the second refresh only adds the searches after the watermark
+        assert (
+            await yahoo_search_dao.refresh_search_rollups(datetime(2024, 4, 10, 13))
+            == 2
+        )
+        assert (
+            await yahoo_search_dao.refresh_search_rollups(datetime(2024, 4, 10, 13))
+            == 0
+        )
+        assert await yahoo_search_dao.refresh_search_rollups(end) == 4
+
+        assert await yahoo_search_dao.fetch_top_search_terms(start, end, 2) == [
+            SearchTermCount(search_term="tea", searches=3),
+            SearchTermCount(search_term="coffee", searches=2),
+        ]
+        assert await yahoo_search_dao.fetch_top_users(start, end, 10) == [
+            UserSearchCount(user_id="user_b", searches=4),
+            UserSearchCount(user_id="user_a", searches=2),
+        ]
+        assert await yahoo_search_dao.fetch_busiest_periods(start, end, "hour", 2) == [
+            SearchPeriodCount(period_start=datetime(2024, 4, 10, 13), searches=3),
+            SearchPeriodCount(period_start=datetime(2024, 4, 10, 12), searches=2),
+        ]
+        assert await yahoo_search_dao.fetch_busiest_periods(start, end, "day", 10) == [
+            SearchPeriodCount(period_start=datetime(2024, 4, 10), searches=5),
+            SearchPeriodCount(period_start=datetime(2024, 4, 11), searches=1),
+        ]
+        await ClearTables.clear_analytics_tables()
+        await ClearTables.clear_search_table()
+        await ClearTables.clear_user_table()
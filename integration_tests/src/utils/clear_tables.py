@@ -23,3 +23,26 @@ class ClearTables:
         truncate_clause: TextClause = text("TRUNCATE TABLE search_results")
         async with engine.begin() as connection:
             await connection.execute(truncate_clause)
+
+    @staticmethod
+    async def clear_extraction_tables() -> None:
+        """
+        Truncate extracted_search_results and last_extracted_user_status
+        """
+        truncate_clause: TextClause = text(
+            "TRUNCATE TABLE extracted_search_results, last_extracted_user_status"
+        )
+        async with engine.begin() as connection:
+            await connection.execute(truncate_clause)
+
+    @staticmethod
+    async def clear_analytics_tables() -> None:
+        """
+        Truncate the analytics rollups, and their watermark
+        """
+        truncate_clause: TextClause = text(
+            "TRUNCATE TABLE search_terms_hourly, user_searches_hourly, "
+            "analytics_rollup_status"
+        )
+        async with engine.begin() as connection:
+            await connection.execute(truncate_clause)
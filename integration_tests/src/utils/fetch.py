@@ -1,52 +1,95 @@
-from collections.abc import Sequence
+from collections.abc import AsyncIterator
+from datetime import datetime
 
+from src.models.extracted_search_result import ExtractedSearchResult
 from src.models.search_results import SearchResults
 from src.models.user import User
+from src.services.yahoo_search_dao import YahooSearchDAO
 from integration_tests.src.utils.engine import engine
-from sqlalchemy import CursorResult, Row, TextClause, text
+from sqlalchemy import CursorResult, TextClause, text
+from sqlalchemy.ext.asyncio import AsyncResult
 
 
 class Fetch:
     @staticmethod
-    async def fetch_all_users() -> list[User]:
+    async def stream_all_users(batch_size: int = 1000) -> AsyncIterator[User]:
+        """
+        Iterates over users through a server-side cursor,
+        batch_size rows per round-trip, without materializing the table
+        """
         async with engine.begin() as connection:
             text_clause: TextClause = text("SELECT user_id, created_at " "FROM users")
-            cursor: CursorResult = await connection.execute(text_clause)
-            results: Sequence[Row] = cursor.fetchall()
-            results_row: list[User] = [
-                User.parse_obj(
-                    {
-                        "user_id": curr_row[0],
-                        "created_at": curr_row[1],
-                    }
-                )
-                for curr_row in results
-            ]
-        return results_row
+            stream: AsyncResult = await connection.stream(
+                text_clause.execution_options(yield_per=batch_size)
+            )
+            async for curr_row in stream:
+                yield User(user_id=curr_row[0], created_at=curr_row[1])
 
     @staticmethod
-    async def fetch_all_searches() -> list[SearchResults]:
+    async def fetch_all_users() -> list[User]:
+        return [user async for user in Fetch.stream_all_users()]
+
+    @staticmethod
+    async def stream_all_searches(
+        batch_size: int = 1000,
+    ) -> AsyncIterator[SearchResults]:
         async with engine.begin() as connection:
             text_clause: TextClause = text(
                 "SELECT search_id, "
                 "user_id, "
                 "search_term, "
                 "result, "
+                "result_compressed, "
                 "created_at "
                 "FROM search_results"
             )
+            stream: AsyncResult = await connection.stream(
+                text_clause.execution_options(yield_per=batch_size)
+            )
+            async for curr_row in stream:
+                yield SearchResults(
+                    search_id=curr_row[0],
+                    user_id=curr_row[1],
+                    search_term=curr_row[2],
+                    # the html is in either column, as the DAO reads it
+                    result=YahooSearchDAO._result_from_columns(
+                        curr_row[3], curr_row[4]
+                    ),
+                    created_at=curr_row[5],
+                )
+
+    @staticmethod
+    async def fetch_all_searches() -> list[SearchResults]:
+        return [search async for search in Fetch.stream_all_searches()]
+
+    @staticmethod
+    async def fetch_all_extracted_search_results() -> list[ExtractedSearchResult]:
+        async with engine.begin() as connection:
+            text_clause: TextClause = text(
+                "SELECT id, user_id, url, date, body, created_at "
+                "FROM extracted_search_results"
+            )
             cursor: CursorResult = await connection.execute(text_clause)
-            results: Sequence[Row] = cursor.fetchall()
-            results_row: list[SearchResults] = [
-                SearchResults.parse_obj(
-                    {
-                        "search_id": curr_row[0],
-                        "user_id": curr_row[1],
-                        "search_term": curr_row[2],
-                        "result": curr_row[3],
-                        "created_at": curr_row[4],
-                    }
+            return [
+                ExtractedSearchResult(
+                    id=curr_row[0],
+                    user_id=curr_row[1],
+                    url=curr_row[2],
+                    date=curr_row[3],
+                    body=curr_row[4],
+                    created_at=curr_row[5],
                 )
-                for curr_row in results
+                for curr_row in cursor.fetchall()
             ]
-        return results_row
+
+    @staticmethod
+    async def fetch_last_run(user_id: str) -> datetime | None:
+        async with engine.begin() as connection:
+            text_clause: TextClause = text(
+                "SELECT last_run FROM last_extracted_user_status "
+                "WHERE user_id = :user_id"
+            )
+            cursor: CursorResult = await connection.execute(
+                text_clause, {"user_id": user_id}
+            )
+            return cursor.scalar()
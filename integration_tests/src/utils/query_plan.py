@@ -0,0 +1,126 @@
+import json
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import CursorResult, TextClause, text
+
+from integration_tests.src.utils.engine import engine
+
+
+class QueryPlan:
+    @staticmethod
+    async def seed_search_results(
+        users: int, searches_per_user: int, terms: int, start: datetime
+    ) -> None:
+        """
+        Seeds users * searches_per_user synthetic rows, one every 10 seconds from start
+        - Generated by postgres itself (generate_series), not sent row by row
+        - ANALYZE afterwards, so the planner sees the real table size
+        """
+        async with engine.begin() as connection:
+            await connection.execute(
+                text(
+                    "INSERT INTO users (user_id, created_at) "
+                    "SELECT 'seed-user-' || g, :start "
+                    "FROM generate_series(1, :users) AS g"
+                ),
+                {"users": users, "start": start},
+            )
+            await connection.execute(
+                text(
+                    "INSERT INTO search_results "
+                    "(search_id, user_id, search_term, result, created_at) "
+                    "SELECT 'seed-search-' || g, "
+                    "'seed-user-' || (g % :users + 1), "
+                    "'seed term ' || (g % :terms), "
+                    "repeat('<div class=\"algo\">seed</div>', 50), "
+                    "CAST(:start AS timestamp) + g * interval '10 seconds' "
+                    "FROM generate_series(1, :rows) AS g"
+                ),
+                {
+                    "users": users,
+                    "terms": terms,
+                    "rows": users * searches_per_user,
+                    "start": start,
+                },
+            )
+        async with engine.connect() as connection:
+            # ANALYZE can't run inside a transaction block
+            autocommit = await connection.execution_options(
+                isolation_level="AUTOCOMMIT"
+            )
+            await autocommit.execute(text("ANALYZE users, search_results"))
+
+    @staticmethod
+    async def explain(text_clause: TextClause, params: dict[str, Any]) -> dict:
+        """
+        EXPLAIN (FORMAT JSON) of a query, with the same bind params the DAO passes
+        :return: the root plan node
+        """
+        async with engine.begin() as connection:
+            cursor: CursorResult = await connection.execute(
+                text(f"EXPLAIN (FORMAT JSON) {text_clause.text}"), params
+            )
+            plan: Any = cursor.scalar_one()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return plan[0]["Plan"]
+
+    @staticmethod
+    def scans(
+        plan: dict, relation: str | None = None
+    ) -> list[tuple[str, str | None, str | None]]:
+        """
+        Flattens a plan tree into its scan nodes
+        - A Bitmap Index Scan has no relation of its own; it gets its Bitmap Heap Scan's
+        :return: [(node type, relation name, index name), ...]
+        """
+        relation = plan.get("Relation Name", relation)
+        found: list[tuple[str, str | None, str | None]] = []
+        if "Scan" in plan["Node Type"]:
+            found.append((plan["Node Type"], relation, plan.get("Index Name")))
+        bitmap: bool = plan["Node Type"] in (
+            "Bitmap Heap Scan",
+            "BitmapAnd",
+            "BitmapOr",
+        )
+        for child in plan.get("Plans", []):
+            found.extend(QueryPlan.scans(child, relation if bitmap else None))
+        return found
+
+    @staticmethod
+    async def partitions(table: str) -> set[str]:
+        """
+        :return: the names of the partitions of table
+        """
+        async with engine.begin() as connection:
+            cursor: CursorResult = await connection.execute(
+                text(
+                    "SELECT c.relname "
+                    "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                    "WHERE i.inhparent = CAST(:table AS regclass)"
+                ),
+                {"table": table},
+            )
+            return {curr_row[0] for curr_row in cursor.fetchall()}
+
+    @staticmethod
+    async def parent_indexes(index_names: set[str]) -> dict[str, str]:
+        """
+        Maps the index of a partition to the index of the partitioned table it was
+        created from, e.g. ix_search_results_legacy_search_term_created_at
+        -> ix_search_results_search_term_created_at
+        - An index that isn't a partition's maps to itself
+        """
+        async with engine.begin() as connection:
+            cursor: CursorResult = await connection.execute(
+                text(
+                    "SELECT c.relname, COALESCE(p.relname, c.relname) "
+                    "FROM pg_class c "
+                    "LEFT JOIN pg_inherits i ON i.inhrelid = c.oid "
+                    "LEFT JOIN pg_class p ON p.oid = i.inhparent "
+                    "WHERE c.relname = ANY(:index_names)"
+                ),
+                {"index_names": list(index_names)},
+            )
+            return {curr_row[0]: curr_row[1] for curr_row in cursor.fetchall()}
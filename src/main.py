@@ -1,10 +1,59 @@
+import math
+from collections.abc import AsyncGenerator, AsyncIterator
+from contextlib import aclosing
+from datetime import datetime, timedelta, timezone
 from typing import Any
 
+import toml
 from aiohttp import web
+from src.models.api_datetime import API_DATETIME_FORMAT
+from src.models.batch_search_outcome import BatchSearchOutcome
+from src.models.search_analytics import (
+    SearchPeriodCount,
+    SearchTermCount,
+    UserSearchCount,
+)
+from src.models.search_hit import SearchHit
 from src.models.search_results import SearchResults
 from src.models.user import User
-from src.services.yahoo_search_dao import YahooSearchDAO
-from src.services.yahoo_search_service import YahooSearchService
+from src.services.search_analytics_refresher import (
+    SearchAnalyticsConfig,
+    SearchAnalyticsRefresher,
+)
+from src.services.search_cache import SearchCacheConfig, SearchResultCache
+from src.services.search_results_writer import (
+    SearchResultsWriter,
+    SearchResultsWriterConfig,
+)
+from src.services.yahoo_search_dao import ANALYTICS_PERIODS, YahooSearchDAO
+from src.services.yahoo_search_service import SearchBatchConfig, YahooSearchService
+from src.utils.async_retry import retry_stats
+from src.utils.circuit_breaker import (
+    CIRCUIT_STATES,
+    CircuitBreaker,
+    CircuitBreakerConfig,
+    CircuitOpenError,
+    CircuitState,
+)
+from src.utils.cpu_executor import CpuExecutor, CpuExecutorConfig
+from src.utils.db_engine import DatabasePoolStats
+from src.utils.deadline import DeadlineConfig, DeadlineExceeded, with_deadline
+from src.utils.event_loop import EventLoopConfig, new_event_loop
+from src.utils.http_client import HttpClientConfig
+from src.utils.json_response import json_response
+from src.utils.logging_utils import LoggingConfig, configure_logging, logging_stats
+from src.utils.metrics import (
+    STAGE_SECONDS,
+    Gauge,
+    Metric,
+    MetricsConfig,
+    metrics_middleware,
+    registry,
+    render_metrics,
+    stats_metrics,
+)
+from src.utils.ndjson_stream import NdjsonStream, NdjsonStreamConfig
+from src.utils.upstream_limiter import UpstreamLimiter, UpstreamLimiterConfig
 from dotenv import load_dotenv
 
 """
@@ -23,9 +72,63 @@ We will then, build on top, to expose our GoogleSearchService class to the serve
 
 # load environment variables from .env file in root
 load_dotenv()
-app: web.Application = web.Application()
-dao: YahooSearchDAO = YahooSearchDAO()
-search_engine: YahooSearchService = YahooSearchService(yahoo_search_dao=dao)
+
+"""
+Everything a handler needs lives on the app, under these keys
+- So each server process builds its own, after it is forked (see create_app)
+"""
+DAO: web.AppKey[YahooSearchDAO] = web.AppKey("dao", YahooSearchDAO)
+CPU_EXECUTOR: web.AppKey[CpuExecutor] = web.AppKey("cpu_executor", CpuExecutor)
+SEARCH_ENGINE: web.AppKey[YahooSearchService] = web.AppKey(
+    "search_engine", YahooSearchService
+)
+NDJSON_STREAM_CONFIG: web.AppKey[NdjsonStreamConfig] = web.AppKey(
+    "ndjson_stream_config", NdjsonStreamConfig
+)
+SEARCH_BATCH_CONFIG: web.AppKey[SearchBatchConfig] = web.AppKey(
+    "search_batch_config", SearchBatchConfig
+)
+ANALYTICS_CONFIG: web.AppKey[SearchAnalyticsConfig] = web.AppKey(
+    "analytics_config", SearchAnalyticsConfig
+)
+ANALYTICS_REFRESHER: web.AppKey[SearchAnalyticsRefresher] = web.AppKey(
+    "analytics_refresher", SearchAnalyticsRefresher
+)
+DEADLINE_CONFIG: web.AppKey[DeadlineConfig] = web.AppKey(
+    "deadline_config", DeadlineConfig
+)
+METRICS_CONFIG: web.AppKey[MetricsConfig] = web.AppKey("metrics_config", MetricsConfig)
+WORKER_INDEX: web.AppKey[int] = web.AppKey("worker_index", int)
+# on a worker's metrics app (see serve_worker_metrics): the app it reports on
+METRICS_OF: web.AppKey[web.Application] = web.AppKey("metrics_of", web.Application)
+
+
+async def start_search_engine(app: web.Application) -> None:
+    """
+    Runs on app startup, inside the server's event loop
+    - Opens the pooled ClientSession shared by every /search
+    - Starts the write-behind flusher of search results
+    - Starts the worker pool for CPU-bound parsing
+    - Starts refreshing the analytics rollups, if enabled
+    """
+    app[CPU_EXECUTOR].start()
+    await app[SEARCH_ENGINE].start()
+    if app[ANALYTICS_CONFIG].enabled:
+        await app[ANALYTICS_REFRESHER].start()
+
+
+async def close_search_engine(app: web.Application) -> None:
+    """
+    Runs on app shutdown
+    - Flushes every search result still queued for insert
+    - Closes the ClientSession and its keep-alive connections
+    - Shuts the parsing worker pool down
+    - Closes the database connection pool; last, once nothing queries it
+    """
+    await app[ANALYTICS_REFRESHER].close()
+    await app[SEARCH_ENGINE].close()
+    await app[CPU_EXECUTOR].close()
+    await app[DAO].close()
 
 
 async def hello_world_handle(request: web.Request) -> web.Response:
@@ -35,59 +138,560 @@ async def hello_world_handle(request: web.Request) -> web.Response:
     return web.Response(text="Hello World")
 
 
-async def search_yahoo_handle(request: web.Request) -> web.Response:
+async def health_handle(request: web.Request) -> web.Response:
+    """
+    For load balancers and uptime checks; always 200 while the server is up
+    - "status" is "degraded" while the circuit to Yahoo is not closed;
+    searches are then served stale, or fail fast with a 503
+    - Not a 503 itself: every worker shares the one Yahoo, so a load balancer
+    pulling them all would serve no stale results either
+    """
+    circuit_breaker: CircuitBreaker | None = request.app[SEARCH_ENGINE].circuit_breaker
+    if circuit_breaker is None:
+        return json_response({"status": "ok", "upstream_circuit": None})
+    state: CircuitState = circuit_breaker.state
+    calls, failure_rate = circuit_breaker.failure_rate()
+    return json_response(
+        {
+            "status": "ok" if state == "closed" else "degraded",
+            "upstream_circuit": {
+                "state": state,
+                "calls_in_window": calls,
+                "failure_rate": failure_rate,
+                "retry_after_seconds": circuit_breaker.retry_after_seconds,
+            },
+        }
+    )
+
+
+def circuit_open_response(request: web.Request, e: CircuitOpenError) -> web.Response:
+    """
+    503, with a Retry-After of when the circuit lets probes through again
+    """
+    circuit_breaker: CircuitBreaker | None = request.app[SEARCH_ENGINE].circuit_breaker
+    retry_after: float = (
+        circuit_breaker.retry_after_seconds if circuit_breaker is not None else 0.0
+    )
+    response: web.Response = json_response(
+        data={"error": f"Search is unavailable: {e}"}, status=503
+    )
+    response.headers["Retry-After"] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def request_budget(request: web.Request, default_seconds: float) -> float | None:
+    """
+    The seconds a request may take (see src/utils/deadline.py)
+    - default_seconds, or the client's own in the [deadline] header,
+    capped at max_seconds; None if deadlines are disabled
+    :raises ValueError: if the header is not a positive number
+    """
+    deadline_config: DeadlineConfig = request.app[DEADLINE_CONFIG]
+    if not deadline_config.enabled:
+        return None
+    header: str | None = request.headers.get(deadline_config.header)
+    if header is None:
+        return min(default_seconds, deadline_config.max_seconds)
+    seconds: float = float(header)
+    if not 0 < seconds < math.inf:
+        raise ValueError(f"{deadline_config.header} must be a positive number")
+    return min(seconds, deadline_config.max_seconds)
+
+
+async def search_yahoo_handle(request: web.Request) -> web.StreamResponse:
     """
     web.Request is a dictionary-like class
+
+    With "parse": true in the body, the response also has "hits";
+    the top 10 results parsed from the html
+
+    With "stream": true, the response is streamed as NDJSON instead
+    (see stream_search_result)
+
+    While Yahoo is down (see CircuitBreaker), the latest stored result
+    for the query is returned, with its original created_at; or a 503
+
+    The search and its insert run within the request's deadline
+    (search_seconds, or the client's header); a 504 once it runs out
     """
+    search_engine: YahooSearchService = request.app[SEARCH_ENGINE]
     data_from_user: dict[str, Any] = await request.json()
     try:
         search_query: str = data_from_user["query"]
         user_id: str = data_from_user["user_id"]
     except KeyError as e:
-        return web.json_response(
+        return json_response(
             data={"error": f"user_id and query not provided: {e}"}, status=400
         )
     try:
-        result: SearchResults = await search_engine.yahoo_search(
-            user_id=user_id, search_term=search_query
+        budget: float | None = request_budget(
+            request, request.app[DEADLINE_CONFIG].search_seconds
         )
+    except ValueError as e:
+        return json_response(data={"error": f"Bad header: {e}"}, status=400)
+    try:
+        with with_deadline(budget):
+            result: SearchResults = await search_engine.yahoo_search(
+                user_id=user_id, search_term=search_query
+            )
+    except DeadlineExceeded as e:
+        return json_response(data={"error": f"Timed out: {e}"}, status=504)
+    except CircuitOpenError as e:
+        return circuit_open_response(request, e)
     except Exception as e:
-        return web.json_response(
-            data={"error": f"Server ran into error: {e}"}, status=500
+        return json_response(data={"error": f"Server ran into error: {e}"}, status=500)
+
+    if data_from_user.get("stream"):
+        return await stream_search_result(
+            request, result, bool(data_from_user.get("parse"))
+        )
+    if not data_from_user.get("parse"):
+        with STAGE_SECONDS.labels("serialize").time():
+            return json_response(result)
+    final_result: dict[str, Any] = result.model_dump(mode="json")
+    hits: list[SearchHit] = await search_engine.parse_hits(result.result)
+    final_result["hits"] = [hit._asdict() for hit in hits]
+    with STAGE_SECONDS.labels("serialize").time():
+        return json_response(final_result)
+
+
+async def stream_search_result(
+    request: web.Request, result: SearchResults, parse: bool
+) -> web.StreamResponse:
+    """
+    "stream": true mode of /search; NDJSON
+    - First line: the search, without its html
+    - Then {"result": <chunk_size characters of the html>} lines,
+    or {"hit": ...} lines with "parse": true
+
+    The html is never copied whole into a dict or a JSON string
+    """
+    ndjson_stream_config: NdjsonStreamConfig = request.app[NDJSON_STREAM_CONFIG]
+    stream: NdjsonStream = NdjsonStream(request, ndjson_stream_config)
+    await stream.start()
+    try:
+        await stream.write(
+            {
+                "search_id": result.search_id,
+                "user_id": result.user_id,
+                "search_term": result.search_term,
+                "created_at": result.created_at.strftime(API_DATETIME_FORMAT),
+                "result_length": len(result.result) if result.result else None,
+            }
         )
+        if parse:
+            for hit in await request.app[SEARCH_ENGINE].parse_hits(result.result):
+                await stream.write({"hit": hit._asdict()})
+        elif result.result:
+            chunk_size: int = ndjson_stream_config.chunk_size
+            for start in range(0, len(result.result), chunk_size):
+                await stream.write(
+                    {"result": result.result[start : start + chunk_size]}
+                )
+    except ConnectionResetError:
+        # the client is gone; nothing left to write to
+        return stream.response
+    return await stream.close()
+
+
+async def search_yahoo_batch_handle(request: web.Request) -> web.StreamResponse:
+    """
+    Body: {"user_id": ..., "queries": ["tea", "coffee", ...]}
+
+    Streams one NDJSON line per query, in the order the searches complete
+    - {"index": <position in queries>, "query": ..., <the /search output>}
+    - or {"index": ..., "query": ..., "error": ...} if that search failed
+    Then a last line, once every search is persisted in one bulk insert
+    - {"persisted": <number of distinct searches stored>}, or {"error": ...}
 
-    final_result: dict[str, Any] = result.model_dump()
-    final_result["created_at"] = final_result["created_at"].strftime(
-        "%Y-%m-%d %H:%M:%S"
+    The searches and the insert run within the request's deadline
+    (batch_seconds, or the client's header); a search still running when
+    it runs out is yielded with its error, and not persisted
+    """
+    search_engine: YahooSearchService = request.app[SEARCH_ENGINE]
+    search_batch_config: SearchBatchConfig = request.app[SEARCH_BATCH_CONFIG]
+    data_from_user: dict[str, Any] = await request.json()
+    try:
+        queries: list[str] = data_from_user["queries"]
+        user_id: str = data_from_user["user_id"]
+    except KeyError as e:
+        return json_response(
+            data={"error": f"user_id and queries not provided: {e}"}, status=400
+        )
+    if (
+        not isinstance(queries, list)
+        or not queries
+        or not all(isinstance(query, str) for query in queries)
+        or len(queries) > search_batch_config.max_queries
+    ):
+        return json_response(
+            data={
+                "error": "queries must be a list of 1 to "
+                f"{search_batch_config.max_queries} strings"
+            },
+            status=400,
+        )
+
+    try:
+        budget: float | None = request_budget(
+            request, request.app[DEADLINE_CONFIG].batch_seconds
+        )
+    except ValueError as e:
+        return json_response(data={"error": f"Bad header: {e}"}, status=400)
+
+    stream: NdjsonStream = NdjsonStream(request, request.app[NDJSON_STREAM_CONFIG])
+    await stream.start()
+    persisted: int = 0
+    outcomes: AsyncGenerator[BatchSearchOutcome, None] = (
+        search_engine.yahoo_search_batch(
+            user_id, queries, search_batch_config.concurrency
+        )
     )
-    return web.json_response(data=final_result)
+    try:
+        # aclosing: if the client disconnects, the searches in flight are cancelled
+        with with_deadline(budget):
+            async with aclosing(outcomes):
+                async for outcome in outcomes:
+                    if outcome.persist:
+                        persisted += 1
+                    for index in outcome.indexes:
+                        line: dict[str, Any] = {
+                            "index": index,
+                            "query": queries[index],
+                        }
+                        if outcome.error is not None:
+                            line["error"] = f"Server ran into error: {outcome.error}"
+                        else:
+                            line.update(outcome.result.model_dump(mode="json"))
+                        await stream.write(line)
+        await stream.write({"persisted": persisted})
+    except ConnectionResetError:
+        # the client is gone; nothing left to write to
+        return stream.response
+    except Exception as e:
+        await stream.write({"error": f"Server ran into error: {e}"})
+    return await stream.close()
 
 
 async def create_user_handle(request: web.Request) -> web.Response:
     try:
         user: User = User.create_user()
-        await dao.insert_user(user)
+        await request.app[DAO].insert_user(user)
+    except Exception as e:
+        return json_response(data={"error": f"Server ran into error: {e}"}, status=500)
+    return json_response(user)
+
+
+def parse_query_datetime(value: str) -> datetime:
+    """
+    e.g 2024-04-08 15:00:00, in UTC like every created_at
+    - With an offset, e.g 2024-04-08T15:00:00+08:00, converted to UTC;
+    a naive and an aware datetime can't be compared
+    :raises ValueError: if value is malformed
+    """
+    parsed: datetime = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        return parsed
+    return parsed.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def parse_analytics_query(request: web.Request) -> tuple[datetime, datetime, int]:
+    """
+    Query params shared by the /analytics endpoints
+    - start, end: e.g 2024-04-08 15:00:00 (see parse_query_datetime);
+    default to the last default_window_hours
+    - limit: defaults to 10, capped at max_limit
+    :raises ValueError: if a param is malformed
+    """
+    analytics_config: SearchAnalyticsConfig = request.app[ANALYTICS_CONFIG]
+    end: datetime = (
+        parse_query_datetime(request.query["end"])
+        if "end" in request.query
+        else datetime.utcnow()
+    )
+    start: datetime = (
+        parse_query_datetime(request.query["start"])
+        if "start" in request.query
+        else end - timedelta(hours=analytics_config.default_window_hours)
+    )
+    limit: int = int(request.query.get("limit", 10))
+    if start >= end or limit < 1:
+        raise ValueError("start must be before end, and limit positive")
+    return start, end, min(limit, analytics_config.max_limit)
+
+
+async def top_search_terms_handle(request: web.Request) -> web.Response:
+    try:
+        start, end, limit = parse_analytics_query(request)
+    except ValueError as e:
+        return json_response(data={"error": f"Bad query: {e}"}, status=400)
+    try:
+        counts: list[SearchTermCount] = await request.app[DAO].fetch_top_search_terms(
+            start, end, limit
+        )
+    except Exception as e:
+        return json_response(data={"error": f"Server ran into error: {e}"}, status=500)
+    return json_response(counts)
+
+
+async def top_users_handle(request: web.Request) -> web.Response:
+    try:
+        start, end, limit = parse_analytics_query(request)
+    except ValueError as e:
+        return json_response(data={"error": f"Bad query: {e}"}, status=400)
+    try:
+        counts: list[UserSearchCount] = await request.app[DAO].fetch_top_users(
+            start, end, limit
+        )
     except Exception as e:
-        return web.json_response(
-            data={"error": f"Server ran into error: {e}"}, status=500
+        return json_response(data={"error": f"Server ran into error: {e}"}, status=500)
+    return json_response(counts)
+
+
+async def busiest_periods_handle(request: web.Request) -> web.Response:
+    """
+    period query param: hour (default), day, week or month
+    """
+    period: str = request.query.get("period", "hour")
+    try:
+        start, end, limit = parse_analytics_query(request)
+        if period not in ANALYTICS_PERIODS:
+            raise ValueError(f"period must be one of {ANALYTICS_PERIODS}")
+    except ValueError as e:
+        return json_response(data={"error": f"Bad query: {e}"}, status=400)
+    try:
+        counts: list[SearchPeriodCount] = await request.app[DAO].fetch_busiest_periods(
+            start, end, period, limit
         )
-    final_result: dict[str, Any] = user.model_dump()
-    final_result["created_at"] = final_result["created_at"].strftime(
-        "%Y-%m-%d %H:%M:%S"
+    except Exception as e:
+        return json_response(data={"error": f"Server ran into error: {e}"}, status=500)
+    return json_response(counts)
+
+
+async def metrics_handle(request: web.Request) -> web.Response:
+    """
+    Prometheus scrapes this; the text exposition format
+    - The request, stage and upstream metrics (see src/utils/metrics.py)
+    - Plus the stats the services keep, read now
+    """
+    return web.Response(
+        text=render_metrics(collect_metrics(request.app)),
+        content_type="text/plain",
+        charset="utf-8",
     )
-    return web.json_response(data=final_result)
 
 
-"""   
-Defines the routes the users can hit
-"""
-app.add_routes(
-    [
-        web.get("/hello_world", hello_world_handle),
-        web.post("/search", search_yahoo_handle),
-        web.post("/create_user", create_user_handle),
-    ]
-)
+async def worker_metrics_handle(request: web.Request) -> web.Response:
+    """
+    /metrics on this worker's own port; the metrics of the app it serves
+    """
+    return web.Response(
+        text=render_metrics(collect_metrics(request.app[METRICS_OF])),
+        content_type="text/plain",
+        charset="utf-8",
+    )
+
+
+def collect_metrics(app: web.Application) -> list[Metric[Any]]:
+    search_engine: YahooSearchService = app[SEARCH_ENGINE]
+    metrics: list[Metric[Any]] = registry.collect()
+    pool_stats: DatabasePoolStats = app[DAO].pool_stats
+    metrics += stats_metrics(
+        "db_pool",
+        pool_stats,
+        counters=("checkouts", "timeouts", "checkout_wait_seconds"),
+    )
+    # a property, which stats_metrics doesn't read
+    pool_saturation: Gauge = Gauge(
+        "db_pool_saturation",
+        "Share of the connections the pool may open, in use now",
+    )
+    pool_saturation.set(pool_stats.saturation)
+    metrics.append(pool_saturation)
+    metrics += stats_metrics(
+        "single_flight",
+        search_engine.single_flight_stats,
+        counters=("originated", "coalesced"),
+    )
+    if search_engine.search_cache_stats is not None:
+        metrics += stats_metrics(
+            "search_cache",
+            search_engine.search_cache_stats,
+            counters=("memory_hits", "database_hits", "misses", "evictions"),
+        )
+    if search_engine.circuit_breaker is not None:
+        circuit_state: Gauge = Gauge(
+            "upstream_circuit_state",
+            "1 for the state the circuit to Yahoo is in, 0 for the others",
+            ("state",),
+        )
+        for state in CIRCUIT_STATES:
+            circuit_state.labels(state).set(
+                1.0 if state == search_engine.circuit_breaker.state else 0.0
+            )
+        metrics.append(circuit_state)
+        metrics += stats_metrics(
+            "upstream_circuit",
+            search_engine.circuit_breaker.stats,
+            counters=("successes", "failures", "rejected", "opened"),
+        )
+    if search_engine.upstream_limiter_stats is not None:
+        metrics += stats_metrics(
+            "upstream_limiter",
+            search_engine.upstream_limiter_stats,
+            counters=(
+                "acquired",
+                "queue_timeouts",
+                "queue_wait_seconds",
+                "throttled",
+                "rate_decreases",
+                "rate_increases",
+            ),
+        )
+    if search_engine.search_results_writer_stats is not None:
+        metrics += stats_metrics(
+            "search_results_writer",
+            search_engine.search_results_writer_stats,
+            counters=(
+                "enqueued",
+                "flushed_rows",
+                "flushed_batches",
+                "failed_rows",
+                "backpressure_waits",
+            ),
+        )
+    metrics += stats_metrics(
+        "search_analytics",
+        app[ANALYTICS_REFRESHER].stats,
+        counters=("refreshes", "failed_refreshes", "rolled_up_rows"),
+    )
+    for name, retry in retry_stats.items():
+        metrics += stats_metrics(
+            "retry",
+            retry,
+            counters=("calls", "attempts", "failed_attempts", "exhausted"),
+            labels=(("name", name),),
+        )
+    metrics += stats_metrics("logging", logging_stats, counters=("dropped",))
+    return metrics
+
+
+async def serve_worker_metrics(app: web.Application) -> AsyncIterator[None]:
+    """
+    With [metrics] worker_port_base set; this worker's metrics on a port of its own
+    - On the shared server port, any worker may answer a scrape (see src/server.py)
+    - reuse_port: on a reload, the new worker binds while the old one finishes
+    """
+    metrics_config: MetricsConfig = app[METRICS_CONFIG]
+    assert metrics_config.worker_port_base is not None
+    metrics_app: web.Application = web.Application()
+    metrics_app[METRICS_OF] = app
+    metrics_app.router.add_get("/metrics", worker_metrics_handle)
+    runner: web.AppRunner = web.AppRunner(metrics_app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(
+        runner,
+        metrics_config.worker_host,
+        metrics_config.worker_port_base + app[WORKER_INDEX],
+        reuse_port=True,
+    ).start()
+    yield
+    await runner.cleanup()
+
+
+def create_app(config: dict[str, Any], worker_index: int = 0) -> web.Application:
+    """
+    :param config: the parsed local_config/config.toml
+    :param worker_index: the server worker building it (see src/server.py); 0 .. workers - 1
+
+    Builds a new app, with its own DAO (and its engine's connection pool),
+    search service (and its ClientSession) and worker pool
+    - Nothing here is created at import time; a forked server worker
+    must not share any of them with its parent (see src/server.py)
+    - Nothing binds to an event loop before app startup
+    """
+    configure_logging(LoggingConfig(**config.get("logging", {})))
+    metrics_config: MetricsConfig = MetricsConfig(**config.get("metrics", {}))
+    app: web.Application = web.Application(
+        middlewares=[metrics_middleware] if metrics_config.enabled else []
+    )
+    dao: YahooSearchDAO = YahooSearchDAO(config["database"])
+    search_cache_config: SearchCacheConfig = SearchCacheConfig(
+        **config.get("search_cache", {})
+    )
+    search_results_writer_config: SearchResultsWriterConfig = SearchResultsWriterConfig(
+        **config.get("search_results_writer", {})
+    )
+    cpu_executor: CpuExecutor = CpuExecutor(
+        CpuExecutorConfig(**config.get("cpu_executor", {}))
+    )
+    analytics_config: SearchAnalyticsConfig = SearchAnalyticsConfig(
+        **config.get("analytics", {})
+    )
+    upstream_limiter_config: UpstreamLimiterConfig = UpstreamLimiterConfig(
+        **config.get("upstream_limiter", {})
+    )
+    circuit_breaker_config: CircuitBreakerConfig = CircuitBreakerConfig(
+        **config.get("circuit_breaker", {})
+    )
+    app[DAO] = dao
+    app[CPU_EXECUTOR] = cpu_executor
+    app[SEARCH_ENGINE] = YahooSearchService(
+        yahoo_search_dao=dao,
+        http_client_config=HttpClientConfig(**config.get("http_client", {})),
+        search_cache=(
+            SearchResultCache(dao, search_cache_config)
+            if search_cache_config.enabled
+            else None
+        ),
+        search_results_writer=(
+            SearchResultsWriter(dao, search_results_writer_config)
+            if search_results_writer_config.enabled
+            else None
+        ),
+        cpu_executor=cpu_executor,
+        upstream_limiter=(
+            UpstreamLimiter(upstream_limiter_config)
+            if upstream_limiter_config.enabled
+            else None
+        ),
+        circuit_breaker=(
+            CircuitBreaker(circuit_breaker_config)
+            if circuit_breaker_config.enabled
+            else None
+        ),
+    )
+    app[NDJSON_STREAM_CONFIG] = NdjsonStreamConfig(**config.get("ndjson_stream", {}))
+    app[SEARCH_BATCH_CONFIG] = SearchBatchConfig(**config.get("search_batch", {}))
+    app[ANALYTICS_CONFIG] = analytics_config
+    app[ANALYTICS_REFRESHER] = SearchAnalyticsRefresher(dao, analytics_config)
+    app[DEADLINE_CONFIG] = DeadlineConfig(**config.get("deadline", {}))
+    app[METRICS_CONFIG] = metrics_config
+    app[WORKER_INDEX] = worker_index
+
+    """
+    Defines the routes the users can hit
+    """
+    app.on_startup.append(start_search_engine)
+    app.on_cleanup.append(close_search_engine)
+    app.add_routes(
+        [
+            web.get("/hello_world", hello_world_handle),
+            web.get("/health", health_handle),
+            web.post("/search", search_yahoo_handle),
+            web.post("/search/batch", search_yahoo_batch_handle),
+            web.post("/create_user", create_user_handle),
+            web.get("/analytics/top_search_terms", top_search_terms_handle),
+            web.get("/analytics/top_users", top_users_handle),
+            web.get("/analytics/busiest_periods", busiest_periods_handle),
+        ]
+    )
+    if metrics_config.enabled:
+        app.router.add_get("/metrics", metrics_handle)
+        if metrics_config.worker_port_base is not None:
+            app.cleanup_ctx.append(serve_worker_metrics)
+    return app
+
 
 if __name__ == "__main__":
     """
@@ -96,5 +700,13 @@ if __name__ == "__main__":
     of the docker container / virtual machine
 
     If it is localhost, it won't accept it
+
+    This runs a single process; python -m src.server runs one per CPU core
     """
-    web.run_app(app, host="0.0.0.0", port=8080)
+    main_config: dict[str, Any] = toml.load("local_config/config.toml")
+    web.run_app(
+        create_app(main_config),
+        host="0.0.0.0",
+        port=8080,
+        loop=new_event_loop(EventLoopConfig(**main_config.get("event_loop", {}))),
+    )
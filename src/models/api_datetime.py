@@ -0,0 +1,20 @@
+from datetime import datetime
+from typing import Annotated
+
+from pydantic import PlainSerializer
+
+API_DATETIME_FORMAT: str = "%Y-%m-%d %H:%M:%S"
+
+"""
+A datetime, serialized as e.g "2024-04-08 15:38:03" in JSON
+- model_dump_json / pydantic_core.to_json format it natively, while serializing
+- model_dump() still gives back the datetime itself
+"""
+ApiDatetime = Annotated[
+    datetime,
+    PlainSerializer(
+        lambda value: value.strftime(API_DATETIME_FORMAT),
+        return_type=str,
+        when_used="json",
+    ),
+]
@@ -0,0 +1,20 @@
+from typing import NamedTuple
+
+from src.models.search_results import SearchResults
+
+
+class BatchSearchOutcome(NamedTuple):
+    """
+    One distinct search term of a batch, once it has been searched
+
+    - indexes: positions of the term in the batch; repeated terms are searched once
+    - result: the search, with result=None if it failed
+    - error: why it failed, None if it succeeded
+    - persist: False if the result is not to be stored; a stale result
+    served while Yahoo is down, or a search that failed fast (see CircuitBreaker)
+    """
+
+    indexes: list[int]
+    result: SearchResults
+    error: Exception | None
+    persist: bool = True
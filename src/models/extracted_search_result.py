@@ -0,0 +1,33 @@
+from datetime import datetime
+import uuid
+
+from pydantic import BaseModel, ConfigDict, SkipValidation
+
+from src.models.search_hit import SearchHit
+
+
+class ExtractedSearchResult(BaseModel):
+    id: str
+    user_id: str
+    url: str | None
+    date: str | None
+    body: str | None
+    created_at: SkipValidation[datetime]
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    @staticmethod
+    def create(
+        user_id: str, hit: SearchHit, created_at: datetime
+    ) -> "ExtractedSearchResult":
+        """
+        created_at is when the search was made, not when it was extracted
+        - So extracted rows line up with their search_results row in time
+        """
+        return ExtractedSearchResult(
+            id=str(uuid.uuid4()),
+            user_id=user_id,
+            url=hit.url,
+            date=hit.date,
+            body=hit.body,
+            created_at=created_at,
+        )
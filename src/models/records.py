@@ -0,0 +1,46 @@
+from datetime import datetime
+from typing import NamedTuple
+
+from src.models.search_results import SearchResults
+from src.models.user import User
+
+"""
+Rows of our own tables, as read in bulk by YahooSearchDAO
+
+NamedTuples rather than pydantic models
+- A pydantic model per row costs a validator call, and a __dict__
+plus pydantic's own bookkeeping per instance
+- A NamedTuple is one tuple; no per-instance __dict__, nothing to validate
+- These rows come from our own database; they were validated on the way in
+
+Convert to the pydantic model only at the API boundary, with to_model()
+- Through the regular constructor, not model_construct
+- model_construct skips validation, but is plain python;
+pydantic-core's validator is ~2x faster for these few str / datetime fields
+(see benchmarks/bench_bulk_reads.py)
+"""
+
+
+class SearchRecord(NamedTuple):
+    search_id: str
+    user_id: str
+    search_term: str
+    result: str | None
+    created_at: datetime
+
+    def to_model(self) -> SearchResults:
+        return SearchResults(
+            search_id=self.search_id,
+            user_id=self.user_id,
+            search_term=self.search_term,
+            result=self.result,
+            created_at=self.created_at,
+        )
+
+
+class UserRecord(NamedTuple):
+    user_id: str
+    created_at: datetime
+
+    def to_model(self) -> User:
+        return User(user_id=self.user_id, created_at=self.created_at)
@@ -0,0 +1,19 @@
+from pydantic import BaseModel, ConfigDict, SkipValidation
+
+from src.models.api_datetime import ApiDatetime
+
+
+class SearchTermCount(BaseModel):
+    search_term: str
+    searches: int
+
+
+class UserSearchCount(BaseModel):
+    user_id: str
+    searches: int
+
+
+class SearchPeriodCount(BaseModel):
+    period_start: SkipValidation[ApiDatetime]
+    searches: int
+    model_config = ConfigDict(arbitrary_types_allowed=True)
@@ -0,0 +1,16 @@
+from typing import NamedTuple
+
+
+class SearchHit(NamedTuple):
+    """
+    One organic result on a Yahoo search results page
+
+    A NamedTuple rather than a pydantic model
+    - A page has ~10 of them, parsed from html we just scraped; nothing to validate
+    - They are cheap to build, and to pickle across processes
+    """
+
+    title: str
+    url: str
+    date: str | None
+    body: str | None
@@ -3,13 +3,15 @@ import uuid
 
 from pydantic import BaseModel, ConfigDict, SkipValidation
 
+from src.models.api_datetime import ApiDatetime
+
 
 class SearchResults(BaseModel):
     search_id: str
     user_id: str
     search_term: str
     result: str | None
-    created_at: SkipValidation[datetime]
+    created_at: SkipValidation[ApiDatetime]
     model_config = ConfigDict(arbitrary_types_allowed=True)
 
     @staticmethod
@@ -21,3 +23,13 @@ class SearchResults(BaseModel):
             result=result,
             created_at=datetime.utcnow(),
         )
+
+    @staticmethod
+    def normalize_search_term(search_term: str) -> str:
+        """
+        Key for searches that give the same Yahoo results
+        - "  Euro  2024" and "euro 2024"
+        - Concurrent searches are coalesced on it, and the search_cache is keyed on it
+        - search_results stores it, rather than the term as typed
+        """
+        return " ".join(search_term.split()).casefold()
@@ -0,0 +1,13 @@
+from datetime import datetime
+from typing import NamedTuple
+
+
+class SearchResultsPartition(NamedTuple):
+    """
+    A range partition of search_results, holding start <= created_at < end
+    - start is None for search_results_legacy, which starts at MINVALUE
+    """
+
+    name: str
+    start: datetime | None
+    end: datetime | None
@@ -2,10 +2,12 @@ import uuid
 from datetime import datetime
 from pydantic import BaseModel, ConfigDict, SkipValidation
 
+from src.models.api_datetime import ApiDatetime
+
 
 class User(BaseModel):
     user_id: str
-    created_at: SkipValidation[datetime]
+    created_at: SkipValidation[ApiDatetime]
     model_config = ConfigDict(arbitrary_types_allowed=True)
 
     @staticmethod
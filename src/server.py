@@ -0,0 +1,318 @@
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import socket
+import time
+from collections.abc import AsyncIterator, Callable
+from typing import Any
+
+import toml
+from aiohttp import web
+from pydantic import BaseModel
+
+from src.utils.logging_utils import setup_logging, stop_logging
+
+"""
+The signals the master waits for; blocked, then read with sigtimedwait,
+so they are never handled in the middle of spawning or reaping a worker
+"""
+MASTER_SIGNALS: set[signal.Signals] = {
+    signal.SIGCHLD,
+    signal.SIGHUP,
+    signal.SIGINT,
+    signal.SIGTERM,
+}
+
+
+class ServerConfig(BaseModel):
+    """
+    Loaded from the [server] section of local_config/config.toml
+
+    - workers: server processes; None runs one per CPU core
+    - backlog: connections queued on the listening socket, waiting to be accepted
+    - shutdown_timeout_seconds: a stopping worker waits this long for its
+    requests in flight, then closes whatever is left
+    - min_uptime_seconds: a worker exiting sooner than this failed to boot
+    (e.g bad config); the master stops instead of respawning it in a loop
+    """
+
+    host: str = "0.0.0.0"
+    port: int = 8080
+    workers: int | None = None
+    backlog: int = 1024
+    shutdown_timeout_seconds: float = 30.0
+    min_uptime_seconds: float = 1.0
+
+    @property
+    def worker_count(self) -> int:
+        return self.workers or os.cpu_count() or 1
+
+
+class PreforkServer:
+    """
+    Runs the aiohttp app in `workers` processes, sharing one listening socket
+
+    Why?
+    - One process runs one event loop, on one core; parsing, JSON encoding
+    and the DB driver all compete for it
+    - N processes accepting from the same socket use N cores,
+    and the kernel hands each new connection to whichever worker accepts first
+
+    The master only binds the socket, forks and supervises
+    - Each worker builds its own app after the fork, with app_factory:
+    its own event loop, DAO engine (connection pool) and ClientSession
+    - app_factory is given the worker's index, 0 .. workers - 1; a worker that dies,
+    or is reloaded, is replaced by one with the same index
+    (e.g so each worker serves its metrics on a port of its own)
+
+    Signals, to the master
+    - SIGHUP: graceful reload. A new set of workers is forked, with the config
+    re-read, then the old ones are sent SIGTERM. The socket stays open in the
+    master, so no connection is refused meanwhile
+    - SIGTERM / SIGINT: graceful shutdown. Every worker is sent SIGTERM and
+    waited for, up to shutdown_timeout_seconds, then killed
+
+    A worker on SIGTERM (aiohttp's run_app) stops accepting, finishes the
+    requests in flight, then runs the app's on_cleanup (e.g flushing the
+    search results still queued for insert)
+    """
+
+    def __init__(
+        self,
+        config: ServerConfig,
+        app_factory: Callable[[int], web.Application],
+        loop_factory: Callable[[], asyncio.AbstractEventLoop] = asyncio.new_event_loop,
+    ) -> None:
+        """
+        Both factories run in each worker, after the fork
+        """
+        self.__logger: logging.Logger = logging.getLogger(__name__)
+        self.__config: ServerConfig = config
+        self.__app_factory: Callable[[int], web.Application] = app_factory
+        self.__loop_factory: Callable[[], asyncio.AbstractEventLoop] = loop_factory
+        self.__socket: socket.socket | None = None
+        # pid -> time.monotonic() it was forked at
+        self.__workers: dict[int, float] = {}
+        # pid -> the worker's index; of the workers and the retiring ones
+        self.__indexes: dict[int, int] = {}
+        # workers sent SIGTERM by a reload, not waited for yet
+        self.__retiring: set[int] = set()
+        setup_logging(self.__logger)
+
+    @property
+    def workers(self) -> list[int]:
+        return list(self.__workers)
+
+    def bind(self) -> int:
+        """
+        Opens the listening socket, before any worker is forked
+        :return: the port; useful with port 0, which lets the OS pick one
+        """
+        if self.__socket is None:
+            sock: socket.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.bind((self.__config.host, self.__config.port))
+            sock.listen(self.__config.backlog)
+            sock.setblocking(False)
+            self.__socket = sock
+        port: int = self.__socket.getsockname()[1]
+        return port
+
+    def run(self) -> None:
+        """
+        Blocks until SIGTERM / SIGINT, or until a worker fails to boot
+        """
+        port: int = self.bind()
+        signal.pthread_sigmask(signal.SIG_BLOCK, MASTER_SIGNALS)
+        try:
+            self.__logger.info(
+                "Listening on %s:%d with %d workers",
+                self.__config.host,
+                port,
+                self.__config.worker_count,
+            )
+            for index in range(self.__config.worker_count):
+                self._spawn(index)
+            while self.__workers:
+                info: signal.struct_siginfo | None = signal.sigtimedwait(
+                    MASTER_SIGNALS, 1.0
+                )
+                signo: int | None = info.si_signo if info is not None else None
+                # before reaping; on Ctrl-C, the workers exit too, not to be replaced
+                if signo in (signal.SIGTERM, signal.SIGINT):
+                    self.__logger.info("Shutting down")
+                    break
+                if not self._reap():
+                    break
+                if signo == signal.SIGHUP:
+                    self._reload()
+        finally:
+            self._stop()
+            signal.pthread_sigmask(signal.SIG_UNBLOCK, MASTER_SIGNALS)
+            if self.__socket is not None:
+                self.__socket.close()
+                self.__socket = None
+
+    def _spawn(self, index: int) -> int:
+        pid: int = os.fork()
+        if pid == 0:
+            self._run_worker(index)
+        self.__workers[pid] = time.monotonic()
+        self.__indexes[pid] = index
+        return pid
+
+    def _run_worker(self, index: int) -> None:
+        """
+        In the forked child; never returns
+        """
+        exit_code: int = 0
+        try:
+            # the master's blocked signals are inherited; aiohttp handles
+            # SIGTERM / SIGINT in the worker, and SIGHUP is for the master only
+            signal.signal(signal.SIGHUP, signal.SIG_IGN)
+            signal.pthread_sigmask(signal.SIG_UNBLOCK, MASTER_SIGNALS)
+            app: web.Application = self.__app_factory(index)
+            app.cleanup_ctx.append(PreforkServer._watch_master)
+            web.run_app(
+                app,
+                loop=self.__loop_factory(),
+                sock=self.__socket,
+                shutdown_timeout=self.__config.shutdown_timeout_seconds,
+                print=None,
+            )
+        except Exception as e:
+            self.__logger.error("Worker %d failed: %s", os.getpid(), e)
+            exit_code = 1
+        finally:
+            # skip the parent's atexit handlers and buffers, inherited by the fork;
+            # so write out the queued logs first
+            stop_logging()
+            os._exit(exit_code)
+
+    @staticmethod
+    async def _watch_master(app: web.Application) -> AsyncIterator[None]:
+        """
+        A worker whose master died (e.g SIGKILL) is re-parented;
+        it shuts itself down gracefully rather than serve on unsupervised
+        """
+        master_pid: int = os.getppid()
+
+        async def watch() -> None:
+            while os.getppid() == master_pid:
+                await asyncio.sleep(1.0)
+            os.kill(os.getpid(), signal.SIGTERM)
+
+        task: asyncio.Task[None] = asyncio.create_task(watch())
+        yield
+        task.cancel()
+
+    def _reap(self) -> bool:
+        """
+        Collects the workers that exited, and replaces the ones that died
+        :return: False if a worker failed to boot, and the server must stop
+        """
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return True
+            if pid == 0:
+                return True
+            index: int | None = self.__indexes.pop(pid, None)
+            if pid in self.__retiring:
+                self.__retiring.discard(pid)
+                continue
+            started: float | None = self.__workers.pop(pid, None)
+            if started is None or index is None:
+                continue
+            exit_code: int = os.waitstatus_to_exitcode(status)
+            self.__logger.error("Worker %d exited with %d", pid, exit_code)
+            if time.monotonic() - started < self.__config.min_uptime_seconds:
+                self.__logger.error("Worker %d failed to boot; stopping", pid)
+                return False
+            self._spawn(index)
+
+    def _reload(self) -> None:
+        old_workers: list[int] = list(self.__workers)
+        self.__workers = {}
+        # the new workers take over the old ones' indexes, while they finish
+        for index in range(self.__config.worker_count):
+            self._spawn(index)
+        for pid in old_workers:
+            self._kill(pid, signal.SIGTERM)
+            self.__retiring.add(pid)
+        self.__logger.info("Reloaded; retiring workers %s", old_workers)
+
+    def _stop(self) -> None:
+        """
+        SIGTERM to every worker, then SIGKILL to those still running at the deadline
+        """
+        remaining: set[int] = set(self.__workers) | self.__retiring
+        for pid in remaining:
+            self._kill(pid, signal.SIGTERM)
+        # a little longer than the workers' own shutdown_timeout, for on_cleanup
+        deadline: float = (
+            time.monotonic() + self.__config.shutdown_timeout_seconds + 5.0
+        )
+        while remaining and time.monotonic() < deadline:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                time.sleep(0.05)
+                continue
+            remaining.discard(pid)
+        for pid in remaining:
+            self.__logger.error("Worker %d did not stop in time; killing it", pid)
+            self._kill(pid, signal.SIGKILL)
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+        self.__workers = {}
+        self.__indexes = {}
+        self.__retiring = set()
+
+    @staticmethod
+    def _kill(pid: int, signum: signal.Signals) -> None:
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            pass
+
+
+if __name__ == "__main__":
+    """
+    Production entry point; one server process per CPU core:
+    python -m src.server
+
+    kill -HUP <master pid> reloads the workers, e.g after editing the config
+    kill -TERM <master pid> shuts them down gracefully
+    """
+    from src.main import create_app
+    from src.utils.event_loop import EventLoopConfig, new_event_loop
+    from src.utils.logging_utils import LoggingConfig, configure_logging
+
+    parser: argparse.ArgumentParser = argparse.ArgumentParser()
+    parser.add_argument("--config", default="local_config/config.toml")
+    parser.add_argument("--host")
+    parser.add_argument("--port", type=int)
+    parser.add_argument("--workers", type=int)
+    args: argparse.Namespace = parser.parse_args()
+    config: dict[str, Any] = toml.load(args.config)
+    configure_logging(LoggingConfig(**config.get("logging", {})))
+    server_config: dict[str, Any] = config.get("server", {})
+    for option in ("host", "port", "workers"):
+        if getattr(args, option) is not None:
+            server_config[option] = getattr(args, option)
+    PreforkServer(
+        ServerConfig(**server_config),
+        # re-read in each worker, so a SIGHUP reload picks up config changes
+        lambda index: create_app(toml.load(args.config), worker_index=index),
+        lambda: new_event_loop(
+            EventLoopConfig(**toml.load(args.config).get("event_loop", {}))
+        ),
+    ).run()
@@ -0,0 +1,106 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any
+
+import toml
+from pydantic import BaseModel
+
+from src.services.yahoo_search_dao import YahooSearchDAO
+from src.utils.event_loop import EventLoopConfig, run_event_loop
+from src.utils.logging_utils import setup_logging
+
+
+class CompressResultsBackfillConfig(BaseModel):
+    """
+    Loaded from the [compress_results_backfill] section of local_config/config.toml
+
+    - chunk_size: rows converted per transaction
+    - pause_seconds: sleep between chunks, to leave I/O for the live server
+    """
+
+    chunk_size: int = 100
+    pause_seconds: float = 0.1
+
+
+@dataclass
+class BackfillReport:
+    rows: int = 0
+    raw_bytes: int = 0
+    compressed_bytes: int = 0
+    seconds: float = 0.0
+
+    @property
+    def compression_ratio(self) -> float:
+        return self.raw_bytes / self.compressed_bytes if self.compressed_bytes else 0.0
+
+
+class CompressResultsBackfill:
+    """
+    Converts existing search_results rows to compressed storage, chunk by chunk
+
+    Turn compress_results on in [database] first, so no new uncompressed rows appear
+    - Reads keep working during the backfill;
+    YahooSearchDAO reads whichever of result / result_compressed a row has
+    - Safe to stop and re-run; it only picks rows that are not converted yet
+
+    The space of the old html is reclaimed by autovacuum
+    (or VACUUM FULL search_results, which locks the table, in a maintenance window)
+    """
+
+    def __init__(
+        self, yahoo_search_dao: YahooSearchDAO, config: CompressResultsBackfillConfig
+    ) -> None:
+        self.__logger: logging.Logger = logging.getLogger(__name__)
+        self.__yahoo_search_dao: YahooSearchDAO = yahoo_search_dao
+        self.__config: CompressResultsBackfillConfig = config
+        setup_logging(self.__logger)
+
+    async def run(self) -> BackfillReport:
+        report: BackfillReport = BackfillReport()
+        start: float = time.perf_counter()
+        while True:
+            rows, raw_bytes, compressed_bytes = (
+                await self.__yahoo_search_dao.compress_results_chunk(
+                    self.__config.chunk_size
+                )
+            )
+            report.rows += rows
+            report.raw_bytes += raw_bytes
+            report.compressed_bytes += compressed_bytes
+            if rows:
+                self.__logger.info("Compressed %d rows so far", report.rows)
+            if rows < self.__config.chunk_size:
+                break
+            await asyncio.sleep(self.__config.pause_seconds)
+        report.seconds = time.perf_counter() - start
+        return report
+
+
+if __name__ == "__main__":
+    """
+    python -m src.services.compress_results_backfill
+    """
+    config: dict[str, Any] = toml.load("local_config/config.toml")
+    backfill_dao: YahooSearchDAO = YahooSearchDAO(config["database"])
+    backfill: CompressResultsBackfill = CompressResultsBackfill(
+        backfill_dao,
+        CompressResultsBackfillConfig(**config.get("compress_results_backfill", {})),
+    )
+
+    async def run_backfill() -> BackfillReport:
+        try:
+            return await backfill.run()
+        finally:
+            await backfill_dao.close()
+
+    backfill_report: BackfillReport = run_event_loop(
+        run_backfill(), EventLoopConfig(**config.get("event_loop", {}))
+    )
+    print(
+        f"Compressed {backfill_report.rows} rows in {backfill_report.seconds:.2f}s: "
+        f"{backfill_report.raw_bytes / 1024 / 1024:.1f} MB -> "
+        f"{backfill_report.compressed_bytes / 1024 / 1024:.1f} MB "
+        f"(ratio {backfill_report.compression_ratio:.1f}x)"
+    )
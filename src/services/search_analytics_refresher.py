@@ -0,0 +1,130 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any
+
+import toml
+from pydantic import BaseModel
+
+from src.services.yahoo_search_dao import YahooSearchDAO
+from src.utils.event_loop import EventLoopConfig, run_event_loop
+from src.utils.logging_utils import setup_logging
+
+
+class SearchAnalyticsConfig(BaseModel):
+    """
+    Loaded from the [analytics] section of local_config/config.toml
+
+    - enabled: refresh the rollups in the background of the server
+    - refresh_interval_seconds: time between two refreshes
+    - lag_seconds: searches newer than this are left for the next refresh
+    (search results are written behind, so the newest rows may not be inserted yet)
+    - default_window_hours: window of the /analytics endpoints without start / end
+    - max_limit: most rows an /analytics endpoint returns
+    """
+
+    enabled: bool = True
+    refresh_interval_seconds: float = 60
+    lag_seconds: float = 60
+    default_window_hours: int = 24
+    max_limit: int = 100
+
+
+@dataclass
+class SearchAnalyticsStats:
+    refreshes: int = 0
+    failed_refreshes: int = 0
+    rolled_up_rows: int = 0
+    last_refreshed_until: datetime | None = None
+
+
+class SearchAnalyticsRefresher:
+    """
+    Keeps search_terms_hourly and user_searches_hourly up to date
+
+    Why rollups?
+    - A GROUP BY over search_results reads every row in the window;
+    tens of millions of rows for a month
+    - The hourly rollups hold one row per (hour, term) and (hour, user)
+    - Each refresh only reads the searches made since the previous one
+    (see YahooSearchDAO.refresh_search_rollups)
+
+    The /analytics endpoints are therefore behind by up to
+    lag_seconds + refresh_interval_seconds
+    """
+
+    def __init__(
+        self, yahoo_search_dao: YahooSearchDAO, config: SearchAnalyticsConfig
+    ) -> None:
+        self.__logger: logging.Logger = logging.getLogger(__name__)
+        self.__yahoo_search_dao: YahooSearchDAO = yahoo_search_dao
+        self.__config: SearchAnalyticsConfig = config
+        self.__refresher: asyncio.Task[None] | None = None
+        self.stats: SearchAnalyticsStats = SearchAnalyticsStats()
+        setup_logging(self.__logger)
+
+    async def start(self) -> None:
+        """
+        Starts refreshing periodically, inside the running event loop
+        """
+        if self.__refresher is not None:
+            return
+        self.__refresher = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self.__refresher is None:
+            return
+        self.__refresher.cancel()
+        try:
+            await self.__refresher
+        except asyncio.CancelledError:
+            pass
+        self.__refresher = None
+
+    async def refresh(self) -> int:
+        """
+        Rolls up every search made until lag_seconds ago
+        :return: number of searches rolled up
+        """
+        until: datetime = datetime.utcnow() - timedelta(
+            seconds=self.__config.lag_seconds
+        )
+        rolled_up: int = await self.__yahoo_search_dao.refresh_search_rollups(until)
+        self.stats.refreshes += 1
+        self.stats.rolled_up_rows += rolled_up
+        self.stats.last_refreshed_until = until
+        return rolled_up
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                # the watermark is untouched; the next refresh picks the rows up again
+                self.stats.failed_refreshes += 1
+                self.__logger.error("Analytics refresh failed: %s", e)
+            await asyncio.sleep(self.__config.refresh_interval_seconds)
+
+
+if __name__ == "__main__":
+    """
+    Run one refresh, e.g from a cron job, or to catch up after enabling analytics:
+    python -m src.services.search_analytics_refresher
+    """
+    config: dict[str, Any] = toml.load("local_config/config.toml")
+    refresher_dao: YahooSearchDAO = YahooSearchDAO(config["database"])
+    refresher: SearchAnalyticsRefresher = SearchAnalyticsRefresher(
+        refresher_dao, SearchAnalyticsConfig(**config.get("analytics", {}))
+    )
+
+    async def refresh_once() -> int:
+        try:
+            return await refresher.refresh()
+        finally:
+            await refresher_dao.close()
+
+    rolled_up_rows: int = run_event_loop(
+        refresh_once(), EventLoopConfig(**config.get("event_loop", {}))
+    )
+    print(f"Rolled up {rolled_up_rows} searches")
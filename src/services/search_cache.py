@@ -0,0 +1,148 @@
+import logging
+import sys
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from pydantic import BaseModel
+from sqlalchemy.exc import SQLAlchemyError
+
+from src.models.search_results import SearchResults
+from src.services.yahoo_search_dao import YahooSearchDAO
+from src.utils.logging_utils import setup_logging
+
+
+class SearchCacheConfig(BaseModel):
+    """
+    Loaded from the [search_cache] section of local_config/config.toml
+
+    - ttl_seconds: how long a Yahoo result is reused (1 hour, as per YahooSearchDAO)
+    - max_entries: max number of search terms held in memory
+    - max_bytes: max memory held by cached html, across all entries
+    """
+
+    enabled: bool = True
+    ttl_seconds: float = 3600
+    max_entries: int = 1024
+    max_bytes: int = 256 * 1024 * 1024
+
+
+@dataclass
+class SearchCacheStats:
+    memory_hits: int = 0
+    database_hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+
+@dataclass
+class _CacheEntry:
+    result: str
+    created_at: datetime
+    size_bytes: int
+
+
+class SearchResultCache:
+    """
+    Read-through cache in front of Yahoo, implementing the
+    Caching Control Flow described in YahooSearchDAO
+
+    Tier 1: in-process LRU, bounded by max_entries and max_bytes
+    - Trending queries are served without leaving the process
+    - Keyed on SearchResults.normalize_search_term, as concurrent searches are
+    coalesced; "Tea" and "tea " share one entry
+
+    Tier 2: postgres, the search_results table
+    - Shared by every server instance
+    - On a hit, the row is promoted into tier 1
+    - Looked up by the same normalized term; search_results stores it normalized
+
+    An entry expires ttl_seconds after the Yahoo search was made (its created_at),
+    not after it was put into the cache
+    - So a row promoted from postgres doesn't live longer than the TTL
+
+    Only successful searches are cached; a None result is never served
+    """
+
+    def __init__(
+        self, yahoo_search_dao: YahooSearchDAO, config: SearchCacheConfig
+    ) -> None:
+        self.__logger: logging.Logger = logging.getLogger(__name__)
+        self.__yahoo_search_dao: YahooSearchDAO = yahoo_search_dao
+        self.__config: SearchCacheConfig = config
+        self.__entries: OrderedDict[str, _CacheEntry] = OrderedDict()
+        self.__size_bytes: int = 0
+        self.stats: SearchCacheStats = SearchCacheStats()
+        setup_logging(self.__logger)
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    @property
+    def size_bytes(self) -> int:
+        return self.__size_bytes
+
+    def _oldest_valid_created_at(self) -> datetime:
+        return datetime.utcnow() - timedelta(seconds=self.__config.ttl_seconds)
+
+    async def get(self, search_term: str) -> str | None:
+        """
+        Returns the cached html for search_term, or None on a miss
+        - A database error is treated as a miss; the caller then goes to Yahoo
+        """
+        oldest_valid: datetime = self._oldest_valid_created_at()
+        key: str = SearchResults.normalize_search_term(search_term)
+        entry: _CacheEntry | None = self.__entries.get(key)
+        if entry is not None:
+            if entry.created_at >= oldest_valid:
+                self.__entries.move_to_end(key)
+                self.stats.memory_hits += 1
+                return entry.result
+            self._remove(key)
+
+        try:
+            row: SearchResults | None = (
+                await self.__yahoo_search_dao.fetch_recent_search(
+                    search_term, oldest_valid
+                )
+            )
+        except SQLAlchemyError as e:
+            self.__logger.error("Cache lookup for %s failed: %s", search_term, e)
+            row = None
+
+        if row is None or row.result is None:
+            self.stats.misses += 1
+            return None
+        self.stats.database_hits += 1
+        self.put(search_term, row.result, row.created_at)
+        return row.result
+
+    def put(self, search_term: str, result: str | None, created_at: datetime) -> None:
+        """
+        Stores a fresh Yahoo result in tier 1
+        - Tier 2 needs no write here; every search is persisted by insert_search
+        """
+        if result is None:
+            return
+        size_bytes: int = sys.getsizeof(result)
+        if size_bytes > self.__config.max_bytes:
+            return
+        key: str = SearchResults.normalize_search_term(search_term)
+        self._remove(key)
+        self.__entries[key] = _CacheEntry(
+            result=result, created_at=created_at, size_bytes=size_bytes
+        )
+        self.__size_bytes += size_bytes
+        while (
+            len(self.__entries) > self.__config.max_entries
+            or self.__size_bytes > self.__config.max_bytes
+        ):
+            # popitem(last=False) evicts the least recently used entry
+            _, evicted = self.__entries.popitem(last=False)
+            self.__size_bytes -= evicted.size_bytes
+            self.stats.evictions += 1
+
+    def _remove(self, key: str) -> None:
+        entry: _CacheEntry | None = self.__entries.pop(key, None)
+        if entry is not None:
+            self.__size_bytes -= entry.size_bytes
@@ -0,0 +1,177 @@
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Literal
+
+import toml
+from pydantic import BaseModel
+
+from src.models.search_results_partition import SearchResultsPartition
+from src.services.yahoo_search_dao import YahooSearchDAO
+from src.utils.event_loop import EventLoopConfig, run_event_loop
+from src.utils.logging_utils import setup_logging
+
+
+class SearchResultsPartitionsConfig(BaseModel):
+    """
+    Loaded from the [search_results_partitions] section of local_config/config.toml
+
+    - interval: each partition holds a "day" or a (Monday to Monday) "week" of searches
+    - premake: partitions created ahead of the current one
+    - retention_days: partitions entirely older than this are expired; None keeps everything
+    - retention_action: "drop" the expired partitions,
+    or "detach" them into standalone tables, to archive (e.g pg_dump) and drop by hand
+    """
+
+    interval: Literal["day", "week"] = "day"
+    premake: int = 7
+    retention_days: int | None = 90
+    retention_action: Literal["drop", "detach"] = "drop"
+
+
+@dataclass
+class PartitionMaintenanceReport:
+    created: list[str] = field(default_factory=list)
+    expired: list[str] = field(default_factory=list)
+    default_partition_has_rows: bool = False
+
+
+class SearchResultsPartitionMaintenance:
+    """
+    search_results is range-partitioned by created_at
+
+    Why?
+    - One heap holding every search's html only grows;
+    vacuum and index maintenance get slower with it
+    - The cache lookup (created_at >= 1 hour ago) only touches the newest partition
+    - Retention drops whole partitions; no DELETE, no bloat left for vacuum
+
+    Run it periodically (e.g daily, from a cron job); it is idempotent
+    - Creates the current and next `premake` partitions, so inserts never
+    fall through to search_results_default
+    - Expires the partitions past retention_days
+
+    If search_results_default has rows, a partition covering them can't be created
+    - Move them out by hand: detach the default partition, create the
+    missing partitions, then INSERT the rows back through search_results
+    """
+
+    def __init__(
+        self,
+        yahoo_search_dao: YahooSearchDAO,
+        config: SearchResultsPartitionsConfig,
+    ) -> None:
+        self.__logger: logging.Logger = logging.getLogger(__name__)
+        self.__yahoo_search_dao: YahooSearchDAO = yahoo_search_dao
+        self.__config: SearchResultsPartitionsConfig = config
+        setup_logging(self.__logger)
+
+    @staticmethod
+    def plan(
+        partitions: list[SearchResultsPartition],
+        now: datetime,
+        config: SearchResultsPartitionsConfig,
+    ) -> tuple[list[SearchResultsPartition], list[SearchResultsPartition]]:
+        """
+        :param partitions: the existing range partitions
+        :return: (partitions to create, partitions to expire)
+
+        A new partition is clipped around the existing ones it overlaps
+        - e.g the first one after search_results_legacy, or after switching
+        from daily to weekly partitions
+        """
+        length: timedelta = timedelta(days=1 if config.interval == "day" else 7)
+        current: datetime = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        if config.interval == "week":
+            current -= timedelta(days=current.weekday())
+
+        ordered: list[SearchResultsPartition] = sorted(
+            partitions, key=lambda partition: partition.start or datetime.min
+        )
+        gaps: list[tuple[datetime, datetime]] = []
+        for i in range(config.premake + 1):
+            start: datetime = current + i * length
+            end: datetime = start + length
+            for existing in ordered:
+                assert existing.end is not None
+                if existing.end <= start or (
+                    existing.start is not None and existing.start >= end
+                ):
+                    continue
+                if existing.start is not None and existing.start > start:
+                    gaps.append((start, existing.start))
+                start = max(start, existing.end)
+            if start < end:
+                gaps.append((start, end))
+        to_create: list[SearchResultsPartition] = [
+            SearchResultsPartition(
+                name=f"search_results_p{start:%Y%m%d}", start=start, end=end
+            )
+            for start, end in gaps
+        ]
+
+        to_expire: list[SearchResultsPartition] = []
+        if config.retention_days is not None:
+            cutoff: datetime = now - timedelta(days=config.retention_days)
+            to_expire = [
+                partition
+                for partition in partitions
+                if partition.end is not None and partition.end <= cutoff
+            ]
+        return to_create, to_expire
+
+    async def run(self) -> PartitionMaintenanceReport:
+        report: PartitionMaintenanceReport = PartitionMaintenanceReport()
+        partitions: list[SearchResultsPartition] = (
+            await self.__yahoo_search_dao.fetch_search_results_partitions()
+        )
+        to_create, to_expire = SearchResultsPartitionMaintenance.plan(
+            partitions, datetime.utcnow(), self.__config
+        )
+        for partition in to_create:
+            await self.__yahoo_search_dao.create_search_results_partition(partition)
+            report.created.append(partition.name)
+        for partition in to_expire:
+            await self.__yahoo_search_dao.detach_search_results_partition(
+                partition.name, drop=self.__config.retention_action == "drop"
+            )
+            report.expired.append(partition.name)
+        report.default_partition_has_rows = (
+            await self.__yahoo_search_dao.default_partition_has_rows()
+        )
+        if report.default_partition_has_rows:
+            self.__logger.error(
+                "search_results_default has rows; create the missing partitions"
+            )
+        return report
+
+
+if __name__ == "__main__":
+    """
+    Run it daily, e.g from a cron job:
+    python -m src.services.search_results_partitions
+    """
+    config: dict[str, Any] = toml.load("local_config/config.toml")
+    maintenance_dao: YahooSearchDAO = YahooSearchDAO(config["database"])
+    maintenance: SearchResultsPartitionMaintenance = SearchResultsPartitionMaintenance(
+        maintenance_dao,
+        SearchResultsPartitionsConfig(**config.get("search_results_partitions", {})),
+    )
+
+    async def run_maintenance() -> PartitionMaintenanceReport:
+        try:
+            return await maintenance.run()
+        finally:
+            await maintenance_dao.close()
+
+    maintenance_report: PartitionMaintenanceReport = run_event_loop(
+        run_maintenance(), EventLoopConfig(**config.get("event_loop", {}))
+    )
+    print(
+        f"Created {maintenance_report.created}, expired {maintenance_report.expired}"
+        + (
+            "; search_results_default has rows!"
+            if maintenance_report.default_partition_has_rows
+            else ""
+        )
+    )
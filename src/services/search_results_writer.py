@@ -0,0 +1,148 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+
+from pydantic import BaseModel
+
+from src.models.search_results import SearchResults
+from src.services.yahoo_search_dao import YahooSearchDAO
+from src.utils.logging_utils import setup_logging
+
+
+class SearchResultsWriterConfig(BaseModel):
+    """
+    Loaded from the [search_results_writer] section of local_config/config.toml
+
+    - batch_size: a batch is flushed as soon as it has this many rows
+    - flush_interval_ms: or once its first row has waited this long
+    - max_queue_size: rows waiting to be flushed; /search waits when it is full
+    """
+
+    enabled: bool = True
+    batch_size: int = 500
+    flush_interval_ms: int = 50
+    max_queue_size: int = 10_000
+
+
+@dataclass
+class SearchResultsWriterStats:
+    enqueued: int = 0
+    flushed_rows: int = 0
+    flushed_batches: int = 0
+    failed_rows: int = 0
+    backpressure_waits: int = 0
+
+
+class SearchResultsWriter:
+    """
+    Write-behind persistence of SearchResults
+
+    Without it, every /search waits for its own transaction + INSERT
+    before the response can be sent
+    - submit() only puts the result onto a queue
+    - A background task flushes the queue with one multi-row insert
+    every batch_size rows or flush_interval_ms, whichever comes first
+
+    Backpressure
+    - The queue is bounded by max_queue_size
+    - When postgres falls behind, submit() waits for room in the queue,
+    slowing /search down instead of growing memory without bound
+
+    Trade-off
+    - A batch that still fails after YahooSearchDAO's retries is logged and dropped
+    - close() flushes everything still queued, so a graceful shutdown loses nothing
+    """
+
+    def __init__(
+        self, yahoo_search_dao: YahooSearchDAO, config: SearchResultsWriterConfig
+    ) -> None:
+        self.__logger: logging.Logger = logging.getLogger(__name__)
+        self.__yahoo_search_dao: YahooSearchDAO = yahoo_search_dao
+        self.__config: SearchResultsWriterConfig = config
+        self.__queue: asyncio.Queue[SearchResults | None] | None = None
+        self.__flusher: asyncio.Task[None] | None = None
+        self.stats: SearchResultsWriterStats = SearchResultsWriterStats()
+        setup_logging(self.__logger)
+
+    @property
+    def queue_size(self) -> int:
+        return self.__queue.qsize() if self.__queue is not None else 0
+
+    async def start(self) -> None:
+        """
+        Starts the background flusher, inside the running event loop
+        """
+        if self.__flusher is not None:
+            return
+        self.__queue = asyncio.Queue(maxsize=self.__config.max_queue_size)
+        self.__flusher = asyncio.create_task(self._run(self.__queue))
+
+    async def close(self) -> None:
+        """
+        Flushes every queued row, then stops the background flusher
+        """
+        if self.__queue is None or self.__flusher is None:
+            return
+        queue: asyncio.Queue[SearchResults | None] = self.__queue
+        # from here on, submit() inserts directly
+        self.__queue = None
+        # None tells the flusher that nothing comes after it
+        await queue.put(None)
+        await self.__flusher
+        self.__flusher = None
+        # rows put by submit() calls that were already waiting on a full queue
+        leftovers: list[SearchResults] = []
+        while not queue.empty():
+            item: SearchResults | None = queue.get_nowait()
+            if item is not None:
+                leftovers.append(item)
+        if leftovers:
+            await self._flush(leftovers)
+
+    async def submit(self, result: SearchResults) -> None:
+        """
+        Queues a result to be inserted
+        - Before start() or after close(), inserts it right away instead
+        """
+        if self.__queue is None:
+            await self.__yahoo_search_dao.insert_search(result)
+            return
+        if self.__queue.full():
+            self.stats.backpressure_waits += 1
+        await self.__queue.put(result)
+        self.stats.enqueued += 1
+
+    async def _run(self, queue: asyncio.Queue[SearchResults | None]) -> None:
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        stopping: bool = False
+        while not stopping:
+            first: SearchResults | None = await queue.get()
+            if first is None:
+                break
+            batch: list[SearchResults] = [first]
+            flush_at: float = loop.time() + self.__config.flush_interval_ms / 1000
+            while len(batch) < self.__config.batch_size:
+                timeout: float = flush_at - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item: SearchResults | None = await asyncio.wait_for(
+                        queue.get(), timeout
+                    )
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._flush(batch)
+
+    async def _flush(self, batch: list[SearchResults]) -> None:
+        try:
+            await self.__yahoo_search_dao.insert_searches(batch)
+        except Exception as e:
+            self.stats.failed_rows += len(batch)
+            self.__logger.error("Dropped %d search results: %s", len(batch), e)
+            return
+        self.stats.flushed_rows += len(batch)
+        self.stats.flushed_batches += 1
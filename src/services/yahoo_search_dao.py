@@ -1,19 +1,35 @@
 import asyncio
-from collections.abc import Sequence
+import re
+import uuid
+from collections.abc import AsyncIterator, Awaitable, Callable, Sequence
+from datetime import datetime
 
 import toml
-from retry import retry
 from sqlalchemy import CursorResult, Row, TextClause, text
 from typing import Any
 
-from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncResult
 
+from src.models.extracted_search_result import ExtractedSearchResult
+from src.models.search_analytics import (
+    SearchPeriodCount,
+    SearchTermCount,
+    UserSearchCount,
+)
+from src.models.records import SearchRecord, UserRecord
 from src.models.search_results import SearchResults
+from src.models.search_results_partition import SearchResultsPartition
 from src.models.user import User
-from src.utils.construct_connection_string import (
-    construct_sqlalchemy_url_from_db_config,
-)
+from src.utils.async_retry import async_retry
+from src.utils.compression import compress_result, decompress_result
+from src.utils.db_engine import DatabasePoolStats, TimedQueuePool, create_engine
+from src.utils.event_loop import EventLoopConfig, new_event_loop
+from src.utils.metrics import STAGE_SECONDS
+
+_PARTITION_BOUND: re.Pattern[str] = re.compile(r"FROM \((.+?)\) TO \((.+?)\)")
+
+# granularities fetch_busiest_periods can bucket by; the rollups themselves are hourly
+ANALYTICS_PERIODS: tuple[str, ...] = ("hour", "day", "week", "month")
 
 
 class YahooSearchDAO:
@@ -69,62 +85,170 @@ class YahooSearchDAO:
     3. Cache the query into search_results table
     """
 
-    def __init__(
-        self,
-        db_config: dict[str, Any] = toml.load("local_config/config.toml")["database"],
-    ):
+    def __init__(self, db_config: dict[str, Any]):
+        """
+        :param db_config: the [database] section of local_config/config.toml
+
+        The DAO owns its engine, and the engine its connection pool
+        - Create one DAO per process and share it, e.g by the server's search
+        service, cache, writer and analytics refresher
+        - close() it on shutdown
+        """
         self.__db_config: dict[str, Any] = db_config
-        self._engine: AsyncEngine = create_async_engine(
-            construct_sqlalchemy_url_from_db_config(self.__db_config, use_async_pg=True)
+        # opt-in: new rows store their html zlib-compressed in result_compressed
+        self.__compress_results: bool = db_config.get("compress_results", False)
+        self.__compression_level: int = db_config.get("compression_level", 6)
+        self._engine: AsyncEngine = create_engine(self.__db_config)
+
+    @property
+    def pool_stats(self) -> DatabasePoolStats:
+        pool: TimedQueuePool = self._engine.pool  # type: ignore[assignment]
+        return pool.snapshot()
+
+    async def close(self) -> None:
+        """
+        Closes every pooled connection
+        - Without it, they are only dropped when the process exits,
+        and postgres keeps their backends until it notices
+        """
+        await self._engine.dispose()
+
+    @staticmethod
+    def _insert_search_clause() -> TextClause:
+        return text(
+            "INSERT into search_results("
+            "   search_id, "
+            "   user_id, "
+            "   search_term, "
+            "   result, "
+            "   result_compressed, "
+            "   created_at"
+            ") values ("
+            "   :search_id,"
+            "   :user_id,"
+            "   :search_term,"
+            "   :result,"
+            "   :result_compressed,"
+            "   :created_at"
+            ")"
         )
 
-    @retry(
-        exceptions=SQLAlchemyError,
-        tries=5,
-        delay=0.01,
-        jitter=(-0.01, 0.01),
-        backoff=2,
-    )
+    def _insert_search_params(self, result: SearchResults) -> dict[str, Any]:
+        """
+        With compress_results on, the html goes into result_compressed,
+        and result is left NULL
+
+        search_term is stored normalized (SearchResults.normalize_search_term)
+        - The key fetch_recent_search looks it up by, as the search_cache does;
+        "Tea" and "tea " are one term, in postgres and in memory alike
+        """
+        compress: bool = self.__compress_results and result.result is not None
+        return {
+            "search_id": result.search_id,
+            "user_id": result.user_id,
+            "search_term": SearchResults.normalize_search_term(result.search_term),
+            "result": None if compress else result.result,
+            "result_compressed": (
+                compress_result(result.result, self.__compression_level)
+                if compress
+                else None
+            ),
+            "created_at": result.created_at,
+        }
+
+    @staticmethod
+    def _result_from_columns(
+        result: str | None, result_compressed: bytes | None
+    ) -> str | None:
+        """
+        Rows hold their html in exactly one of result / result_compressed
+        - Old rows (and rows written with compress_results off) use result
+        - Decompressing here keeps SearchResults.result a str for every caller
+        """
+        if result_compressed is not None:
+            return decompress_result(result_compressed)
+        return result
+
+    @async_retry(name="yahoo_search_dao.insert_search")
     async def insert_search(self, result: SearchResults) -> None:
         """
         TODO: Integration test this
-        - Retry unit test -> does it catch the SQLAlchemyError
+
+        SQLAlchemyError is retried by @async_retry
+        """
+        with STAGE_SECONDS.labels("db_insert").time():
+            async with self._engine.begin() as connection:
+                # use named-params here to prevent SQL-injection attacks
+                await connection.execute(
+                    YahooSearchDAO._insert_search_clause(),
+                    self._insert_search_params(result),
+                )
+
+    @async_retry(name="yahoo_search_dao.insert_searches")
+    async def insert_searches(self, results: list[SearchResults]) -> None:
+        """
+        Inserts many searches in one transaction
+        - Passing a list of params makes SQLAlchemy use the driver's executemany
+        - asyncpg pipelines the rows over one round-trip, instead of one per row
+
+        Used by SearchResultsWriter to flush a batch
+        """
+        if not results:
+            return
+        with STAGE_SECONDS.labels("db_insert_batch").time():
+            async with self._engine.begin() as connection:
+                await connection.execute(
+                    YahooSearchDAO._insert_search_clause(),
+                    [self._insert_search_params(result) for result in results],
+                )
+
+    @staticmethod
+    def _fetch_recent_search_clause() -> TextClause:
+        """
+        Served by ix_search_results_search_term_created_at (search_term, created_at DESC)
+        - An index scan that stops at the first row with a result
+        """
+        return text(
+            "SELECT search_id, user_id, "
+            "search_term, result, result_compressed, created_at "
+            "FROM search_results "
+            "WHERE search_term = :search_term "
+            "AND created_at >= :since "
+            "AND (result IS NOT NULL OR result_compressed IS NOT NULL) "
+            "ORDER BY created_at DESC "
+            "LIMIT 1"
+        )
+
+    @async_retry(name="yahoo_search_dao.fetch_recent_search")
+    async def fetch_recent_search(
+        self, search_term: str, since: datetime
+    ) -> SearchResults | None:
+        """
+        Step 1 of the Caching Control Flow
+        - Returns the latest successful search for search_term made at or after since
+        - Only one row is sent back, never the whole history of the term
+        - search_term is normalized first, as it was when stored
         """
         async with self._engine.begin() as connection:
-            insert_clause: TextClause = text(
-                "INSERT into search_results("
-                "   search_id, "
-                "   user_id, "
-                "   search_term, "
-                "   result, "
-                "   created_at"
-                ") values ("
-                "   :search_id,"
-                "   :user_id,"
-                "   :search_term,"
-                "   :result,"
-                "   :created_at"
-                ")"
-            )
-            # use named-params here to prevent SQL-injection attacks
-            await connection.execute(
-                insert_clause,
+            cursor: CursorResult = await connection.execute(
+                YahooSearchDAO._fetch_recent_search_clause(),
                 {
-                    "search_id": result.search_id,
-                    "user_id": result.user_id,
-                    "search_term": result.search_term,
-                    "result": result.result,
-                    "created_at": result.created_at,
+                    "search_term": SearchResults.normalize_search_term(search_term),
+                    "since": since,
                 },
             )
+            row: Row | None = cursor.first()
+        if row is None:
+            return None
+        return SearchResults(
+            search_id=row[0],
+            user_id=row[1],
+            search_term=row[2],
+            result=YahooSearchDAO._result_from_columns(row[3], row[4]),
+            created_at=row[5],
+        )
 
-    @retry(
-        exceptions=SQLAlchemyError,
-        tries=5,
-        delay=0.01,
-        jitter=(-0.01, 0.01),
-        backoff=2,
-    )
+    @async_retry(name="yahoo_search_dao.insert_user")
     async def insert_user(self, user: User) -> None:
         """
         TODO: Integration test this
@@ -144,74 +268,573 @@ class YahooSearchDAO:
                 insert_clause, {"user_id": user.user_id, "created_at": user.created_at}
             )
 
-    @retry(
-        exceptions=SQLAlchemyError,
-        tries=5,
-        delay=0.01,
-        jitter=(-0.01, 0.01),
-        backoff=2,
-    )
     async def fetch_all_searches(self) -> list[SearchResults]:
         """
         Integration test this
+
+        Loads every row, raw html included, into memory
+        - Prefer stream_searches on anything but a small table
+        """
+        return [record.to_model() for record in await self.fetch_all_search_records()]
+
+    @async_retry(name="yahoo_search_dao.fetch_all_search_records")
+    async def fetch_all_search_records(self) -> list[SearchRecord]:
+        """
+        fetch_all_searches, as SearchRecords; no pydantic model per row
+        - Retried here, so fetch_all_searches isn't retried on top of it
         """
         async with self._engine.begin() as connection:
             text_clause: TextClause = text(
                 "SELECT search_id, user_id, "
-                "search_term, result, created_at "
+                "search_term, result, result_compressed, created_at "
                 "FROM search_results"
             )
             cursor: CursorResult = await connection.execute(text_clause)
-            results: Sequence[Row] = cursor.fetchall()
-            results_row: list[SearchResults] = [
-                SearchResults.parse_obj(
-                    {
-                        "search_id": curr_row[0],
-                        "user_id": curr_row[1],
-                        "search_term": curr_row[2],
-                        "result": curr_row[3],
-                        "created_at": curr_row[4],
-                    }
-                )
-                for curr_row in results
-            ]
-        return results_row
-
-    @retry(
-        exceptions=SQLAlchemyError,
-        tries=5,
-        delay=0.01,
-        jitter=(-0.01, 0.01),
-        backoff=2,
-    )
+            return [YahooSearchDAO._search_record(curr_row) for curr_row in cursor]
+
     async def fetch_all_users(self) -> list[User]:
         """
         Integration Test
+
+        Prefer stream_users on anything but a small table
         """
+        return [record.to_model() for record in await self.fetch_all_user_records()]
+
+    @async_retry(name="yahoo_search_dao.fetch_all_user_records")
+    async def fetch_all_user_records(self) -> list[UserRecord]:
         async with self._engine.begin() as connection:
             text_clause: TextClause = text("SELECT user_id, created_at " "FROM users")
             cursor: CursorResult = await connection.execute(text_clause)
-            results: Sequence[Row] = cursor.fetchall()
-            results_row: list[User] = [
-                User.parse_obj(
+            return [UserRecord(curr_row[0], curr_row[1]) for curr_row in cursor]
+
+    @staticmethod
+    def _search_record(row: Sequence[Any]) -> SearchRecord:
+        """
+        :param row: search_id, user_id, search_term, result, result_compressed, created_at
+        """
+        return SearchRecord(
+            row[0],
+            row[1],
+            row[2],
+            YahooSearchDAO._result_from_columns(row[3], row[4]),
+            row[5],
+        )
+
+    async def stream_searches(
+        self,
+        batch_size: int = 1000,
+        include_result: bool = True,
+        after: tuple[datetime, str] | None = None,
+    ) -> AsyncIterator[SearchResults]:
+        """
+        stream_search_records, converted to SearchResults one by one
+        """
+        async for record in self.stream_search_records(
+            batch_size, include_result, after
+        ):
+            yield record.to_model()
+
+    async def stream_search_records(
+        self,
+        batch_size: int = 1000,
+        include_result: bool = True,
+        after: tuple[datetime, str] | None = None,
+    ) -> AsyncIterator[SearchRecord]:
+        """
+        Iterates over every search, in (created_at, search_id) order,
+        without loading the table into memory
+
+        Keyset pagination
+        - Each page is "the next batch_size rows after the last row we saw"
+        - WHERE (created_at, search_id) > (last created_at, last search_id) LIMIT batch_size
+        - Unlike OFFSET, postgres doesn't re-read the rows of earlier pages
+        - Each page is its own short transaction, and is retried on its own
+        - Pass after=(created_at, search_id) of the last row seen, to resume
+
+        :param include_result: False to leave out the raw html (result is None);
+        e.g for analytics that only need search_term / user_id / created_at
+        """
+        while True:
+            page: list[SearchRecord] = await self._fetch_searches_page(
+                batch_size, include_result, after
+            )
+            for record in page:
+                yield record
+            if len(page) < batch_size:
+                return
+            after = (page[-1].created_at, page[-1].search_id)
+
+    @staticmethod
+    def _searches_page_clause(include_result: bool, keyset: bool) -> TextClause:
+        """
+        Served by ix_search_results_created_at_search_id (created_at, search_id)
+        - Every page is an index range scan of batch_size rows, whatever its offset
+        """
+        result_columns: str = (
+            "result, result_compressed"
+            if include_result
+            else "NULL AS result, NULL AS result_compressed"
+        )
+        keyset_filter: str = (
+            "WHERE (created_at, search_id) > (:after_created_at, :after_search_id) "
+            if keyset
+            else ""
+        )
+        return text(
+            f"SELECT search_id, user_id, search_term, {result_columns}, created_at "
+            "FROM search_results "
+            f"{keyset_filter}"
+            "ORDER BY created_at, search_id "
+            "LIMIT :batch_size"
+        )
+
+    @async_retry(name="yahoo_search_dao.fetch_searches_page")
+    async def _fetch_searches_page(
+        self,
+        batch_size: int,
+        include_result: bool,
+        after: tuple[datetime, str] | None,
+    ) -> list[SearchRecord]:
+        text_clause: TextClause = YahooSearchDAO._searches_page_clause(
+            include_result, after is not None
+        )
+        params: dict[str, Any] = {"batch_size": batch_size}
+        if after is not None:
+            params["after_created_at"], params["after_search_id"] = after
+        async with self._engine.begin() as connection:
+            cursor: CursorResult = await connection.execute(text_clause, params)
+            return [YahooSearchDAO._search_record(curr_row) for curr_row in cursor]
+
+    async def stream_users(self, batch_size: int = 1000) -> AsyncIterator[User]:
+        """
+        stream_user_records, converted to Users one by one
+        """
+        async for record in self.stream_user_records(batch_size):
+            yield record.to_model()
+
+    async def stream_user_records(
+        self, batch_size: int = 1000
+    ) -> AsyncIterator[UserRecord]:
+        """
+        Iterates over every user through a server-side cursor
+        - yield_per makes asyncpg fetch batch_size rows per round-trip
+        - Only one batch is held in memory at a time
+        - The cursor lives in one transaction, held open while the caller iterates
+        """
+        async with self._engine.begin() as connection:
+            stream: AsyncResult = await connection.stream(
+                text("SELECT user_id, created_at FROM users").execution_options(
+                    yield_per=batch_size
+                )
+            )
+            async for curr_row in stream:
+                yield UserRecord(curr_row[0], curr_row[1])
+
+    @async_retry(name="yahoo_search_dao.fetch_user_ids")
+    async def fetch_user_ids(self) -> list[str]:
+        async with self._engine.begin() as connection:
+            text_clause: TextClause = text("SELECT user_id FROM users")
+            cursor: CursorResult = await connection.execute(text_clause)
+            return [curr_row[0] for curr_row in cursor.fetchall()]
+
+    @staticmethod
+    def _extract_searches_clause() -> TextClause:
+        """
+        Served by ix_search_results_user_id_created_at (user_id, created_at)
+        - Only the user's rows between the watermark and until are read
+        """
+        return text(
+            "SELECT search_id, result, result_compressed, created_at "
+            "FROM search_results "
+            "WHERE user_id = :user_id "
+            "AND created_at > :last_run "
+            "AND created_at <= :until "
+            "AND (result IS NOT NULL OR result_compressed IS NOT NULL)"
+        )
+
+    @async_retry(name="yahoo_search_dao.extract_searches_for_user")
+    async def extract_searches_for_user(
+        self,
+        user_id: str,
+        until: datetime,
+        extract: Callable[
+            [Sequence[tuple[str, str | None, datetime]]],
+            Awaitable[list[ExtractedSearchResult]],
+        ],
+        batch_size: int = 500,
+    ) -> tuple[int, int]:
+        """
+        Incrementally extracts one user's searches, in a single transaction
+
+        1. Lock the user, so two ETL runs never extract the same user at once
+        2. Read last_extracted_user_status.last_run (the watermark)
+        3. Stream search_results rows with last_run < created_at <= until,
+        through a server-side cursor, batch_size rows at a time
+        - Never more than one batch of raw html is held in memory
+        4. Each batch is given to extract, and what it returns
+        is bulk-inserted into extracted_search_results
+        5. Advance the watermark to until
+
+        As it is one transaction, a failure rolls back both the inserts and the watermark
+        - The retry then starts over from the old watermark; nothing is extracted twice
+
+        :param extract: turns rows of (search_id, result, created_at) into ExtractedSearchResults
+        :return: (number of searches read, number of extracted rows inserted)
+        """
+        searches: int = 0
+        extracted: int = 0
+        async with self._engine.begin() as connection:
+            await connection.execute(
+                text("SELECT pg_advisory_xact_lock(hashtext(:user_id))"),
+                {"user_id": user_id},
+            )
+            watermark_cursor: CursorResult = await connection.execute(
+                text(
+                    "SELECT id, last_run FROM last_extracted_user_status "
+                    "WHERE user_id = :user_id"
+                ),
+                {"user_id": user_id},
+            )
+            watermark: Row | None = watermark_cursor.first()
+            last_run: datetime = watermark[1] if watermark else datetime.min
+
+            stream: AsyncResult = await connection.stream(
+                YahooSearchDAO._extract_searches_clause().execution_options(
+                    yield_per=batch_size
+                ),
+                {"user_id": user_id, "last_run": last_run, "until": until},
+            )
+            async for partition in stream.partitions(batch_size):
+                searches += len(partition)
+                rows: list[tuple[str, str | None, datetime]] = [
+                    (
+                        curr_row[0],
+                        YahooSearchDAO._result_from_columns(curr_row[1], curr_row[2]),
+                        curr_row[3],
+                    )
+                    for curr_row in partition
+                ]
+                extracted_rows: list[ExtractedSearchResult] = await extract(rows)
+                extracted += len(extracted_rows)
+                if extracted_rows:
+                    await connection.execute(
+                        text(
+                            "INSERT into extracted_search_results("
+                            "   id, user_id, url, date, body, created_at"
+                            ") values ("
+                            "   :id, :user_id, :url, :date, :body, :created_at"
+                            ")"
+                        ),
+                        [row.model_dump() for row in extracted_rows],
+                    )
+
+            if watermark is None:
+                await connection.execute(
+                    text(
+                        "INSERT into last_extracted_user_status(id, user_id, last_run) "
+                        "values (:id, :user_id, :last_run)"
+                    ),
+                    {"id": str(uuid.uuid4()), "user_id": user_id, "last_run": until},
+                )
+            else:
+                await connection.execute(
+                    text(
+                        "UPDATE last_extracted_user_status "
+                        "SET last_run = :last_run WHERE id = :id"
+                    ),
+                    {"id": watermark[0], "last_run": until},
+                )
+        return searches, extracted
+
+    @async_retry(name="yahoo_search_dao.compress_results_chunk")
+    async def compress_results_chunk(self, chunk_size: int) -> tuple[int, int, int]:
+        """
+        Moves up to chunk_size rows from result to result_compressed
+
+        One chunk is one short transaction
+        - FOR UPDATE SKIP LOCKED lets several backfills run side by side,
+        each taking different rows
+        - Only chunk_size rows are locked, and only for as long as the chunk takes
+
+        :return: (rows converted, raw html bytes, compressed bytes)
+        """
+        async with self._engine.begin() as connection:
+            cursor: CursorResult = await connection.execute(
+                text(
+                    "SELECT search_id, result, created_at FROM search_results "
+                    "WHERE result IS NOT NULL AND result_compressed IS NULL "
+                    "LIMIT :chunk_size "
+                    "FOR UPDATE SKIP LOCKED"
+                ),
+                {"chunk_size": chunk_size},
+            )
+            raw_bytes: int = 0
+            compressed_bytes: int = 0
+            params: list[dict[str, Any]] = []
+            for search_id, result, created_at in cursor.fetchall():
+                compressed: bytes | None = compress_result(
+                    result, self.__compression_level
+                )
+                assert compressed is not None
+                raw_bytes += len(result.encode("utf-8"))
+                compressed_bytes += len(compressed)
+                params.append(
                     {
-                        "user_id": curr_row[0],
-                        "created_at": curr_row[1],
+                        "search_id": search_id,
+                        "created_at": created_at,
+                        "compressed": compressed,
                     }
                 )
-                for curr_row in results
+            if params:
+                await connection.execute(
+                    text(
+                        "UPDATE search_results "
+                        "SET result_compressed = :compressed, result = NULL "
+                        # created_at prunes the update to the row's partition
+                        "WHERE search_id = :search_id AND created_at = :created_at"
+                    ),
+                    params,
+                )
+        return len(params), raw_bytes, compressed_bytes
+
+    @async_retry(name="yahoo_search_dao.refresh_search_rollups")
+    async def refresh_search_rollups(self, until: datetime) -> int:
+        """
+        Use Case 2: rolls search_results up into search_terms_hourly and user_searches_hourly
+
+        Incremental, like extract_searches_for_user
+        - analytics_rollup_status.last_run is the watermark
+        - Only rows with last_run < created_at <= until are read, through the
+        created_at index, and added onto the existing hourly counts
+        - The counts and the watermark move together, in one transaction;
+        a failed refresh leaves both untouched
+
+        until should lag behind now; a search written behind after
+        the watermark passed its created_at would never be counted
+
+        :return: number of search_results rows rolled up
+        """
+        async with self._engine.begin() as connection:
+            # one refresh at a time, across every server process
+            await connection.execute(
+                text("SELECT pg_advisory_xact_lock(hashtext(:name))"),
+                {"name": "search_rollups"},
+            )
+            watermark_cursor: CursorResult = await connection.execute(
+                text("SELECT last_run FROM analytics_rollup_status WHERE name = :name"),
+                {"name": "search_rollups"},
+            )
+            watermark: Row | None = watermark_cursor.first()
+            last_run: datetime = watermark[0] if watermark else datetime.min
+            if until <= last_run:
+                return 0
+            # new_searches is scanned once, and counted into both rollups
+            cursor: CursorResult = await connection.execute(
+                text(
+                    "WITH new_searches AS ("
+                    "SELECT date_trunc('hour', created_at) AS bucket, "
+                    "search_term, user_id FROM search_results "
+                    "WHERE created_at > :last_run AND created_at <= :until"
+                    "), terms AS ("
+                    "INSERT INTO search_terms_hourly (bucket, search_term, searches) "
+                    "SELECT bucket, search_term, COUNT(*) FROM new_searches "
+                    "GROUP BY bucket, search_term "
+                    "ON CONFLICT (bucket, search_term) DO UPDATE "
+                    "SET searches = search_terms_hourly.searches + EXCLUDED.searches"
+                    "), users AS ("
+                    "INSERT INTO user_searches_hourly (bucket, user_id, searches) "
+                    "SELECT bucket, user_id, COUNT(*) FROM new_searches "
+                    "GROUP BY bucket, user_id "
+                    "ON CONFLICT (bucket, user_id) DO UPDATE "
+                    "SET searches = user_searches_hourly.searches + EXCLUDED.searches"
+                    ") "
+                    "SELECT COUNT(*) FROM new_searches"
+                ),
+                {"last_run": last_run, "until": until},
+            )
+            rolled_up: int = cursor.scalar_one()
+            await connection.execute(
+                text(
+                    "INSERT INTO analytics_rollup_status (name, last_run) "
+                    "VALUES (:name, :last_run) "
+                    "ON CONFLICT (name) DO UPDATE SET last_run = EXCLUDED.last_run"
+                ),
+                {"name": "search_rollups", "last_run": until},
+            )
+        return rolled_up
+
+    @async_retry(name="yahoo_search_dao.fetch_top_search_terms")
+    async def fetch_top_search_terms(
+        self, start: datetime, end: datetime, limit: int
+    ) -> list[SearchTermCount]:
+        """
+        Use Case 2: most common search terms, with start <= created_at < end
+        - Hour-aligned; a search counts in the hour it was made
+        - Sums hourly rollups, never reads search_results
+        """
+        async with self._engine.begin() as connection:
+            cursor: CursorResult = await connection.execute(
+                text(
+                    "SELECT search_term, SUM(searches) AS total "
+                    "FROM search_terms_hourly "
+                    "WHERE bucket >= date_trunc('hour', CAST(:start AS timestamp)) "
+                    "AND bucket < :end "
+                    "GROUP BY search_term "
+                    "ORDER BY total DESC, search_term "
+                    "LIMIT :limit"
+                ),
+                {"start": start, "end": end, "limit": limit},
+            )
+            return [
+                SearchTermCount(search_term=curr_row[0], searches=curr_row[1])
+                for curr_row in cursor
             ]
-        return results_row
+
+    @async_retry(name="yahoo_search_dao.fetch_top_users")
+    async def fetch_top_users(
+        self, start: datetime, end: datetime, limit: int
+    ) -> list[UserSearchCount]:
+        """
+        Use Case 2: users who query us the most, with start <= created_at < end
+        """
+        async with self._engine.begin() as connection:
+            cursor: CursorResult = await connection.execute(
+                text(
+                    "SELECT user_id, SUM(searches) AS total "
+                    "FROM user_searches_hourly "
+                    "WHERE bucket >= date_trunc('hour', CAST(:start AS timestamp)) "
+                    "AND bucket < :end "
+                    "GROUP BY user_id "
+                    "ORDER BY total DESC, user_id "
+                    "LIMIT :limit"
+                ),
+                {"start": start, "end": end, "limit": limit},
+            )
+            return [
+                UserSearchCount(user_id=curr_row[0], searches=curr_row[1])
+                for curr_row in cursor
+            ]
+
+    @async_retry(name="yahoo_search_dao.fetch_busiest_periods")
+    async def fetch_busiest_periods(
+        self, start: datetime, end: datetime, period: str, limit: int
+    ) -> list[SearchPeriodCount]:
+        """
+        Use Case 2: time periods with the most queries, with start <= created_at < end
+        :param period: one of ANALYTICS_PERIODS; the hourly rollups are re-bucketed into it
+        """
+        if period not in ANALYTICS_PERIODS:
+            raise ValueError(f"period must be one of {ANALYTICS_PERIODS}: {period}")
+        async with self._engine.begin() as connection:
+            cursor: CursorResult = await connection.execute(
+                text(
+                    "SELECT date_trunc(:period, bucket) AS period_start, "
+                    "SUM(searches) AS total "
+                    "FROM search_terms_hourly "
+                    "WHERE bucket >= date_trunc('hour', CAST(:start AS timestamp)) "
+                    "AND bucket < :end "
+                    "GROUP BY 1 "
+                    "ORDER BY total DESC, period_start "
+                    "LIMIT :limit"
+                ),
+                {"period": period, "start": start, "end": end, "limit": limit},
+            )
+            return [
+                SearchPeriodCount(period_start=curr_row[0], searches=curr_row[1])
+                for curr_row in cursor
+            ]
+
+    @async_retry(name="yahoo_search_dao.fetch_search_results_partitions")
+    async def fetch_search_results_partitions(self) -> list[SearchResultsPartition]:
+        """
+        Range partitions of search_results, ordered by start
+        - The default partition isn't one; see default_partition_has_rows
+        """
+        async with self._engine.begin() as connection:
+            cursor: CursorResult = await connection.execute(
+                text(
+                    "SELECT child.relname, "
+                    "pg_get_expr(child.relpartbound, child.oid) "
+                    "FROM pg_inherits "
+                    "JOIN pg_class parent ON pg_inherits.inhparent = parent.oid "
+                    "JOIN pg_class child ON pg_inherits.inhrelid = child.oid "
+                    "WHERE parent.relname = 'search_results'"
+                )
+            )
+            rows: list[Row] = list(cursor)
+        partitions: list[SearchResultsPartition] = []
+        for name, bound in rows:
+            # e.g FOR VALUES FROM ('2024-06-19 00:00:00') TO ('2024-06-20 00:00:00')
+            match: re.Match[str] | None = _PARTITION_BOUND.search(bound)
+            if match is None:
+                continue
+            start, end = (
+                (
+                    None
+                    if value == "MINVALUE"
+                    else datetime.fromisoformat(value.strip("'"))
+                )
+                for value in match.groups()
+            )
+            partitions.append(SearchResultsPartition(name=name, start=start, end=end))
+        return sorted(partitions, key=lambda p: p.start or datetime.min)
+
+    @async_retry(name="yahoo_search_dao.default_partition_has_rows")
+    async def default_partition_has_rows(self) -> bool:
+        """
+        Rows land in search_results_default when no partition covers their created_at
+        """
+        async with self._engine.begin() as connection:
+            cursor: CursorResult = await connection.execute(
+                text("SELECT EXISTS (SELECT 1 FROM search_results_default)")
+            )
+            return bool(cursor.scalar_one())
+
+    @async_retry(name="yahoo_search_dao.create_search_results_partition")
+    async def create_search_results_partition(
+        self, partition: SearchResultsPartition
+    ) -> None:
+        """
+        DDL takes no bind params; name and bounds come from
+        SearchResultsPartitionMaintenance, never from a request
+        """
+        assert partition.start is not None and partition.end is not None
+        async with self._engine.begin() as connection:
+            await connection.execute(
+                text(
+                    f"CREATE TABLE IF NOT EXISTS {partition.name} "
+                    "PARTITION OF search_results FOR VALUES "
+                    f"FROM ('{partition.start.isoformat(sep=' ')}') "
+                    f"TO ('{partition.end.isoformat(sep=' ')}')"
+                )
+            )
+
+    @async_retry(name="yahoo_search_dao.detach_search_results_partition")
+    async def detach_search_results_partition(self, name: str, drop: bool) -> None:
+        """
+        Detaching is a catalog change, instant whatever the partition's size
+        - Unlike DELETE, nothing is left behind for vacuum
+        - With drop=False, the rows stay in a standalone table, e.g to pg_dump them
+        """
+        async with self._engine.begin() as connection:
+            await connection.execute(
+                text(f"ALTER TABLE search_results DETACH PARTITION {name}")
+            )
+            if drop:
+                await connection.execute(text(f"DROP TABLE {name}"))
 
 
 if __name__ == "__main__":
-    dao: YahooSearchDAO = YahooSearchDAO()
+    config: dict[str, Any] = toml.load("local_config/config.toml")
+    dao: YahooSearchDAO = YahooSearchDAO(config["database"])
     sample_user: User = User.create_user()
     sample_search_results: SearchResults = SearchResults.create(
         sample_user.user_id, "how to work at macdonalds", "Dummy Search Results"
     )
 
-    event_loop = asyncio.new_event_loop()
+    event_loop: asyncio.AbstractEventLoop = new_event_loop(
+        EventLoopConfig(**config.get("event_loop", {}))
+    )
     """
     each line here runs asynchronously
     We know it does, as run_until_complete is not awaited, and no Future is returned
@@ -225,3 +848,5 @@ if __name__ == "__main__":
     print(f"fetch_all_searches: {search_results}")
     users: list[User] = event_loop.run_until_complete(dao.fetch_all_users())
     print(f"fetch_all_searches: {users}")
+    event_loop.run_until_complete(dao.close())
+    event_loop.close()
@@ -0,0 +1,180 @@
+import asyncio
+import logging
+import time
+from collections.abc import Sequence
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any
+
+import toml
+from pydantic import BaseModel
+
+from src.models.extracted_search_result import ExtractedSearchResult
+from src.models.search_hit import SearchHit
+from src.services.yahoo_search_dao import YahooSearchDAO
+from src.services.yahoo_search_parser import parse_search_hits
+from src.utils.cpu_executor import CpuExecutor, CpuExecutorConfig
+from src.utils.event_loop import EventLoopConfig, run_event_loop
+from src.utils.logging_utils import setup_logging
+
+
+class YahooSearchETLConfig(BaseModel):
+    """
+    Loaded from the [etl] section of local_config/config.toml
+
+    - concurrency: max number of users extracted at the same time
+    - batch_size: search_results rows fetched per round-trip of the server-side cursor
+    - lag_seconds: rows newer than this are left for the next run
+    (search results are written behind, so the newest rows may not be inserted yet)
+    """
+
+    concurrency: int = 4
+    batch_size: int = 500
+    lag_seconds: float = 60
+
+
+@dataclass
+class ETLReport:
+    users: int = 0
+    failed_users: int = 0
+    searches: int = 0
+    extracted: int = 0
+    seconds: float = 0.0
+
+    @property
+    def searches_per_second(self) -> float:
+        return self.searches / self.seconds if self.seconds else 0.0
+
+    @property
+    def extracted_per_second(self) -> float:
+        return self.extracted / self.seconds if self.seconds else 0.0
+
+
+class YahooSearchETL:
+    """
+    Extract: search_results rows not extracted yet, per user
+    Transform: parse their raw html into SearchHits
+    Load: bulk-insert them into extracted_search_results
+
+    Incremental
+    - last_extracted_user_status.last_run is each user's watermark
+    - A run only reads rows newer than it, then advances it in the same transaction
+    (see YahooSearchDAO.extract_searches_for_user)
+
+    Users are extracted concurrently, bounded by a semaphore
+    - So a run never holds more than `concurrency` database connections
+    """
+
+    def __init__(
+        self,
+        yahoo_search_dao: YahooSearchDAO,
+        config: YahooSearchETLConfig,
+        cpu_executor: CpuExecutor | None = None,
+    ) -> None:
+        """
+        cpu_executor parses a batch of pages in parallel, across worker processes
+        - Without it, pages are parsed one by one on the event loop
+        """
+        self.__logger: logging.Logger = logging.getLogger(__name__)
+        self.__yahoo_search_dao: YahooSearchDAO = yahoo_search_dao
+        self.__config: YahooSearchETLConfig = config
+        self.__cpu_executor: CpuExecutor = cpu_executor or CpuExecutor(
+            CpuExecutorConfig(kind="inline")
+        )
+        setup_logging(self.__logger)
+
+    async def transform(
+        self, rows: Sequence[tuple[str, str | None, datetime]], user_id: str
+    ) -> list[ExtractedSearchResult]:
+        """
+        :param rows: (search_id, result, created_at) of one user's searches
+        """
+        pages_hits: list[list[SearchHit]] = await asyncio.gather(
+            *(
+                self.__cpu_executor.run(
+                    parse_search_hits, (row[1] or "").encode("utf-8")
+                )
+                for row in rows
+            )
+        )
+        return [
+            ExtractedSearchResult.create(user_id, hit, row[2])
+            for row, hits in zip(rows, pages_hits)
+            for hit in hits
+        ]
+
+    async def run(self) -> ETLReport:
+        report: ETLReport = ETLReport()
+        start: float = time.perf_counter()
+        until: datetime = datetime.utcnow() - timedelta(
+            seconds=self.__config.lag_seconds
+        )
+        semaphore: asyncio.Semaphore = asyncio.Semaphore(self.__config.concurrency)
+        user_ids: list[str] = await self.__yahoo_search_dao.fetch_user_ids()
+        await asyncio.gather(
+            *(self._run_user(user_id, until, semaphore, report) for user_id in user_ids)
+        )
+        report.seconds = time.perf_counter() - start
+        return report
+
+    async def _run_user(
+        self,
+        user_id: str,
+        until: datetime,
+        semaphore: asyncio.Semaphore,
+        report: ETLReport,
+    ) -> None:
+        async with semaphore:
+            try:
+                searches, extracted = (
+                    await self.__yahoo_search_dao.extract_searches_for_user(
+                        user_id,
+                        until,
+                        lambda rows: self.transform(rows, user_id),
+                        self.__config.batch_size,
+                    )
+                )
+            except Exception as e:
+                # the user's watermark is untouched; the next run picks it up again
+                self.__logger.error("Extraction failed for user %s: %s", user_id, e)
+                report.failed_users += 1
+                return
+        report.users += 1
+        report.searches += searches
+        report.extracted += extracted
+
+
+if __name__ == "__main__":
+    """
+    Run one incremental extraction, e.g from a cron job:
+    python -m src.services.yahoo_search_etl
+    """
+    config: dict[str, Any] = toml.load("local_config/config.toml")
+    etl_cpu_executor: CpuExecutor = CpuExecutor(
+        CpuExecutorConfig(**config.get("cpu_executor", {}))
+    )
+    etl_dao: YahooSearchDAO = YahooSearchDAO(config["database"])
+    etl: YahooSearchETL = YahooSearchETL(
+        etl_dao,
+        YahooSearchETLConfig(**config.get("etl", {})),
+        etl_cpu_executor,
+    )
+
+    async def run_etl() -> ETLReport:
+        etl_cpu_executor.start()
+        try:
+            return await etl.run()
+        finally:
+            await etl_cpu_executor.close()
+            await etl_dao.close()
+
+    etl_report: ETLReport = run_event_loop(
+        run_etl(), EventLoopConfig(**config.get("event_loop", {}))
+    )
+    print(
+        f"Extracted {etl_report.users} users ({etl_report.failed_users} failed): "
+        f"{etl_report.searches} searches -> {etl_report.extracted} results "
+        f"in {etl_report.seconds:.2f}s "
+        f"({etl_report.searches_per_second:.1f} searches/sec, "
+        f"{etl_report.extracted_per_second:.1f} results/sec)"
+    )
@@ -0,0 +1,147 @@
+import re
+from html.parser import HTMLParser
+from urllib.parse import unquote
+
+from src.models.search_hit import SearchHit
+
+# each organic result is a <div class="dd algo ..."> block
+# sponsored results use "ads" instead of "algo", so they never match
+_ALGO_BLOCK_START: re.Pattern[bytes] = re.compile(
+    rb"<div[^>]*class=\"[^\"]*\balgo\b[^\"]*\"", re.IGNORECASE
+)
+_RESULTS_END: re.Pattern[bytes] = re.compile(rb"</ol>", re.IGNORECASE)
+# yahoo wraps every link as https://r.search.yahoo.com/.../RU=<url encoded link>/RK=...
+_REDIRECT_TARGET: re.Pattern[str] = re.compile(r"/RU=([^/]+)/R[KS]=")
+
+
+class _AlgoBlockParser(HTMLParser):
+    """
+    Parses a single algo block
+
+    <div class="dd algo">
+        <h3 class="title"><a href="..."><span>domain › breadcrumbs</span>Title</a></h3>
+        <div class="compText">
+            <p><span class="fc-2nd">Apr 2, 2024 · </span><span>Body</span></p>
+        </div>
+    </div>
+    """
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.href: str | None = None
+        self.title_parts: list[str] = []
+        self.date_parts: list[str] = []
+        self.body_parts: list[str] = []
+        self.__in_title: bool = False
+        self.__title_span_depth: int = 0
+        self.__comp_text_depth: int = 0
+        self.__in_date: bool = False
+        self.__div_depth: int = 0
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        classes: list[str] = (dict(attrs).get("class") or "").split()
+        if tag == "div":
+            self.__div_depth += 1
+            if "compText" in classes and not self.__comp_text_depth:
+                self.__comp_text_depth = self.__div_depth
+        elif tag == "a" and self.href is None and not self.__comp_text_depth:
+            self.href = dict(attrs).get("href")
+            self.__in_title = True
+        elif tag == "span":
+            if self.__in_title:
+                # the domain + breadcrumbs, shown above the title
+                self.__title_span_depth += 1
+            elif self.__comp_text_depth and "fc-2nd" in classes:
+                self.__in_date = True
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag == "div":
+            if self.__comp_text_depth == self.__div_depth:
+                self.__comp_text_depth = 0
+            self.__div_depth -= 1
+        elif tag == "a":
+            self.__in_title = False
+        elif tag == "span":
+            if self.__title_span_depth:
+                self.__title_span_depth -= 1
+            self.__in_date = False
+
+    def handle_data(self, data: str) -> None:
+        if self.__in_title and not self.__title_span_depth:
+            self.title_parts.append(data)
+        elif self.__in_date:
+            self.date_parts.append(data)
+        elif self.__comp_text_depth:
+            self.body_parts.append(data)
+
+
+class YahooSearchParser:
+    """
+    Turns the raw html of a Yahoo search results page into SearchHits
+
+    A results page is 300 - 800 KB, but the organic results are a few KB of it
+    - The rest is <script>, <style> and page chrome
+    - So we first find each algo block with a regex over the raw bytes,
+    and only decode + feed those slices into an HTMLParser
+    - This skips decoding and tokenizing > 95% of the page
+    """
+
+    @staticmethod
+    def parse(html: str | bytes, limit: int = 10) -> list[SearchHit]:
+        if isinstance(html, str):
+            html = html.encode("utf-8")
+        starts: list[int] = [
+            match.start() for match in _ALGO_BLOCK_START.finditer(html)
+        ]
+        hits: list[SearchHit] = []
+        for index, start in enumerate(starts):
+            if len(hits) >= limit:
+                break
+            if index + 1 < len(starts):
+                end: int = starts[index + 1]
+            else:
+                results_end: re.Match[bytes] | None = _RESULTS_END.search(html, start)
+                end = results_end.start() if results_end else len(html)
+            hit: SearchHit | None = YahooSearchParser._parse_block(
+                html[start:end].decode("utf-8", errors="replace")
+            )
+            if hit is not None:
+                hits.append(hit)
+        return hits
+
+    @staticmethod
+    def _parse_block(block: str) -> SearchHit | None:
+        parser: _AlgoBlockParser = _AlgoBlockParser()
+        parser.feed(block)
+        parser.close()
+        if not parser.href:
+            return None
+        date: str = YahooSearchParser._clean(parser.date_parts).rstrip(" ·")
+        body: str = YahooSearchParser._clean(parser.body_parts)
+        return SearchHit(
+            title=YahooSearchParser._clean(parser.title_parts),
+            url=YahooSearchParser.resolve_url(parser.href),
+            date=date or None,
+            body=body or None,
+        )
+
+    @staticmethod
+    def resolve_url(href: str) -> str:
+        """
+        Yahoo links go through its click tracker; return the site it redirects to
+        - https://r.search.yahoo.com/_ylt=.../RU=https%3a%2f%2fen.wikipedia.org%2fwiki%2fTea/RK=2/RS=...
+        -> https://en.wikipedia.org/wiki/Tea
+        """
+        match: re.Match[str] | None = _REDIRECT_TARGET.search(href)
+        return unquote(match.group(1)) if match else href
+
+    @staticmethod
+    def _clean(parts: list[str]) -> str:
+        return " ".join("".join(parts).split())
+
+
+def parse_search_hits(html: bytes) -> list[SearchHit]:
+    """
+    Module-level entry point, so CpuExecutor can pickle it into a worker process
+    """
+    return YahooSearchParser.parse(html)
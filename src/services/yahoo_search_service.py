@@ -1,47 +1,207 @@
 import logging
+import uuid
+from collections.abc import AsyncGenerator
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+from typing import Any
 from urllib.parse import quote
 import aiohttp
-import requests
-from retry import retry
+import toml
+from pydantic import BaseModel
+from src.models.batch_search_outcome import BatchSearchOutcome
+from src.models.search_hit import SearchHit
 from src.models.search_results import SearchResults
 from src.models.user import User
+from src.services.search_cache import SearchCacheStats, SearchResultCache
+from src.services.search_results_writer import (
+    SearchResultsWriter,
+    SearchResultsWriterStats,
+)
 from src.services.yahoo_search_dao import YahooSearchDAO
+from src.services.yahoo_search_parser import parse_search_hits
+from src.utils.async_retry import async_retry
+from src.utils.circuit_breaker import (
+    CIRCUIT_FALLBACKS,
+    CircuitBreaker,
+    CircuitBreakerConfig,
+    CircuitOpenError,
+)
+from src.utils.cpu_executor import CpuExecutor, CpuExecutorConfig
+from src.utils.deadline import DeadlineExceeded, clear_deadline, stage_timeout
+from src.utils.event_loop import EventLoopConfig, run_event_loop
+from src.utils.http_client import HttpClientConfig, create_client_session
 from src.utils.logging_utils import setup_logging
+from src.utils.metrics import STAGE_SECONDS, UPSTREAM_RESPONSES
+from src.utils.single_flight import SingleFlight, SingleFlightStats
+from src.utils.upstream_limiter import (
+    UpstreamLimiter,
+    UpstreamLimiterStats,
+    is_throttled,
+)
 import asyncio
 
 
+class SearchBatchConfig(BaseModel):
+    """
+    Loaded from the [search_batch] section of local_config/config.toml
+
+    - max_queries: most queries accepted in one /search/batch request
+    - concurrency: most queries of one batch searched at the same time
+    """
+
+    max_queries: int = 100
+    concurrency: int = 8
+
+
 class YahooSearchService:
-    def __init__(self, yahoo_search_dao: YahooSearchDAO = YahooSearchDAO()) -> None:
+    def __init__(
+        self,
+        yahoo_search_dao: YahooSearchDAO,
+        http_client_config: HttpClientConfig = HttpClientConfig(),
+        search_cache: SearchResultCache | None = None,
+        search_results_writer: SearchResultsWriter | None = None,
+        cpu_executor: CpuExecutor | None = None,
+        upstream_limiter: UpstreamLimiter | None = None,
+        circuit_breaker: CircuitBreaker | None = None,
+    ) -> None:
         """
         We do encapsulation here by making these attributes private
         so that it provides a clean interface
         for interacting with the class. It is not accessible outside the class
+
+        The ClientSession is shared by every search
+        - Opening a session per search pays DNS + TCP connect + TLS handshake
+        to Yahoo on every single query
+        - A shared session keeps connections alive in its connector pool
+
+        search_cache is optional; without it, every search goes to Yahoo
+
+        search_results_writer is optional; without it,
+        every search is inserted before yahoo_search returns
+
+        cpu_executor runs CPU-bound work (parsing) off the event loop
+        - Without it, parsing runs inline
+
+        upstream_limiter is optional; without it, every search that misses
+        the cache and isn't coalesced calls Yahoo right away
+
+        circuit_breaker is optional; without it, every search calls Yahoo
+        (and waits out its timeouts and retries) while Yahoo is down
         """
-        self.__logger: logging.Logger = logging.Logger(__name__)
+        self.__logger: logging.Logger = logging.getLogger(__name__)
         self.__yahoo_search_dao: YahooSearchDAO = yahoo_search_dao
+        self.__http_client_config: HttpClientConfig = http_client_config
+        self.__session: aiohttp.ClientSession | None = None
+        self.__search_cache: SearchResultCache | None = search_cache
+        self.__single_flight: SingleFlight[str | None] = SingleFlight()
+        self.__search_results_writer: SearchResultsWriter | None = search_results_writer
+        self.__cpu_executor: CpuExecutor = cpu_executor or CpuExecutor(
+            CpuExecutorConfig(kind="inline")
+        )
+        self.__upstream_limiter: UpstreamLimiter | None = upstream_limiter
+        self.__circuit_breaker: CircuitBreaker | None = circuit_breaker
         setup_logging(self.__logger)
 
+    async def start(self) -> None:
+        """
+        Opens the shared ClientSession, and starts the search_results_writer
+        - Called on aiohttp app startup, so both bind to the server's loop
+        """
+        if self.__session is None or self.__session.closed:
+            self.__session = create_client_session(self.__http_client_config)
+        if self.__search_results_writer is not None:
+            await self.__search_results_writer.start()
+
+    async def close(self) -> None:
+        """
+        Flushes the search_results_writer,
+        then closes the shared ClientSession and every pooled connection
+        - Called on aiohttp app cleanup
+        """
+        if self.__search_results_writer is not None:
+            await self.__search_results_writer.close()
+        if self.__session is not None and not self.__session.closed:
+            await self.__session.close()
+        self.__session = None
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """
+        Lazily opens the session, for callers that never called start()
+        e.g scripts using asyncio.run
+        """
+        if self.__session is None or self.__session.closed:
+            self.__session = create_client_session(self.__http_client_config)
+        return self.__session
+
     @staticmethod
-    def create_url(search_term: str) -> str:
+    def create_url(
+        search_term: str, base_url: str = "https://sg.search.yahoo.com/search"
+    ) -> str:
         """
         Given a search term e.g "menstrual cycle"
         1. Url encode it -> "menstrual+cycle"
         2. Concatenate the base url "https://sg.search.yahoo.com/search?q=" with step 1
         :param search_term:
+        :param base_url: overridden in benchmarks to point at a stub server
         :return:
 
         TODO: Unit test this
         """
-        return f"https://sg.search.yahoo.com/search?q={quote(search_term)}"
+        return f"{base_url}?q={quote(search_term)}"
 
-    @retry(
-        exceptions=requests.exceptions.HTTPError,
-        tries=5,
-        delay=0.01,
-        jitter=(-0.01, 0.01),
-        backoff=2,
-    )
     async def _search(self, user_id: str, search_term: str) -> SearchResults:
+        """
+        Searches Yahoo for search_term, on behalf of user_id
+
+        Concurrent searches for the same normalized term share one upstream fetch
+        - Each caller still gets its own SearchResults (own search_id, user_id)
+        """
+
+        async def fetch() -> str | None:
+            # its task copied the first caller's context, deadline included;
+            # shared, it is bounded by attempt_timeout_seconds and @async_retry only
+            clear_deadline()
+            return await self._fetch(search_term)
+
+        # each caller waits until its own deadline; the fetch, shielded, goes on
+        async with stage_timeout("upstream"):
+            result: str | None = await self.__single_flight.do(
+                SearchResults.normalize_search_term(search_term), fetch
+            )
+        return SearchResults.create(
+            user_id=user_id, search_term=search_term, result=result
+        )
+
+    @property
+    def single_flight_stats(self) -> SingleFlightStats:
+        return self.__single_flight.stats
+
+    @property
+    def search_cache_stats(self) -> SearchCacheStats | None:
+        return self.__search_cache.stats if self.__search_cache is not None else None
+
+    @property
+    def circuit_breaker(self) -> CircuitBreaker | None:
+        return self.__circuit_breaker
+
+    @property
+    def upstream_limiter_stats(self) -> UpstreamLimiterStats | None:
+        return (
+            self.__upstream_limiter.stats
+            if self.__upstream_limiter is not None
+            else None
+        )
+
+    @property
+    def search_results_writer_stats(self) -> SearchResultsWriterStats | None:
+        return (
+            self.__search_results_writer.stats
+            if self.__search_results_writer is not None
+            else None
+        )
+
+    @async_retry(name="yahoo_search_service._fetch")
+    async def _fetch(self, search_term: str) -> str | None:
         """
         TODO: Integration test this
 
@@ -64,53 +224,139 @@ class YahooSearchService:
         Makes a request to a google search url
 
         Step 1: Make the API call
-        - You can run into HTTPError; eg wifi go down
-        - Log and Retry the query if it raises a HTTPError
+        - You can run into aiohttp.ClientError; eg wifi go down
+        - Log and Retry the query if it raises a aiohttp.ClientError
+        or times out (see is_retriable in src/utils/async_retry.py)
 
         Step 2: response succeeded
         - status code is 400 (we as the client fucked up)
         - 200 (success)
         - 500 (server error, the google search engine fucked up)
         """
-        self.__logger.info(f"Started google_search for {search_term}")
+        # while Yahoo is down, fails fast with CircuitOpenError; never retried
+        if self.__circuit_breaker is not None:
+            self.__circuit_breaker.before_call()
+        self.__logger.info("Started google_search for %s", search_term)
+        # None until Yahoo answers, or fails to; a 429 or 5xx counts as a failure:
+        # sustained throttling opens the circuit, as an outage does
+        upstream_ok: bool | None = None
         try:
             """
             catch the request get
             you can commonly get intermittent wifi errors
-            when we do, we get a HTTPError
+            when we do, we get a aiohttp.ClientError
             """
-            url: str = YahooSearchService.create_url(search_term)
+            url: str = YahooSearchService.create_url(
+                search_term, self.__http_client_config.base_url
+            )
             headers: dict[str, str] = {
                 "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36"
             }
-            async with aiohttp.ClientSession() as client:
-                async with client.get(url, headers=headers, ssl=False) as response:
-                    if response.status == 200:
-                        # result is the html
-                        result: str = await response.text()
-                        search_result = SearchResults.create(
-                            user_id=user_id, search_term=search_term, result=result
-                        )
-                        return search_result
-                    else:
-                        self.__logger.error(
-                            f"Response has a non-200 status code: "
-                            f"{response.status} for url: {url}"
-                        )
-                        return SearchResults.create(
-                            user_id=user_id, search_term=search_term, result=None
-                        )
+            client: aiohttp.ClientSession = await self._get_session()
+            # one attempt, its wait behind the upstream_limiter (if any) included,
+            # is bounded by attempt_timeout_seconds and the request's deadline;
+            # the wait is not timed by upstream_fetch below
+            async with stage_timeout(
+                "upstream_fetch", self.__http_client_config.attempt_timeout_seconds
+            ), (
+                self.__upstream_limiter.acquire()
+                if self.__upstream_limiter is not None
+                else nullcontext()
+            ):
+                # one attempt; @async_retry times each one separately
+                with STAGE_SECONDS.labels("upstream_fetch").time():
+                    async with client.get(url, headers=headers) as response:
+                        UPSTREAM_RESPONSES.labels(str(response.status)).inc()
+                        upstream_ok = not is_throttled(response.status)
+                        if self.__upstream_limiter is not None:
+                            self.__upstream_limiter.on_response(response.status)
+                        if response.status == 200:
+                            # result is the html
+                            result: str = await response.text()
+                            return result
+                        else:
+                            self.__logger.error(
+                                "Response has a non-200 status code: %d for url: %s",
+                                response.status,
+                                url,
+                            )
+                            return None
+        except asyncio.TimeoutError:
+            # aiohttp's connect / read timeouts, or attempt_timeout_seconds
+            UPSTREAM_RESPONSES.labels("timeout").inc()
+            upstream_ok = False
+            raise
         except aiohttp.ClientError as e:
             """
             Simplification: assume that all aiohttp.ClientError is retriable
             """
-            self.__logger.error(e)
+            UPSTREAM_RESPONSES.labels("error").inc()
+            upstream_ok = False
+            self.__logger.error("%s", e)
             raise e
+        finally:
+            if self.__circuit_breaker is not None:
+                self.__circuit_breaker.record(upstream_ok)
+
+    async def resolve(self, user_id: str, search_term: str) -> SearchResults:
+        """
+        Searches, without persisting
+        - With a search_cache, a result from the last hour is reused
+        - Otherwise searches Yahoo, and caches the result
+        - Raises if Yahoo can't be reached
+        """
+        cached_result: str | None = None
+        if self.__search_cache is not None:
+            async with stage_timeout("cache_lookup"):
+                cached_result = await self.__search_cache.get(search_term)
+        if cached_result is not None:
+            return SearchResults.create(
+                user_id=user_id, search_term=search_term, result=cached_result
+            )
+        result: SearchResults = await self._search(user_id, search_term)
+        if self.__search_cache is not None:
+            self.__search_cache.put(search_term, result.result, result.created_at)
+        return result
+
+    async def serve_stale(self, user_id: str, search_term: str) -> SearchResults:
+        """
+        While the circuit to Yahoo is open: the latest result stored for
+        search_term, within the circuit breaker's stale_max_age_seconds
+        - created_at is the stored search's, so the caller can tell its age
+        - It gets its own search_id and user_id; and is not persisted again,
+        so a stale page never looks fresh to the search_cache
+        :raises CircuitOpenError: if there is none, or serve_stale is off
+        """
+        assert self.__circuit_breaker is not None
+        config: CircuitBreakerConfig = self.__circuit_breaker.config
+        row: SearchResults | None = None
+        if config.serve_stale:
+            try:
+                row = await self.__yahoo_search_dao.fetch_recent_search(
+                    search_term,
+                    datetime.utcnow() - timedelta(seconds=config.stale_max_age_seconds),
+                )
+            except Exception as e:
+                # e.g the database is down too; fail fast all the same
+                self.__logger.error("Stale lookup for %s failed: %s", search_term, e)
+        if row is None or row.result is None:
+            CIRCUIT_FALLBACKS.labels("failed_fast").inc()
+            raise CircuitOpenError(
+                f"Yahoo is failing, and no stored result for {search_term}"
+            )
+        CIRCUIT_FALLBACKS.labels("stale").inc()
+        return SearchResults(
+            search_id=str(uuid.uuid4()),
+            user_id=user_id,
+            search_term=search_term,
+            result=row.result,
+            created_at=row.created_at,
+        )
 
     async def yahoo_search(self, user_id: str, search_term: str) -> SearchResults:
         """
         Does two things:
-        - Performs the search
+        - Performs the search (see resolve)
         - Persist result into the database
 
         Unit test this
@@ -118,38 +364,166 @@ class YahooSearchService:
         - If it raises exception, ensure it creates a dummy result
         (SearchResults.create with results=None)
         - insert_search is always called
+        (or the result is submitted to the search_results_writer)
+
+        With a search_cache, a result from the last hour is reused
+        - The user still gets their own row (own search_id, user_id, created_at)
+
+        While the circuit to Yahoo is open, nothing is persisted
+        - A stale result is returned (see serve_stale),
+        or CircuitOpenError is raised; no result=None row is written
+
+        Every stage runs within the request's deadline (see src/utils/deadline.py)
+        - DeadlineExceeded is raised as is; there is no time left to persist
         """
         try:
-            result: SearchResults = await self._search(user_id, search_term)
+            result: SearchResults = await self.resolve(user_id, search_term)
+        except CircuitOpenError:
+            return await self.serve_stale(user_id, search_term)
+        except DeadlineExceeded:
+            raise
         except Exception as e:
-            self.__logger.error(f"Ran in error {e}")
+            self.__logger.error("Ran in error %s", e)
             result = SearchResults.create(
                 user_id=user_id, search_term=search_term, result=None
             )
-        await self.__yahoo_search_dao.insert_search(result)
+        async with stage_timeout("db_insert"):
+            await self._persist(result)
         return result
 
+    async def yahoo_search_batch(
+        self, user_id: str, search_terms: list[str], concurrency: int
+    ) -> AsyncGenerator[BatchSearchOutcome, None]:
+        """
+        Searches many terms for one user, yielding each one as soon as it completes
+        - So the slowest search doesn't hold back the others
+
+        - Terms that normalize to the same key are searched (and persisted) once
+        - At most `concurrency` searches are in flight
+        - A failed search is yielded with its error, and persisted with result=None,
+        like yahoo_search does
+        - While the circuit to Yahoo is open, a search is yielded stale,
+        or with its CircuitOpenError; neither is persisted
+        - Nor is a search that ran out of the request's deadline
+        - Once every search is yielded, all of them are persisted
+        in one bulk insert; which raises if it fails
+
+        Closing the iterator early (e.g the client disconnected)
+        cancels the searches still in flight, and persists nothing
+        """
+        positions: dict[str, list[int]] = {}
+        for index, search_term in enumerate(search_terms):
+            positions.setdefault(
+                SearchResults.normalize_search_term(search_term), []
+            ).append(index)
+        semaphore: asyncio.Semaphore = asyncio.Semaphore(concurrency)
+
+        async def search(indexes: list[int]) -> BatchSearchOutcome:
+            search_term: str = search_terms[indexes[0]]
+            async with semaphore:
+                try:
+                    return BatchSearchOutcome(
+                        indexes, await self.resolve(user_id, search_term), None
+                    )
+                except DeadlineExceeded as e:
+                    return BatchSearchOutcome(
+                        indexes,
+                        SearchResults.create(
+                            user_id=user_id, search_term=search_term, result=None
+                        ),
+                        e,
+                        persist=False,
+                    )
+                except CircuitOpenError as e:
+                    try:
+                        return BatchSearchOutcome(
+                            indexes,
+                            await self.serve_stale(user_id, search_term),
+                            None,
+                            persist=False,
+                        )
+                    except CircuitOpenError:
+                        return BatchSearchOutcome(
+                            indexes,
+                            SearchResults.create(
+                                user_id=user_id, search_term=search_term, result=None
+                            ),
+                            e,
+                            persist=False,
+                        )
+                except Exception as e:
+                    self.__logger.error("Ran in error %s", e)
+                    return BatchSearchOutcome(
+                        indexes,
+                        SearchResults.create(
+                            user_id=user_id, search_term=search_term, result=None
+                        ),
+                        e,
+                    )
+
+        tasks: list[asyncio.Task[BatchSearchOutcome]] = [
+            asyncio.create_task(search(indexes)) for indexes in positions.values()
+        ]
+        results: list[SearchResults] = []
+        try:
+            for next_outcome in asyncio.as_completed(tasks):
+                outcome: BatchSearchOutcome = await next_outcome
+                if outcome.persist:
+                    results.append(outcome.result)
+                yield outcome
+        finally:
+            for task in tasks:
+                task.cancel()
+        async with stage_timeout("db_insert_batch"):
+            await self.__yahoo_search_dao.insert_searches(results)
+
+    async def parse_hits(self, result: str | None) -> list[SearchHit]:
+        """
+        Parses the html of a search into its top 10 SearchHits, on the cpu_executor
+        - The html crosses into the worker process as utf-8 bytes
+        """
+        if result is None:
+            return []
+        return await self.__cpu_executor.run(parse_search_hits, result.encode("utf-8"))
+
+    async def _persist(self, result: SearchResults) -> None:
+        if self.__search_results_writer is not None:
+            await self.__search_results_writer.submit(result)
+        else:
+            await self.__yahoo_search_dao.insert_search(result)
+
 
 if __name__ == "__main__":
     search_term: str = "Coffee"
-    dao: YahooSearchDAO = YahooSearchDAO()
+    config: dict[str, Any] = toml.load("local_config/config.toml")
+    event_loop_config: EventLoopConfig = EventLoopConfig(**config.get("event_loop", {}))
+    dao: YahooSearchDAO = YahooSearchDAO(config["database"])
     dummy_user: User = User.create_user()
-    asyncio.run(dao.insert_user(dummy_user))
     user: User = dummy_user  # dao.fetch_all_users()[0]
-    service: YahooSearchService = YahooSearchService()
+    service: YahooSearchService = YahooSearchService(dao)
     """
     Simplest way to run an async function
-    - asyncio.run creates an event loop
+    - asyncio.run (here run_event_loop, the same on our configured loop)
+    creates an event loop
     - runs the function
     - brings it down
-    
+
     Pro:
     - Easy to run, you dont have to explicitly create the event loop
-    
+
     Con
     - the event loop it creates is not re-usable, only available for itself
     """
-    response: SearchResults = asyncio.run(
-        service.yahoo_search(user.user_id, search_term)
-    )
+
+    async def search_once() -> SearchResults:
+        try:
+            await dao.insert_user(dummy_user)
+            return await service.yahoo_search(user.user_id, search_term)
+        finally:
+            # the shared session and the engine's pool are bound to this event loop;
+            # close them with the loop
+            await service.close()
+            await dao.close()
+
+    response: SearchResults = run_event_loop(search_once(), event_loop_config)
     print(response)
@@ -0,0 +1,124 @@
+import asyncio
+import functools
+import random
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import ParamSpec, TypeVar
+
+import aiohttp
+from sqlalchemy.exc import SQLAlchemyError
+
+from src.utils import deadline
+
+P = ParamSpec("P")
+T = TypeVar("T")
+
+
+@dataclass
+class RetryStats:
+    """
+    calls: number of times the decorated coroutine was called
+    attempts: number of times it was awaited, retries included
+    failed_attempts: attempts that raised a retriable exception
+    exhausted: calls that still failed after the last attempt
+
+    retry amplification = attempts / calls
+    """
+
+    calls: int = 0
+    attempts: int = 0
+    failed_attempts: int = 0
+    exhausted: int = 0
+
+
+# one RetryStats per decorated coroutine, keyed by the name given to async_retry
+retry_stats: dict[str, RetryStats] = {}
+
+
+def is_retriable(exception: BaseException) -> bool:
+    """
+    Simplification: assume that all of these are intermittent
+    - aiohttp.ClientError: connection reset, wifi down, DNS failure
+    - asyncio.TimeoutError: a slow upstream or a stuck database connection
+    - SQLAlchemyError: dropped database connection, failover
+    """
+    return isinstance(
+        exception, (aiohttp.ClientError, asyncio.TimeoutError, SQLAlchemyError)
+    )
+
+
+def async_retry(
+    name: str,
+    retry_on: Callable[[BaseException], bool] = is_retriable,
+    tries: int = 5,
+    delay: float = 0.01,
+    backoff: float = 2,
+    jitter: tuple[float, float] = (-0.01, 0.01),
+    max_delay: float = 1.0,
+    max_elapsed: float | None = 5.0,
+) -> Callable[[Callable[P, Awaitable[T]]], Callable[P, Awaitable[T]]]:
+    """
+    Retries a coroutine function, with exponential backoff and jitter
+
+    The retry package's @retry can't do this for an async def
+    - It wraps the call that creates the coroutine, which never raises
+    - The exception is raised later, when the coroutine is awaited; outside of @retry
+    - time.sleep would also block the event loop, and every other request with it
+
+    Here, we await the coroutine inside the loop and sleep with asyncio.sleep
+
+    Exponential Backoff, with the defaults
+    - Retry up to 5 times
+    - 2nd try -> 0.01 seconds after 1st try
+    - 3rd try -> 0.02 seconds after 2nd try
+    - 4th try -> 0.04 seconds after 3rd try
+    - 5th try -> 0.08 seconds after 4th try
+    - Every delay is capped at max_delay
+
+    Jitter -> Prevent the thundering herd problem
+    - A random noise within jitter is added to every delay
+
+    max_elapsed bounds the total time spent, across all attempts
+    - No retry is made once it would start after max_elapsed seconds
+    - Nor once it would start after the request's deadline (see src/utils/deadline.py)
+
+    :param name: key of this coroutine's RetryStats in retry_stats
+    :param retry_on: returns True if an exception is worth retrying
+    """
+
+    stats: RetryStats = retry_stats.setdefault(name, RetryStats())
+
+    def decorator(fn: Callable[P, Awaitable[T]]) -> Callable[P, Awaitable[T]]:
+        @functools.wraps(fn)
+        async def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
+            stats.calls += 1
+            start: float = time.monotonic()
+            current_delay: float = delay
+            attempt: int = 1
+            while True:
+                stats.attempts += 1
+                try:
+                    return await fn(*args, **kwargs)
+                except Exception as e:
+                    if not retry_on(e):
+                        raise
+                    stats.failed_attempts += 1
+                    sleep_for: float = max(
+                        0.0, min(current_delay + random.uniform(*jitter), max_delay)
+                    )
+                    left: float | None = deadline.remaining()
+                    out_of_time: bool = (
+                        max_elapsed is not None
+                        and time.monotonic() - start + sleep_for > max_elapsed
+                    ) or (left is not None and sleep_for >= left)
+                    if attempt >= tries or out_of_time:
+                        stats.exhausted += 1
+                        raise
+                await asyncio.sleep(sleep_for)
+                current_delay *= backoff
+                attempt += 1
+
+        return wrapper
+
+    return decorator
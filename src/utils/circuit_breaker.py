@@ -0,0 +1,214 @@
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Literal
+
+from pydantic import BaseModel
+
+from src.utils.metrics import Counter, registry
+
+CircuitState = Literal["closed", "open", "half_open"]
+CIRCUIT_STATES: tuple[CircuitState, ...] = ("closed", "open", "half_open")
+
+
+class CircuitBreakerConfig(BaseModel):
+    """
+    Loaded from the [circuit_breaker] section of local_config/config.toml
+
+    - enabled: put the breaker in front of every request to Yahoo
+    - window_seconds: the failure rate is over the calls of the last window_seconds
+    - min_calls: calls needed in the window before the failure rate counts;
+    2 failures out of 3 calls is no outage
+    - failure_rate: the circuit opens at or above this share of failed calls
+    - open_seconds: how long it stays open, before letting probes through
+    - half_open_calls: probes let through once open_seconds are up;
+    all of them must succeed for the circuit to close, any failure reopens it
+    - serve_stale: while open, serve the latest result stored for the term
+    within stale_max_age_seconds, instead of failing
+    """
+
+    enabled: bool = True
+    window_seconds: float = 30.0
+    min_calls: int = 20
+    failure_rate: float = 0.5
+    open_seconds: float = 15.0
+    half_open_calls: int = 3
+    serve_stale: bool = True
+    stale_max_age_seconds: float = 7 * 24 * 3600
+
+
+@dataclass
+class CircuitBreakerStats:
+    """
+    successes / failures: calls let through, by outcome
+    rejected: calls failed fast, without calling Yahoo
+    opened: times the circuit opened (from closed, or from half_open)
+    """
+
+    successes: int = 0
+    failures: int = 0
+    rejected: int = 0
+    opened: int = 0
+
+
+class CircuitOpenError(Exception):
+    """
+    Yahoo is failing; the call was not made
+    - Not retried by @async_retry; the circuit stays open for open_seconds
+    """
+
+
+# how a search was answered while the circuit was open
+CIRCUIT_FALLBACKS: Counter = registry.counter(
+    "upstream_circuit_fallbacks_total",
+    "Searches answered while the circuit to Yahoo was open: stale or failed_fast",
+    ("outcome",),
+)
+
+# the window is kept as this many buckets of (calls, failures)
+_BUCKETS: int = 10
+
+
+class CircuitBreaker:
+    """
+    Stops calling Yahoo while it is down
+
+    Without it, each /search during an outage waits out its connection
+    timeouts and every retry, then stores a result=None row
+
+    closed: calls go through; failures are counted over a sliding window
+    - At min_calls or more, with failure_rate or more failed -> open
+    open: every call fails fast with CircuitOpenError
+    - After open_seconds -> half_open
+    half_open: half_open_calls probes go through, the rest fail fast
+    - All probes succeed -> closed; any fails -> open again
+
+    breaker.before_call()   # raises CircuitOpenError
+    succeeded: bool | None = None
+    try:
+        ... call Yahoo, set succeeded ...
+    finally:
+        breaker.record(succeeded)
+    """
+
+    def __init__(self, config: CircuitBreakerConfig) -> None:
+        self.__config: CircuitBreakerConfig = config
+        self.__bucket_seconds: float = config.window_seconds / _BUCKETS
+        # [bucket number, calls, failures], oldest first
+        self.__buckets: deque[list[int]] = deque()
+        self.__state: CircuitState = "closed"
+        self.__opened_at: float = 0.0
+        self.__probes_started: int = 0
+        self.__probes_succeeded: int = 0
+        self.stats: CircuitBreakerStats = CircuitBreakerStats()
+
+    @property
+    def config(self) -> CircuitBreakerConfig:
+        return self.__config
+
+    @property
+    def state(self) -> CircuitState:
+        if (
+            self.__state == "open"
+            and time.monotonic() - self.__opened_at >= self.__config.open_seconds
+        ):
+            self.__state = "half_open"
+            self.__probes_started = 0
+            self.__probes_succeeded = 0
+        return self.__state
+
+    @property
+    def retry_after_seconds(self) -> float:
+        """
+        Until the circuit lets probes through again; 0 unless open
+        """
+        if self.state != "open":
+            return 0.0
+        return max(
+            0.0, self.__config.open_seconds - (time.monotonic() - self.__opened_at)
+        )
+
+    def failure_rate(self) -> tuple[int, float]:
+        """
+        :return: the calls in the window, and the share of them that failed
+        """
+        self._expire(self._bucket_number())
+        calls: int = sum(bucket[1] for bucket in self.__buckets)
+        failures: int = sum(bucket[2] for bucket in self.__buckets)
+        return calls, failures / calls if calls else 0.0
+
+    def before_call(self) -> None:
+        """
+        :raises CircuitOpenError: if the call must not be made
+        """
+        state: CircuitState = self.state
+        if state == "closed":
+            return
+        if (
+            state == "half_open"
+            and self.__probes_started < self.__config.half_open_calls
+        ):
+            self.__probes_started += 1
+            return
+        self.stats.rejected += 1
+        raise CircuitOpenError(
+            f"Yahoo is failing; circuit {state}, "
+            f"retry in {self.retry_after_seconds:.1f}s"
+        )
+
+    def record(self, succeeded: bool | None) -> None:
+        """
+        :param succeeded: None if the call never got an answer either way,
+        e.g it was cancelled; a half_open probe is then given back
+        """
+        if succeeded is None:
+            if self.__state == "half_open" and self.__probes_started > 0:
+                self.__probes_started -= 1
+        elif succeeded:
+            self._on_success()
+        else:
+            self._on_failure()
+
+    def _on_success(self) -> None:
+        self.stats.successes += 1
+        if self.__state == "half_open":
+            self.__probes_succeeded += 1
+            if self.__probes_succeeded >= self.__config.half_open_calls:
+                self.__state = "closed"
+                self.__buckets.clear()
+            return
+        self._record(failed=False)
+
+    def _on_failure(self) -> None:
+        self.stats.failures += 1
+        if self.__state == "half_open":
+            self._open()
+            return
+        if self.__state == "open":
+            # a call started before the circuit opened
+            return
+        self._record(failed=True)
+        calls, rate = self.failure_rate()
+        if calls >= self.__config.min_calls and rate >= self.__config.failure_rate:
+            self._open()
+
+    def _open(self) -> None:
+        self.__state = "open"
+        self.__opened_at = time.monotonic()
+        self.stats.opened += 1
+
+    def _bucket_number(self) -> int:
+        return int(time.monotonic() / self.__bucket_seconds)
+
+    def _expire(self, now: int) -> None:
+        while self.__buckets and self.__buckets[0][0] <= now - _BUCKETS:
+            self.__buckets.popleft()
+
+    def _record(self, failed: bool) -> None:
+        now: int = self._bucket_number()
+        self._expire(now)
+        if not self.__buckets or self.__buckets[-1][0] != now:
+            self.__buckets.append([now, 0, 0])
+        self.__buckets[-1][1] += 1
+        if failed:
+            self.__buckets[-1][2] += 1
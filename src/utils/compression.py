@@ -0,0 +1,21 @@
+import zlib
+
+
+def compress_result(result: str | None, level: int = 6) -> bytes | None:
+    """
+    Compresses the raw html of a search for search_results.result_compressed
+
+    Yahoo's html is ~300 - 800 KB of repetitive markup and scripts
+    - zlib shrinks it several times over
+    - Decompressing runs at hundreds of MB/s; compressing is slower, more so at higher levels
+    - level 1 is fastest, 9 is smallest; 6 is zlib's default trade-off
+    """
+    if result is None:
+        return None
+    return zlib.compress(result.encode("utf-8"), level)
+
+
+def decompress_result(compressed: bytes | None) -> str | None:
+    if compressed is None:
+        return None
+    return zlib.decompress(compressed).decode("utf-8")
@@ -0,0 +1,113 @@
+import asyncio
+import logging
+import multiprocessing
+from collections.abc import Callable
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Literal, TypeVar
+
+from pydantic import BaseModel
+
+from src.utils.logging_utils import setup_logging
+
+T = TypeVar("T")
+
+
+class CpuExecutorConfig(BaseModel):
+    """
+    Loaded from the [cpu_executor] section of local_config/config.toml
+
+    - kind: "process" runs CPU work in a ProcessPoolExecutor
+    "thread" in a ThreadPoolExecutor, "inline" on the event loop itself
+    - max_workers: pool size; None lets concurrent.futures pick (the number of CPUs)
+    - start_method: multiprocessing start method, e.g "fork" or "spawn"; None for the platform default
+    """
+
+    kind: Literal["process", "thread", "inline"] = "process"
+    max_workers: int | None = None
+    start_method: str | None = None
+
+
+class CpuExecutor:
+    """
+    Runs CPU-bound work (e.g parsing a 300 - 800 KB results page) off the event loop
+
+    Why?
+    - aiohttp serves every request on one event loop
+    - A function that computes for 20ms blocks that loop for 20ms
+    - Every other in-flight /search stalls until it returns
+
+    Why processes and not threads?
+    - The GIL lets only one thread run python bytecode at a time
+    - A thread keeps the loop responsive, but parsing still competes with it for the GIL
+    - Processes parse in parallel, on other cores
+
+    Arguments and results are pickled to cross the process boundary
+    - Pass raw bytes / str and return tuples, not pydantic models, to keep that cheap
+
+    Falls back to a thread pool when a process pool can't be created
+    (e.g platforms without working multiprocessing semaphores)
+    """
+
+    def __init__(self, config: CpuExecutorConfig) -> None:
+        self.__logger: logging.Logger = logging.getLogger(__name__)
+        self.__config: CpuExecutorConfig = config
+        self.__executor: Executor | None = None
+        setup_logging(self.__logger)
+
+    @property
+    def kind(self) -> str:
+        if isinstance(self.__executor, ProcessPoolExecutor):
+            return "process"
+        if isinstance(self.__executor, ThreadPoolExecutor):
+            return "thread"
+        return "inline"
+
+    def start(self) -> None:
+        if self.__executor is not None or self.__config.kind == "inline":
+            return
+        if self.__config.kind == "process":
+            try:
+                self.__executor = ProcessPoolExecutor(
+                    max_workers=self.__config.max_workers,
+                    mp_context=(
+                        multiprocessing.get_context(self.__config.start_method)
+                        if self.__config.start_method
+                        else None
+                    ),
+                )
+                return
+            except (OSError, NotImplementedError, ValueError) as e:
+                self.__logger.error(
+                    "Process pool unavailable, falling back to threads: %s", e
+                )
+        self.__executor = ThreadPoolExecutor(max_workers=self.__config.max_workers)
+
+    async def close(self) -> None:
+        if self.__executor is None:
+            return
+        executor: Executor = self.__executor
+        self.__executor = None
+        # shutdown(wait=True) blocks until running work finishes; keep it off the loop
+        await asyncio.to_thread(executor.shutdown, True)
+
+    async def run(self, fn: Callable[..., T], *args: object) -> T:
+        """
+        Runs fn(*args) in the pool, and awaits its result
+        - Inline if the executor isn't started, or kind is "inline"
+        - fn must be a module-level function, so a process pool can pickle it
+        """
+        executor: Executor | None = self.__executor
+        if executor is None:
+            return fn(*args)
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(executor, fn, *args)
+        except BrokenProcessPool:
+            # a worker died (e.g OOM killed); replace the pool for the next calls
+            if self.__executor is executor:
+                self.__logger.error("Process pool broken, restarting it")
+                self.__executor = None
+                executor.shutdown(wait=False)
+                self.start()
+            raise
@@ -0,0 +1,171 @@
+import time
+from dataclasses import dataclass
+from typing import Any
+
+from pydantic import BaseModel
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry
+
+from src.utils.construct_connection_string import (
+    construct_sqlalchemy_url_from_db_config,
+)
+from src.utils.metrics import Histogram, registry
+
+
+class DatabasePoolConfig(BaseModel):
+    """
+    Loaded from the [database.pool] section of local_config/config.toml
+
+    - pool_size: connections kept open
+    - max_overflow: extra connections opened under load, closed once returned
+    - pool_timeout: seconds a query waits for a free connection, before it fails
+    - pool_recycle: seconds after which a connection is replaced on checkout,
+    before a firewall / pgbouncer drops it idle; -1 never replaces them
+    - pool_pre_ping: checks a connection is alive (SELECT 1) on every checkout
+    - statement_cache_size: prepared statements asyncpg caches per connection;
+    0 with pgbouncer in transaction mode, which can't keep them
+    - command_timeout: seconds a query may run, before asyncpg gives up on it;
+    no query hangs on a stuck connection forever
+
+    The server opens up to pool_size + max_overflow connections per worker process
+    - Keep workers * (pool_size + max_overflow), plus the jobs',
+    under postgres' max_connections
+    """
+
+    pool_size: int = 5
+    max_overflow: int = 10
+    pool_timeout: float = 30.0
+    pool_recycle: int = 1800
+    pool_pre_ping: bool = True
+    statement_cache_size: int = 100
+    command_timeout: float = 30.0
+
+
+@dataclass
+class DatabasePoolStats:
+    """
+    checkouts, timeouts and checkout_wait_seconds count up from the pool's creation
+    - checkout_wait_seconds: time spent getting a connection; waiting for a
+    free one, or opening a new one
+
+    size, checked_out, overflow and capacity are read at the time of the snapshot
+    """
+
+    checkouts: int = 0
+    timeouts: int = 0
+    checkout_wait_seconds: float = 0.0
+    max_checkout_wait_seconds: float = 0.0
+    size: int = 0
+    checked_out: int = 0
+    overflow: int = 0
+    capacity: int = 0
+
+    @property
+    def mean_checkout_wait_ms(self) -> float:
+        return (
+            self.checkout_wait_seconds / self.checkouts * 1000
+            if self.checkouts
+            else 0.0
+        )
+
+    @property
+    def saturation(self) -> float:
+        """
+        Share of the connections the pool may open, in use now
+        - Near 1.0, queries queue up for a connection; a larger pool
+        (or fewer workers) may help, if postgres has the connections to spare
+        """
+        return self.checked_out / self.capacity if self.capacity else 0.0
+
+
+# seconds; a free pooled connection is handed out in microseconds,
+# a new one takes a connect, an exhausted pool up to pool_timeout
+DB_POOL_CHECKOUT_SECONDS: Histogram = registry.histogram(
+    "db_pool_checkout_duration_seconds",
+    "Time a query waited to get a connection from the pool",
+    buckets=(
+        0.0001,
+        0.00025,
+        0.0005,
+        0.001,
+        0.0025,
+        0.005,
+        0.01,
+        0.025,
+        0.05,
+        0.1,
+        0.25,
+        0.5,
+        1.0,
+        2.5,
+        5.0,
+        10.0,
+        30.0,
+    ),
+)
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """
+    AsyncAdaptedQueuePool, timing how long each checkout waits for a connection
+
+    SQLAlchemy's pool events fire once a connection is checked out;
+    none fires before, so the wait is timed around _do_get
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.stats: DatabasePoolStats = DatabasePoolStats()
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        start: float = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.stats.timeouts += 1
+            raise
+        finally:
+            waited: float = time.perf_counter() - start
+            self.stats.checkouts += 1
+            self.stats.checkout_wait_seconds += waited
+            self.stats.max_checkout_wait_seconds = max(
+                self.stats.max_checkout_wait_seconds, waited
+            )
+            DB_POOL_CHECKOUT_SECONDS.observe(waited)
+
+    def snapshot(self) -> DatabasePoolStats:
+        return DatabasePoolStats(
+            checkouts=self.stats.checkouts,
+            timeouts=self.stats.timeouts,
+            checkout_wait_seconds=self.stats.checkout_wait_seconds,
+            max_checkout_wait_seconds=self.stats.max_checkout_wait_seconds,
+            size=self.size(),
+            checked_out=self.checkedout(),
+            overflow=max(self.overflow(), 0),
+            capacity=self.size() + max(self._max_overflow, 0),
+        )
+
+
+def create_engine(db_config: dict[str, Any]) -> AsyncEngine:
+    """
+    :param db_config: the [database] section of local_config/config.toml
+
+    No connection is opened until the first query
+    - The engine's pool binds to the event loop of its first query;
+    create one per process (e.g per server worker), and use it from one loop
+    """
+    pool_config: DatabasePoolConfig = DatabasePoolConfig(**db_config.get("pool", {}))
+    return create_async_engine(
+        construct_sqlalchemy_url_from_db_config(db_config, use_async_pg=True),
+        poolclass=TimedQueuePool,
+        pool_size=pool_config.pool_size,
+        max_overflow=pool_config.max_overflow,
+        pool_timeout=pool_config.pool_timeout,
+        pool_recycle=pool_config.pool_recycle,
+        pool_pre_ping=pool_config.pool_pre_ping,
+        connect_args={
+            "statement_cache_size": pool_config.statement_cache_size,
+            "command_timeout": pool_config.command_timeout,
+        },
+    )
@@ -0,0 +1,145 @@
+import asyncio
+import time
+from collections.abc import AsyncIterator, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+
+from pydantic import BaseModel
+
+from src.utils.metrics import Counter, registry
+
+
+"""
+A request's deadline, shared by every stage of its pipeline
+
+1) The handler sets a budget for the request, e.g 10 seconds (see with_deadline)
+2) It is kept in a ContextVar; every coroutine awaited by the handler,
+and every task it creates (asyncio copies the context), sees the same deadline
+- Except work shared with other requests, e.g a coalesced fetch from Yahoo;
+it runs in a task of its own, with clear_deadline;
+each request bounds only its own wait on it
+3) Each stage (the cache lookup, the fetch from Yahoo, the insert) runs
+under stage_timeout, which gives it whatever is left of the budget
+4) @async_retry doesn't start a retry it has no time left for
+
+Without one, a slow Yahoo or a stuck database connection holds a handler,
+and everything it allocated, for as long as it takes
+"""
+
+# time.monotonic() at which the current request's budget runs out; None if no deadline
+_deadline: ContextVar[float | None] = ContextVar("deadline", default=None)
+
+STAGE_TIMEOUTS: Counter = registry.counter(
+    "stage_timeouts_total",
+    "Stages that timed out: kind=deadline if the request's budget ran out, "
+    "kind=stage if the stage's own cap did",
+    ("stage", "kind"),
+)
+
+
+class DeadlineConfig(BaseModel):
+    """
+    Loaded from the [deadline] section of local_config/config.toml
+
+    - enabled: give every /search and /search/batch a deadline
+    - search_seconds: the budget of a /search
+    - batch_seconds: the budget of a /search/batch, for all of its queries
+    - header: a client may ask for another budget, in seconds, e.g
+    "X-Request-Timeout: 2.5"; capped at max_seconds
+    """
+
+    enabled: bool = True
+    search_seconds: float = 10.0
+    batch_seconds: float = 60.0
+    max_seconds: float = 60.0
+    header: str = "X-Request-Timeout"
+
+
+class DeadlineExceeded(Exception):
+    """
+    The request's budget ran out, during stage
+    - Not a TimeoutError, so @async_retry doesn't retry it; there is no time left
+    - The server answers with a 504
+    """
+
+    def __init__(self, stage: str) -> None:
+        super().__init__(f"Deadline exceeded during {stage}")
+        self.stage: str = stage
+
+
+class StageTimeout(asyncio.TimeoutError):
+    """
+    One attempt at stage took longer than its own cap,
+    with time left in the request's budget
+    - A TimeoutError, so @async_retry retries it
+    """
+
+    def __init__(self, stage: str, seconds: float) -> None:
+        super().__init__(f"{stage} took over {seconds:.3f}s")
+        self.stage: str = stage
+
+
+def remaining() -> float | None:
+    """
+    Seconds left in the current request's budget; None if it has no deadline
+    """
+    deadline: float | None = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+@contextmanager
+def with_deadline(seconds: float | None) -> Iterator[None]:
+    """
+    Runs the block with a budget of seconds; None for no deadline
+    - Nested, the earlier deadline wins; a stage can't extend its request's
+    """
+    deadline: float | None = None if seconds is None else time.monotonic() + seconds
+    current: float | None = _deadline.get()
+    if current is not None and (deadline is None or current < deadline):
+        deadline = current
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def clear_deadline() -> None:
+    """
+    Drops the deadline from the current context
+    - Only from a task of its own (asyncio gave it a copy of the context),
+    running work that other requests share, with budgets of their own;
+    it must not run out with its first caller's
+    """
+    _deadline.set(None)
+
+
+@asynccontextmanager
+async def stage_timeout(stage: str, cap: float | None = None) -> AsyncIterator[None]:
+    """
+    Bounds the block by what is left of the request's budget,
+    and by cap (seconds), if given; whichever comes first
+
+    :raises DeadlineExceeded: if the budget runs out; at once, if it already has
+    :raises StageTimeout: if cap runs out first
+    """
+    left: float | None = remaining()
+    if left is not None and left <= 0:
+        STAGE_TIMEOUTS.labels(stage, "deadline").inc()
+        raise DeadlineExceeded(stage)
+    by_deadline: bool = cap is None or (left is not None and left <= cap)
+    budget: float | None = left if by_deadline else cap
+    timeout: asyncio.Timeout = asyncio.timeout(budget)
+    try:
+        async with timeout:
+            yield
+    except TimeoutError as e:
+        # raised in the block (e.g by aiohttp's own timeouts), not by ours
+        if not timeout.expired():
+            raise
+        if by_deadline:
+            STAGE_TIMEOUTS.labels(stage, "deadline").inc()
+            raise DeadlineExceeded(stage) from e
+        assert cap is not None
+        STAGE_TIMEOUTS.labels(stage, "stage").inc()
+        raise StageTimeout(stage, cap) from e
@@ -0,0 +1,76 @@
+import asyncio
+from collections.abc import Coroutine
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Literal, TypeVar
+
+from pydantic import BaseModel
+
+try:
+    import uvloop
+except ImportError:  # optional; poetry install -E uvloop for a faster event loop
+    uvloop = None  # type: ignore[assignment]
+
+T = TypeVar("T")
+
+
+class EventLoopConfig(BaseModel):
+    """
+    Loaded from the [event_loop] section of local_config/config.toml
+
+    - kind: "auto" uses uvloop if it is installed, else asyncio's default loop;
+    "uvloop" requires it, "asyncio" never uses it
+    - default_executor_workers: threads of the loop's default executor, which runs
+    DNS lookups (getaddrinfo) and run_in_executor(None, ...); None keeps asyncio's
+    default, min(32, CPUs + 4)
+    - debug: asyncio debug mode; logs never-awaited coroutines and slow callbacks
+    - slow_callback_ms: in debug mode, a callback blocking the loop longer than this is logged
+    """
+
+    kind: Literal["auto", "uvloop", "asyncio"] = "auto"
+    default_executor_workers: int | None = None
+    debug: bool = False
+    slow_callback_ms: float = 100.0
+
+    @property
+    def uses_uvloop(self) -> bool:
+        """
+        :raises RuntimeError: if kind is "uvloop", but it isn't installed
+        """
+        if self.kind == "uvloop" and uvloop is None:
+            raise RuntimeError('[event_loop] kind is "uvloop", but it is not installed')
+        return self.kind != "asyncio" and uvloop is not None
+
+
+def new_event_loop(config: EventLoopConfig) -> asyncio.AbstractEventLoop:
+    """
+    Every entry point creates its loop here, so they all run on the same kind
+
+    Why uvloop?
+    - It implements the loop, its sockets and transports in C (on libuv)
+    - Less overhead per callback and per read / write; more requests/sec
+    out of the one core a server process runs on
+    - asyncio's default loop is pure python, on top of selectors
+    """
+    loop: asyncio.AbstractEventLoop = (
+        uvloop.new_event_loop() if config.uses_uvloop else asyncio.new_event_loop()
+    )
+    if config.default_executor_workers is not None:
+        loop.set_default_executor(
+            ThreadPoolExecutor(
+                max_workers=config.default_executor_workers,
+                thread_name_prefix="event-loop",
+            )
+        )
+    loop.set_debug(config.debug)
+    loop.slow_callback_duration = config.slow_callback_ms / 1000
+    return loop
+
+
+def run_event_loop(main: Coroutine[Any, Any, T], config: EventLoopConfig) -> T:
+    """
+    asyncio.run, on a loop from new_event_loop
+    - Runs main, then cancels the tasks left, shuts async generators and the
+    default executor down, and closes the loop
+    """
+    with asyncio.Runner(loop_factory=lambda: new_event_loop(config)) as runner:
+        return runner.run(main)
@@ -0,0 +1,55 @@
+import aiohttp
+from pydantic import BaseModel
+
+
+class HttpClientConfig(BaseModel):
+    """
+    Settings for the long-lived aiohttp.ClientSession used to call Yahoo
+
+    Loaded from the [http_client] section of local_config/config.toml
+    - Every key is optional, missing keys fall back to the defaults below
+
+    - limit: max number of open connections across all hosts
+    - limit_per_host: max number of open connections to sg.search.yahoo.com
+    - keepalive_timeout: seconds an idle connection is kept open for reuse
+    - ttl_dns_cache: seconds a resolved DNS entry is reused before re-resolving
+    - base_url: the search endpoint, override it to point at a stub server
+    - connect_timeout_seconds: to get a connection; from the pool, or a new one
+    - read_timeout_seconds: the longest pause while reading Yahoo's response
+    - attempt_timeout_seconds: one request to Yahoo, start to end;
+    the request's deadline may cut it shorter (see src/utils/deadline.py)
+    """
+
+    limit: int = 100
+    limit_per_host: int = 50
+    keepalive_timeout: float = 30.0
+    ttl_dns_cache: int = 300
+    verify_ssl: bool = False
+    base_url: str = "https://sg.search.yahoo.com/search"
+    connect_timeout_seconds: float = 5.0
+    read_timeout_seconds: float = 10.0
+    attempt_timeout_seconds: float = 15.0
+
+
+def create_client_session(config: HttpClientConfig) -> aiohttp.ClientSession:
+    """
+    Creates a ClientSession backed by a pooled TCPConnector
+
+    Must be called from within a running event loop,
+    as the connector binds itself to the current loop
+    """
+    connector: aiohttp.TCPConnector = aiohttp.TCPConnector(
+        limit=config.limit,
+        limit_per_host=config.limit_per_host,
+        keepalive_timeout=config.keepalive_timeout,
+        ttl_dns_cache=config.ttl_dns_cache,
+        use_dns_cache=True,
+        ssl=config.verify_ssl,
+    )
+    # aiohttp's default is a 5 minute total, and no connect / read timeout
+    timeout: aiohttp.ClientTimeout = aiohttp.ClientTimeout(
+        total=None,
+        connect=config.connect_timeout_seconds,
+        sock_read=config.read_timeout_seconds,
+    )
+    return aiohttp.ClientSession(connector=connector, timeout=timeout)
@@ -0,0 +1,22 @@
+from typing import Any
+
+from aiohttp import web
+from pydantic_core import to_json
+
+
+def json_response(data: Any, status: int = 200) -> web.Response:
+    """
+    Drop-in for web.json_response, serializing with pydantic_core.to_json
+
+    web.json_response runs json.dumps into a str, then encodes it into bytes
+    - Two full copies of a 300 - 800 KB html, plus model_dump()'s dict before that
+    - And every non-ascii character is escaped as \\uXXXX
+
+    to_json serializes pydantic models (and dicts / lists of them) straight
+    into utf-8 bytes, in Rust
+    - datetimes are formatted by their field's serializer (see ApiDatetime),
+    no strftime by hand
+    """
+    return web.Response(
+        body=to_json(data), status=status, content_type="application/json"
+    )
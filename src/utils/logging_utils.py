@@ -1,16 +1,192 @@
+import atexit
 import logging
+import os
+import queue
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime, timezone
 from logging import Logger
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Literal
+
+from pydantic import BaseModel
+from pydantic_core import to_json
 
 
 """
-!) Define a function to setup th elogger. Takes in a logger object, a boolean to log
-to file or stream, if to file a file path
-2) Set the lvel of the logger using one of the predetermined constants in the logging
-module: CRITICAL, ERROR, WARNING, INFO, DEBUG. logging.<levelname>
-3)Format the out put of the logs using logging.Formatter()
-4) If log to file use filehandler, if to console use streamhandler
+1) Every logger gets one handler: a QueueHandler, which only puts the record
+on a queue. No formatting, no I/O, in the event loop
+2) A QueueListener, on a background thread, takes records off the queue,
+formats them, and hands them to the real handlers (StreamHandler / FileHandler)
+3) The level and format of the logs come from the [logging] section of
+local_config/config.toml, through configure_logging()
+
+Log with %-style arguments, not f-strings
+- logger.info("Searched %s", term) only builds the message if the record is
+emitted, and then on the listener's thread
+- logger.info(f"Searched {term}") builds it on every call, on the event loop
 """
 
+# the attributes of every LogRecord; anything else was passed in extra={...}
+_RECORD_ATTRIBUTES: frozenset[str] = frozenset(
+    logging.LogRecord("", 0, "", 0, "", None, None).__dict__
+) | {"message", "asctime", "taskName"}
+
+
+class LoggingConfig(BaseModel):
+    """
+    Loaded from the [logging] section of local_config/config.toml
+
+    - level: the minimum level for a log to be shown, e.g "INFO"
+    - format: "text" is "time - name - level - message";
+    "json" is one JSON object per line, for log shippers
+    - log_to_file: log to file_path instead of stderr
+    - queue_size: records waiting for the background thread; when it is full,
+    new records are dropped (and counted) rather than block the event loop
+    """
+
+    level: str = "INFO"
+    format: Literal["text", "json"] = "text"
+    log_to_file: bool = False
+    file_path: str = "yahoo_search.logs"
+    queue_size: int = 10000
+
+
+@dataclass
+class LoggingStats:
+    dropped: int = 0
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    {"time": ..., "name": ..., "level": ..., "message": ...}, on one line
+    - Plus "exc_info" with the traceback, if any,
+    and every field passed with logger.info(..., extra={...})
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: dict[str, Any] = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "name": record.name,
+            "level": record.levelname,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        return to_json(entry, fallback=str).decode()
+
+
+class _LazyQueueHandler(QueueHandler):
+    """
+    QueueHandler formats the message before queueing it, so the record can be
+    pickled to another process; the listener here is a thread of this process,
+    so the record is queued as is, and formatted on that thread
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            logging_stats.dropped += 1
+
+
+logging_stats: LoggingStats = LoggingStats()
+_config: LoggingConfig = LoggingConfig()
+_queue_handler: _LazyQueueHandler = _LazyQueueHandler(queue.Queue(_config.queue_size))
+_listener: QueueListener | None = None
+_loggers: set[Logger] = set()
+# logger name -> file, for the loggers set up with setup_logging(log_to_file=True)
+_file_paths: dict[str, str] = {}
+
+
+def _create_handler(config: LoggingConfig, file_path: str | None) -> logging.Handler:
+    # in production, log to a file -
+    # a streamhandler prints the logs like a typical print()
+    # a filehandler sends them into the file, which the log management system reads
+    handler: logging.Handler = (
+        logging.FileHandler(file_path)
+        if file_path is not None
+        else logging.StreamHandler()
+    )
+    handler.setFormatter(
+        JsonFormatter()
+        if config.format == "json"
+        else logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    )
+    return handler
+
+
+def _name_filter(
+    names: frozenset[str], keep: bool
+) -> Callable[[logging.LogRecord], bool]:
+    """
+    Keeps the records of the loggers in names; with keep=False, of every other one
+    """
+    return lambda record: (record.name in names) == keep
+
+
+def _create_handlers(config: LoggingConfig) -> list[logging.Handler]:
+    """
+    The listener's handlers
+    - One per file loggers were set up to log to (setup_logging(log_to_file=True)),
+    which only takes their records
+    - One for every other logger: config.file_path with log_to_file, else stderr
+    """
+    default_path: str | None = config.file_path if config.log_to_file else None
+    routes: dict[str, frozenset[str]] = {}
+    for name, file_path in _file_paths.items():
+        if file_path != default_path:
+            routes[file_path] = routes.get(file_path, frozenset()) | {name}
+    routed: frozenset[str] = frozenset().union(*routes.values())
+    default: logging.Handler = _create_handler(config, default_path)
+    default.addFilter(_name_filter(routed, keep=False))
+    handlers: list[logging.Handler] = [default]
+    for file_path, names in routes.items():
+        handler: logging.Handler = _create_handler(config, file_path)
+        handler.addFilter(_name_filter(names, keep=True))
+        handlers.append(handler)
+    return handlers
+
+
+def _start_listener() -> None:
+    global _listener
+    if _listener is None:
+        _listener = QueueListener(_queue_handler.queue, *_create_handlers(_config))
+        _listener.start()
+
+
+def stop_logging() -> None:
+    """
+    Writes out every queued record, then stops the background thread
+    - Runs at exit; call it before os._exit, which skips atexit
+    - The next setup_logging starts it again
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+def configure_logging(config: LoggingConfig) -> None:
+    """
+    Applies the [logging] config to every logger, set up already or not
+    """
+    global _config
+    stop_logging()
+    _config = config
+    _queue_handler.queue = queue.Queue(config.queue_size)
+    for logger in _loggers:
+        logger.setLevel(config.level)
+    _start_listener()
+
 
 def setup_logging(
     logger: Logger,
@@ -20,35 +196,45 @@ def setup_logging(
     """
     Sets up a logger to
     - Have a logging level (indicates the minimum level for a log to be shown)
-    - Set the logging formatter
-    - Setup the logger to log to a file
+    - Hand its records to the background thread, which formats and writes them
+
+    If log_to_file is True, this logger logs to file_path,
+    whatever the [logging] config says; the other loggers are left as they are
+    - Written by the background thread all the same
+    - Otherwise, the logger follows the [logging] config
 
-    If log_to_file is True, log to a file
+    Idempotent; every logger gets the one shared QueueHandler once,
+    however many times the class using it is instantiated
     """
-    # set the logger to only log stuff that is info and above
-    logger.setLevel(logging.INFO)
+    if log_to_file and _file_paths.get(logger.name) != file_path:
+        _file_paths[logger.name] = file_path
+        # the listener's handlers are fixed once it starts; restart it with this one
+        stop_logging()
+    _start_listener()
+    logger.setLevel(_config.level)
+    # if anything configures the root logger (e.g logging.basicConfig),
+    # propagating would write every record a second time, on the event loop
+    logger.propagate = False
+    if _queue_handler not in logger.handlers:
+        logger.addHandler(_queue_handler)
+    _loggers.add(logger)
+
 
+def _after_fork_in_child() -> None:
     """
-    setup the logging formatter
-    to format the logs with time logged, name, 
-    level of the message, and the message itself
+    The listener thread doesn't survive a fork (e.g a server worker),
+    and the queue's locks may have been held by it; start both afresh
     """
-    formatter: logging.Formatter = logging.Formatter(
-        "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-    )
+    global _listener
+    was_running: bool = _listener is not None
+    if _listener is not None:
+        for handler in _listener.handlers:
+            handler.close()
+    _listener = None
+    _queue_handler.queue = queue.Queue(_config.queue_size)
+    if was_running:
+        _start_listener()
 
-    # in production, replace this with a filehandler -
-    # a streamhandler prints the logs like a typical print()
-    # we use a filehandler so the logs are sent into the file,
-    # then the log management system reads from there
-    if log_to_file:
-        file_handler = logging.FileHandler(file_path)
-        file_handler.setLevel(logging.INFO)
-        file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
-    else:
-        console_handler = (
-            logging.StreamHandler()
-        )  # this receives the logs from the logger
-        console_handler.setLevel(logging.INFO)
-        logger.addHandler(console_handler)
+
+atexit.register(stop_logging)
+os.register_at_fork(after_in_child=_after_fork_in_child)
@@ -0,0 +1,410 @@
+import bisect
+import dataclasses
+import math
+import time
+from collections.abc import Awaitable, Callable, Iterable, Iterator
+from types import TracebackType
+from typing import Any, Generic, TypeVar
+
+from aiohttp import web
+from pydantic import BaseModel
+
+
+"""
+Prometheus-style metrics, served at /metrics in the text exposition format
+https://prometheus.io/docs/instrumenting/exposition_formats/
+
+1) Counters, gauges and histograms defined here are updated in place,
+on the event loop; an update is a dict lookup and an addition, no lock, no I/O
+2) Stats the services already keep (e.g SearchResultsWriter.stats,
+the DB pool's) are not copied on every update;
+they are read when /metrics is scraped (see stats_metrics)
+3) Each server worker process has its own. /metrics on the shared server port
+is answered by whichever worker accepts the scrape; with worker_port_base set,
+each worker also serves its own on worker_port_base + its index (see create_app).
+Scrape every one of those; PromQL sums across them, e.g sum by (route) (...)
+
+Labels are bounded: a route's pattern (e.g /search), never the raw path
+"""
+
+# seconds; from a cache hit to a slow Yahoo page, retries included
+DEFAULT_BUCKETS: tuple[float, ...] = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+Sample = tuple[str, tuple[tuple[str, str], ...], float]
+C = TypeVar("C")
+
+
+class MetricsConfig(BaseModel):
+    """
+    Loaded from the [metrics] section of local_config/config.toml
+
+    - enabled: time every request, and serve them at /metrics
+    - worker_port_base: if set, each worker also serves its /metrics alone on
+    worker_host:worker_port_base + its index; with 4 workers and 9100, ports 9100 - 9103
+    (a single process, python -m src.main, serves on worker_port_base)
+    """
+
+    enabled: bool = True
+    worker_port_base: int | None = None
+    worker_host: str = "0.0.0.0"
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value: float = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class _Timer:
+    """
+    with histogram.labels("upstream_fetch").time(): ...
+    - Observes the seconds spent in the block, raised or not
+    """
+
+    __slots__ = ("_child", "_start")
+
+    def __init__(self, child: "_HistogramChild") -> None:
+        self._child: _HistogramChild = child
+        self._start: float = 0.0
+
+    def __enter__(self) -> "_Timer":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self._child.observe(time.perf_counter() - self._start)
+
+
+class _HistogramChild:
+    """
+    counts[i] is the number of observations in (bounds[i - 1], bounds[i]];
+    the last one, above the largest bound (+Inf)
+    - Made cumulative only when rendered, so observe is one bisect
+    """
+
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: tuple[float, ...]) -> None:
+        self.bounds: tuple[float, ...] = bounds
+        self.counts: list[int] = [0] * (len(bounds) + 1)
+        self.sum: float = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    def time(self) -> _Timer:
+        return _Timer(self)
+
+
+class Metric(Generic[C]):
+    """
+    A metric and its children, one per combination of label values
+    - metric.labels("/search").inc(); or metric.inc() without label names
+    """
+
+    type: str = "untyped"
+
+    def __init__(
+        self, name: str, documentation: str, label_names: tuple[str, ...] = ()
+    ) -> None:
+        self.name: str = name
+        self.documentation: str = documentation
+        self.label_names: tuple[str, ...] = label_names
+        self._children: dict[tuple[str, ...], C] = {}
+
+    def _new_child(self) -> C:
+        raise NotImplementedError
+
+    def labels(self, *values: str) -> C:
+        child: C | None = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.label_names):
+                raise ValueError(
+                    f"{self.name} takes labels {self.label_names}, got {values}"
+                )
+            child = self._children[values] = self._new_child()
+        return child
+
+    def samples(self) -> Iterator[Sample]:
+        raise NotImplementedError
+
+    def _label_pairs(self, values: tuple[str, ...]) -> tuple[tuple[str, str], ...]:
+        return tuple(zip(self.label_names, values))
+
+
+class Counter(Metric[_CounterChild]):
+    type = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def samples(self) -> Iterator[Sample]:
+        for values, child in self._children.items():
+            yield self.name, self._label_pairs(values), child.value
+
+
+class Gauge(Metric[_GaugeChild]):
+    type = "gauge"
+
+    def _new_child(self) -> _GaugeChild:
+        return _GaugeChild()
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+    def samples(self) -> Iterator[Sample]:
+        for values, child in self._children.items():
+            yield self.name, self._label_pairs(values), child.value
+
+
+class Histogram(Metric[_HistogramChild]):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, label_names)
+        self.buckets: tuple[float, ...] = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def time(self) -> _Timer:
+        return self.labels().time()
+
+    def samples(self) -> Iterator[Sample]:
+        for values, child in self._children.items():
+            labels: tuple[tuple[str, str], ...] = self._label_pairs(values)
+            cumulative: int = 0
+            for bound, count in zip(self.buckets + (math.inf,), child.counts):
+                cumulative += count
+                yield (
+                    f"{self.name}_bucket",
+                    labels + (("le", _format_value(bound)),),
+                    cumulative,
+                )
+            yield f"{self.name}_sum", labels, child.sum
+            yield f"{self.name}_count", labels, cumulative
+
+
+class MetricsRegistry:
+    """
+    The metrics rendered by /metrics
+    - counter / gauge / histogram create and register a metric
+    - Registering a name twice returns the metric registered first,
+    so a module can be imported (or a test app created) many times
+    """
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, Metric[Any]] = {}
+
+    def _register(self, metric: Metric[Any]) -> Any:
+        return self._metrics.setdefault(metric.name, metric)
+
+    def counter(
+        self, name: str, documentation: str, label_names: tuple[str, ...] = ()
+    ) -> Counter:
+        return self._register(Counter(name, documentation, label_names))
+
+    def gauge(
+        self, name: str, documentation: str, label_names: tuple[str, ...] = ()
+    ) -> Gauge:
+        return self._register(Gauge(name, documentation, label_names))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        label_names: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, label_names, buckets))
+
+    def collect(self) -> list[Metric[Any]]:
+        return list(self._metrics.values())
+
+
+def stats_metrics(
+    prefix: str,
+    stats: Any,
+    counters: Iterable[str] = (),
+    labels: tuple[tuple[str, str], ...] = (),
+) -> list[Metric[Any]]:
+    """
+    Reads a stats dataclass (e.g SearchCacheStats) into metrics, at scrape time
+    - Each int / float field becomes {prefix}_{field}
+    - Fields named in counters only ever count up; they become
+    counters, {prefix}_{field}_total, the others gauges
+    - Other fields (e.g a datetime) are skipped
+
+    :param labels: added to every sample, e.g (("name", "yahoo_search_service._fetch"),)
+    """
+    counter_fields: frozenset[str] = frozenset(counters)
+    label_names: tuple[str, ...] = tuple(name for name, _ in labels)
+    label_values: tuple[str, ...] = tuple(label_value for _, label_value in labels)
+    metrics: list[Metric[Any]] = []
+    for field in dataclasses.fields(stats):
+        value: Any = getattr(stats, field.name)
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            continue
+        metric: Counter | Gauge
+        if field.name in counter_fields:
+            metric = Counter(
+                f"{prefix}_{field.name}_total", f"{prefix} {field.name}", label_names
+            )
+        else:
+            metric = Gauge(
+                f"{prefix}_{field.name}", f"{prefix} {field.name}", label_names
+            )
+        metric.labels(*label_values).value = float(value)
+        metrics.append(metric)
+    return metrics
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return str(value) if isinstance(value, int) else repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def render_metrics(metrics: Iterable[Metric[Any]]) -> str:
+    """
+    The text exposition format; metrics sharing a name (e.g the same stats,
+    labelled per retried coroutine) are written under one # HELP / # TYPE
+    """
+    lines: list[str] = []
+    seen: set[str] = set()
+    for metric in sorted(metrics, key=lambda metric: metric.name):
+        if metric.name not in seen:
+            seen.add(metric.name)
+            lines.append(f"# HELP {metric.name} {_escape(metric.documentation)}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+        for name, labels, value in metric.samples():
+            if labels:
+                label_text: str = ",".join(
+                    f'{label}="{_escape(label_value)}"' for label, label_value in labels
+                )
+                lines.append(f"{name}{{{label_text}}} {_format_value(value)}")
+            else:
+                lines.append(f"{name} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+"""
+The metrics every process has; updated where the work is done
+"""
+registry: MetricsRegistry = MetricsRegistry()
+
+HTTP_REQUESTS: Counter = registry.counter(
+    "http_requests_total",
+    "HTTP requests served, by route and status code",
+    ("method", "route", "status"),
+)
+HTTP_REQUEST_SECONDS: Histogram = registry.histogram(
+    "http_request_duration_seconds",
+    "Time to handle an HTTP request, by route",
+    ("method", "route"),
+)
+HTTP_REQUESTS_IN_FLIGHT: Gauge = registry.gauge(
+    "http_requests_in_flight",
+    "HTTP requests being handled now, by route",
+    ("route",),
+)
+STAGE_SECONDS: Histogram = registry.histogram(
+    "search_stage_duration_seconds",
+    "Time spent in each stage of a search: upstream_fetch (one attempt), "
+    "db_insert, db_insert_batch, serialize",
+    ("stage",),
+)
+UPSTREAM_RESPONSES: Counter = registry.counter(
+    "upstream_responses_total",
+    "Responses from Yahoo by status code; error if none came back",
+    ("status",),
+)
+
+
+def _route(request: web.Request) -> str:
+    """
+    The route's pattern, e.g /analytics/top_users; unmatched for a 404
+    - Not request.path, whose values are unbounded
+    """
+    resource: web.AbstractResource | None = request.match_info.route.resource
+    return resource.canonical if resource is not None else "unmatched"
+
+
+@web.middleware
+async def metrics_middleware(
+    request: web.Request,
+    handler: Callable[[web.Request], Awaitable[web.StreamResponse]],
+) -> web.StreamResponse:
+    """
+    Times every request, and counts it by status code
+    - A streamed response (e.g /search/batch) is timed until its last line
+    - An exception is counted as a 500, an HTTPException as its own status
+    """
+    route: str = _route(request)
+    in_flight: _GaugeChild = HTTP_REQUESTS_IN_FLIGHT.labels(route)
+    in_flight.value += 1
+    start: float = time.perf_counter()
+    status: int = 500
+    try:
+        response: web.StreamResponse = await handler(request)
+        status = response.status
+        return response
+    except web.HTTPException as e:
+        status = e.status
+        raise
+    finally:
+        in_flight.value -= 1
+        HTTP_REQUEST_SECONDS.labels(request.method, route).observe(
+            time.perf_counter() - start
+        )
+        HTTP_REQUESTS.labels(request.method, route, str(status)).inc()
@@ -0,0 +1,119 @@
+import zlib
+from typing import Any
+
+from aiohttp import web
+from pydantic import BaseModel
+from pydantic_core import to_json
+
+try:
+    import brotli
+except ImportError:  # optional; poetry install -E brotli to serve Content-Encoding: br
+    brotli = None
+
+
+class NdjsonStreamConfig(BaseModel):
+    """
+    Loaded from the [ndjson_stream] section of local_config/config.toml
+
+    - chunk_size: characters of html per line, when streaming a search result
+    - gzip_level: 1 (fastest) - 9 (smallest)
+    - brotli_quality: 0 (fastest) - 11 (smallest); only if brotli is installed
+    """
+
+    chunk_size: int = 64 * 1024
+    gzip_level: int = 6
+    brotli_quality: int = 4
+
+
+def negotiate_encoding(accept_encoding: str) -> str | None:
+    """
+    Picks the Content-Encoding of a response from the request's Accept-Encoding
+    - br, if the client accepts it and brotli is installed; else gzip; else None
+    - A coding with q=0 is refused by the client
+    """
+    accepted: set[str] = set()
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(coding.strip())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+class _Compressor:
+    """
+    Streaming gzip / br; every compress() returns the bytes ready to be sent
+    - Each write is flushed, so the client can decode a line as soon as it arrives
+    """
+
+    def __init__(self, encoding: str, config: NdjsonStreamConfig) -> None:
+        self.__encoding: str = encoding
+        if encoding == "br":
+            self.__brotli: Any = brotli.Compressor(quality=config.brotli_quality)
+        else:
+            # wbits=31: zlib with a gzip header and trailer
+            self.__gzip: Any = zlib.compressobj(config.gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        if self.__encoding == "br":
+            return self.__brotli.process(data) + self.__brotli.flush()
+        return self.__gzip.compress(data) + self.__gzip.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.__encoding == "br":
+            return self.__brotli.finish()
+        return self.__gzip.flush(zlib.Z_FINISH)
+
+
+class NdjsonStream:
+    """
+    A chunked application/x-ndjson response; one JSON document per line
+
+    Why stream?
+    - web.json_response serializes the whole body into one string first;
+    with a 300 - 800 KB html, that is another full copy per request
+    - Here, each line is serialized and sent on its own,
+    so the client gets the first bytes before the last ones are encoded
+
+    The body is gzip / br encoded when the client accepts it (see negotiate_encoding)
+    """
+
+    def __init__(self, request: web.Request, config: NdjsonStreamConfig) -> None:
+        self.__request: web.Request = request
+        self.__response: web.StreamResponse = web.StreamResponse(
+            headers={"Content-Type": "application/x-ndjson"}
+        )
+        encoding: str | None = negotiate_encoding(
+            request.headers.get("Accept-Encoding", "")
+        )
+        self.__compressor: _Compressor | None = None
+        if encoding is not None:
+            self.__compressor = _Compressor(encoding, config)
+            self.__response.headers["Content-Encoding"] = encoding
+            self.__response.headers["Vary"] = "Accept-Encoding"
+
+    @property
+    def response(self) -> web.StreamResponse:
+        return self.__response
+
+    async def start(self) -> None:
+        """
+        Sends the status line and headers
+        """
+        await self.__response.prepare(self.__request)
+
+    async def write(self, line: dict[str, Any]) -> None:
+        data: bytes = to_json(line) + b"\n"
+        if self.__compressor is not None:
+            data = self.__compressor.compress(data)
+        await self.__response.write(data)
+
+    async def close(self) -> web.StreamResponse:
+        if self.__compressor is not None:
+            await self.__response.write(self.__compressor.finish())
+        await self.__response.write_eof()
+        return self.__response
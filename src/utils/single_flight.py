@@ -0,0 +1,63 @@
+import asyncio
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import Generic, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass
+class SingleFlightStats:
+    """
+    originated: calls that started a new fetch
+    coalesced: calls that joined a fetch already in flight
+
+    fan-in ratio = (originated + coalesced) / originated
+    """
+
+    originated: int = 0
+    coalesced: int = 0
+
+
+class SingleFlight(Generic[T]):
+    """
+    Collapses concurrent calls with the same key into one in-flight call
+
+    E.G 100 users search "euro 2024" in the same second
+    - The first caller starts the fetch
+    - The next 99 await that same fetch, instead of starting their own
+    - Once it completes, the key is forgotten; the next caller starts a new fetch
+
+    The fetch runs as its own task, and each caller awaits it behind asyncio.shield
+    - A caller that is cancelled (e.g client disconnected)
+    does not cancel the fetch for everyone else
+
+    The task copies the context of the caller that started it, contextvars included
+    - fn must drop anything bound to that one caller, e.g its deadline
+    (see clear_deadline in src/utils/deadline.py)
+    """
+
+    def __init__(self) -> None:
+        self.__in_flight: dict[str, asyncio.Task[T]] = {}
+        self.stats: SingleFlightStats = SingleFlightStats()
+
+    def __len__(self) -> int:
+        return len(self.__in_flight)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        task: asyncio.Task[T] | None = self.__in_flight.get(key)
+        if task is None:
+            self.stats.originated += 1
+            task = asyncio.ensure_future(fn())
+            self.__in_flight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.stats.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task[T]) -> None:
+        if self.__in_flight.get(key) is task:
+            del self.__in_flight[key]
+        if not task.cancelled():
+            # marks the exception as retrieved, in case every caller was cancelled
+            task.exception()
@@ -0,0 +1,208 @@
+import asyncio
+import math
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+
+from pydantic import BaseModel
+
+from src.utils.metrics import Histogram, registry
+
+
+class UpstreamLimiterConfig(BaseModel):
+    """
+    Loaded from the [upstream_limiter] section of local_config/config.toml
+
+    - enabled: put the limiter in front of every request to Yahoo
+    - max_concurrency: most requests to Yahoo in flight at once, per process
+    - rate_per_second: requests to Yahoo started per second (a token bucket);
+    0 for no rate limit, only max_concurrency
+    - burst: requests that may start at once after an idle period;
+    the size of the bucket
+    - max_queue_wait_seconds: a search waiting longer than this for its turn
+    fails with UpstreamQueueTimeout, instead of queueing without bound
+
+    Adaptive mode (AIMD, additive increase / multiplicative decrease)
+    - adaptive: adjust the rate to what Yahoo accepts;
+    rate_per_second is then the most it ever goes up to
+    - On a 429 or 5xx, the rate is multiplied by decrease_factor,
+    at most once every cooldown_seconds (a burst of 429s is one signal),
+    and never below min_rate_per_second
+    - Every increase_interval_seconds without one, additive_increase is added back
+    """
+
+    enabled: bool = True
+    max_concurrency: int = 50
+    rate_per_second: float = 20.0
+    burst: int = 20
+    max_queue_wait_seconds: float | None = 5.0
+    adaptive: bool = True
+    min_rate_per_second: float = 1.0
+    decrease_factor: float = 0.5
+    cooldown_seconds: float = 1.0
+    additive_increase: float = 1.0
+    increase_interval_seconds: float = 1.0
+
+
+@dataclass
+class UpstreamLimiterStats:
+    """
+    acquired: requests let through to Yahoo
+    queue_timeouts: searches that gave up waiting (see max_queue_wait_seconds)
+    queue_wait_seconds: time spent waiting for a slot and a token, in total
+    throttled: 429 / 5xx responses seen
+    rate_decreases / rate_increases: adjustments made by the adaptive mode
+
+    waiting, in_flight and rate_per_second are the values right now
+    """
+
+    acquired: int = 0
+    queue_timeouts: int = 0
+    queue_wait_seconds: float = 0.0
+    throttled: int = 0
+    rate_decreases: int = 0
+    rate_increases: int = 0
+    waiting: int = 0
+    in_flight: int = 0
+    rate_per_second: float = 0.0
+
+
+class UpstreamQueueTimeout(Exception):
+    """
+    Waited longer than max_queue_wait_seconds for a turn to call Yahoo
+    - Not retried by @async_retry; retrying would only queue up again
+    """
+
+
+UPSTREAM_QUEUE_WAIT_SECONDS: Histogram = registry.histogram(
+    "upstream_queue_wait_seconds",
+    "Time a request to Yahoo waited for the upstream limiter",
+)
+
+
+def is_throttled(status: int) -> bool:
+    """
+    429 Too Many Requests, or Yahoo struggling (5xx); both mean slow down
+    """
+    return status == 429 or status >= 500
+
+
+class UpstreamLimiter:
+    """
+    Bounds the requests made to Yahoo, however many /search calls come in
+
+    Without it, a burst of 500 distinct searches opens 500 requests to Yahoo
+    at once; it throttles us, and the searches are stored with result=None
+
+    async with limiter.acquire():
+        ... call Yahoo ...
+        limiter.on_response(response.status)
+
+    1) A slot: at most max_concurrency requests in flight (a Semaphore)
+    2) A token: at most rate_per_second requests started per second
+    - Tokens are handed out in arrival order, behind an asyncio.Lock;
+    a waiter sleeps until its token is due, without polling
+    3) on_response feeds Yahoo's answer back into the rate (see adaptive)
+    """
+
+    def __init__(self, config: UpstreamLimiterConfig) -> None:
+        self.__config: UpstreamLimiterConfig = config
+        self.__slots: asyncio.Semaphore = asyncio.Semaphore(config.max_concurrency)
+        self.__token_lock: asyncio.Lock = asyncio.Lock()
+        self.__tokens: float = float(config.burst)
+        self.__refilled_at: float = time.monotonic()
+        self.__decreased_at: float = -math.inf
+        self.__increased_at: float = time.monotonic()
+        self.stats: UpstreamLimiterStats = UpstreamLimiterStats(
+            rate_per_second=config.rate_per_second
+        )
+
+    def _refill(self) -> None:
+        now: float = time.monotonic()
+        self.__tokens = min(
+            float(self.__config.burst),
+            self.__tokens + (now - self.__refilled_at) * self.stats.rate_per_second,
+        )
+        self.__refilled_at = now
+
+    async def _take_token(self) -> None:
+        if self.__config.rate_per_second <= 0:
+            return
+        async with self.__token_lock:
+            self._refill()
+            while self.__tokens < 1:
+                # the rate may drop while we sleep; check again after
+                await asyncio.sleep((1 - self.__tokens) / self.stats.rate_per_second)
+                self._refill()
+            self.__tokens -= 1
+
+    async def _wait_for_turn(self) -> None:
+        await self.__slots.acquire()
+        try:
+            await self._take_token()
+        except BaseException:
+            self.__slots.release()
+            raise
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[None]:
+        """
+        Waits for a slot and a token; the slot is held until the block exits
+        :raises UpstreamQueueTimeout: if that takes over max_queue_wait_seconds
+        """
+        start: float = time.perf_counter()
+        self.stats.waiting += 1
+        try:
+            async with asyncio.timeout(self.__config.max_queue_wait_seconds):
+                await self._wait_for_turn()
+        except TimeoutError as e:
+            self.stats.queue_timeouts += 1
+            raise UpstreamQueueTimeout(
+                f"Waited over {self.__config.max_queue_wait_seconds}s to call Yahoo"
+            ) from e
+        finally:
+            self.stats.waiting -= 1
+            waited: float = time.perf_counter() - start
+            self.stats.queue_wait_seconds += waited
+            UPSTREAM_QUEUE_WAIT_SECONDS.observe(waited)
+        self.stats.acquired += 1
+        self.stats.in_flight += 1
+        try:
+            yield
+        finally:
+            self.stats.in_flight -= 1
+            self.__slots.release()
+
+    def on_response(self, status: int) -> None:
+        """
+        Adaptive mode: slows down on a 429 / 5xx, speeds back up while there is none
+        """
+        if is_throttled(status):
+            self.stats.throttled += 1
+        if not self.__config.adaptive or self.__config.rate_per_second <= 0:
+            return
+        now: float = time.monotonic()
+        if is_throttled(status):
+            if now - self.__decreased_at < self.__config.cooldown_seconds:
+                return
+            # tokens earned so far are earned at the old rate
+            self._refill()
+            self.stats.rate_per_second = max(
+                self.__config.min_rate_per_second,
+                self.stats.rate_per_second * self.__config.decrease_factor,
+            )
+            self.__decreased_at = now
+            self.stats.rate_decreases += 1
+        elif (
+            self.stats.rate_per_second < self.__config.rate_per_second
+            and now - self.__increased_at >= self.__config.increase_interval_seconds
+            and now - self.__decreased_at >= self.__config.cooldown_seconds
+        ):
+            self._refill()
+            self.stats.rate_per_second = min(
+                self.__config.rate_per_second,
+                self.stats.rate_per_second + self.__config.additive_increase,
+            )
+            self.__increased_at = now
+            self.stats.rate_increases += 1
@@ -53,3 +53,13 @@ class TestSearchResult:
                 user_id=user_id, search_term=search_term, result=result
             )
             assert search_results == expected_search_result
+
+    @pytest.mark.parametrize(
+        ["input", "expected"],
+        [
+            ["Euro 2024", "euro 2024"],
+            ["  euro   2024 ", "euro 2024"],
+        ],
+    )
+    def test_normalize_search_term(self, input: str, expected: str) -> None:
+        assert SearchResults.normalize_search_term(input) == expected
@@ -0,0 +1,54 @@
+import asyncio
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from src.services.search_analytics_refresher import (
+    SearchAnalyticsConfig,
+    SearchAnalyticsRefresher,
+)
+
+
+class TestSearchAnalyticsRefresher:
+    @pytest.mark.asyncio_cooperative
+    async def test_refresh_lags_behind_now(self) -> None:
+        dao: AsyncMock = AsyncMock()
+        dao.refresh_search_rollups.return_value = 3
+        refresher: SearchAnalyticsRefresher = SearchAnalyticsRefresher(
+            dao, SearchAnalyticsConfig(lag_seconds=60)
+        )
+        before: datetime = datetime.utcnow()
+        assert await refresher.refresh() == 3
+        until: datetime = dao.refresh_search_rollups.await_args.args[0]
+        assert before - timedelta(seconds=61) < until <= before - timedelta(seconds=59)
+        assert refresher.stats.refreshes == 1
+        assert refresher.stats.rolled_up_rows == 3
+        assert refresher.stats.last_refreshed_until == until
+
+    @pytest.mark.asyncio_cooperative
+    async def test_keeps_refreshing_after_a_failure(self) -> None:
+        rolled_up: list[int] = [5]
+
+        async def refresh_search_rollups(until: datetime) -> int:
+            if not rolled_up:
+                return 0
+            if dao.refresh_search_rollups.await_count == 1:
+                raise OperationalError("SELECT 1", {}, Exception("connection dropped"))
+            return rolled_up.pop()
+
+        dao: AsyncMock = AsyncMock()
+        dao.refresh_search_rollups.side_effect = refresh_search_rollups
+        refresher: SearchAnalyticsRefresher = SearchAnalyticsRefresher(
+            dao, SearchAnalyticsConfig(refresh_interval_seconds=0.01)
+        )
+        await refresher.start()
+        # other cooperative tests share the loop; poll rather than sleep a fixed time
+        for _ in range(100):
+            if refresher.stats.rolled_up_rows:
+                break
+            await asyncio.sleep(0.01)
+        await refresher.close()
+        assert refresher.stats.failed_refreshes == 1
+        assert refresher.stats.rolled_up_rows == 5
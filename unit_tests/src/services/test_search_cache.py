@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from src.models.search_results import SearchResults
+from src.services.search_cache import SearchCacheConfig, SearchResultCache
+
+
+def dummy_cache(
+    database_row: SearchResults | None = None,
+    max_entries: int = 10,
+    max_bytes: int = 1024 * 1024,
+) -> tuple[SearchResultCache, AsyncMock]:
+    dao: AsyncMock = AsyncMock()
+    dao.fetch_recent_search.return_value = database_row
+    cache: SearchResultCache = SearchResultCache(
+        dao,
+        SearchCacheConfig(
+            ttl_seconds=3600, max_entries=max_entries, max_bytes=max_bytes
+        ),
+    )
+    return cache, dao
+
+
+class TestSearchResultCache:
+    """
+    Timestamps are relative to utcnow rather than frozen with freezegun
+    - asyncio_cooperative tests share one event loop and interleave,
+    so a frozen clock in one test would leak into the others
+    """
+
+    @pytest.mark.asyncio_cooperative
+    async def test_memory_hit(self) -> None:
+        cache, dao = dummy_cache()
+        cache.put("tea", "tea html", datetime.utcnow() - timedelta(minutes=30))
+        assert await cache.get("tea") == "tea html"
+        dao.fetch_recent_search.assert_not_called()
+        assert cache.stats.memory_hits == 1
+
+    @pytest.mark.asyncio_cooperative
+    async def test_normalized_terms_share_an_entry(self) -> None:
+        cache, dao = dummy_cache()
+        cache.put("Tea", "tea html", datetime.utcnow() - timedelta(minutes=30))
+        assert await cache.get("tea ") == "tea html"
+        dao.fetch_recent_search.assert_not_called()
+        cache.put(" TEA", "newer tea html", datetime.utcnow())
+        assert len(cache) == 1
+        assert await cache.get("tea") == "newer tea html"
+
+    @pytest.mark.asyncio_cooperative
+    async def test_database_hit_is_promoted(self) -> None:
+        database_row: SearchResults = SearchResults(
+            search_id="dummy_search_id",
+            user_id="dummy_user_id",
+            search_term="tea",
+            result="tea html",
+            created_at=datetime.utcnow() - timedelta(minutes=30),
+        )
+        cache, dao = dummy_cache(database_row)
+        assert await cache.get("tea") == "tea html"
+        assert await cache.get("tea") == "tea html"
+        dao.fetch_recent_search.assert_awaited_once()
+        since: datetime = dao.fetch_recent_search.await_args.args[1]
+        assert since <= datetime.utcnow() - timedelta(hours=1)
+        assert cache.stats.database_hits == 1
+        assert cache.stats.memory_hits == 1
+
+    @pytest.mark.asyncio_cooperative
+    async def test_expired_entry_is_a_miss(self) -> None:
+        cache, _ = dummy_cache()
+        cache.put("tea", "tea html", datetime.utcnow() - timedelta(minutes=90))
+        assert await cache.get("tea") is None
+        assert cache.stats.misses == 1
+        assert len(cache) == 0
+
+    @pytest.mark.asyncio_cooperative
+    async def test_database_error_is_a_miss(self) -> None:
+        cache, dao = dummy_cache()
+        dao.fetch_recent_search.side_effect = OperationalError("", {}, Exception())
+        assert await cache.get("tea") is None
+        assert cache.stats.misses == 1
+
+    @staticmethod
+    def test_evicts_least_recently_used_by_entries() -> None:
+        cache, _ = dummy_cache(max_entries=2)
+        now: datetime = datetime.utcnow()
+        cache.put("tea", "tea html", now)
+        cache.put("coffee", "coffee html", now)
+        cache.put("milo", "milo html", now)
+        assert len(cache) == 2
+        assert cache.stats.evictions == 1
+
+    @staticmethod
+    def test_evicts_by_bytes() -> None:
+        cache, _ = dummy_cache(max_bytes=3000)
+        now: datetime = datetime.utcnow()
+        cache.put("tea", "t" * 1000, now)
+        cache.put("coffee", "c" * 1000, now)
+        cache.put("milo", "m" * 1000, now)
+        assert cache.size_bytes <= 3000
+        assert len(cache) == 2
+
+    @staticmethod
+    def test_none_result_is_not_cached() -> None:
+        cache, _ = dummy_cache()
+        cache.put("tea", None, datetime.utcnow())
+        assert len(cache) == 0
@@ -0,0 +1,83 @@
+from datetime import datetime
+
+import pytest
+
+from src.models.search_results_partition import SearchResultsPartition
+from src.services.search_results_partitions import (
+    SearchResultsPartitionMaintenance,
+    SearchResultsPartitionsConfig,
+)
+
+# a Wednesday
+NOW: datetime = datetime(year=2024, month=6, day=19, hour=15)
+
+
+def daily(day: int, month: int = 6) -> SearchResultsPartition:
+    return SearchResultsPartition(
+        name=f"search_results_p2024{month:02d}{day:02d}",
+        start=datetime(2024, month, day),
+        end=datetime(2024, month, day + 1),
+    )
+
+
+class TestSearchResultsPartitionMaintenance:
+    @staticmethod
+    def test_creates_missing_daily_partitions() -> None:
+        to_create, to_expire = SearchResultsPartitionMaintenance.plan(
+            [daily(19), daily(20)],
+            NOW,
+            SearchResultsPartitionsConfig(premake=3, retention_days=None),
+        )
+        assert to_create == [daily(21), daily(22)]
+        assert to_expire == []
+
+    @staticmethod
+    def test_clips_around_legacy_partition() -> None:
+        legacy: SearchResultsPartition = SearchResultsPartition(
+            name="search_results_legacy", start=None, end=datetime(2024, 6, 19, 0)
+        )
+        to_create, _ = SearchResultsPartitionMaintenance.plan(
+            [legacy, daily(21)],
+            NOW,
+            SearchResultsPartitionsConfig(interval="week", premake=1),
+        )
+        # the week of Monday 17th, around the legacy and daily partitions
+        assert to_create == [
+            SearchResultsPartition(
+                name="search_results_p20240619",
+                start=datetime(2024, 6, 19),
+                end=datetime(2024, 6, 21),
+            ),
+            SearchResultsPartition(
+                name="search_results_p20240622",
+                start=datetime(2024, 6, 22),
+                end=datetime(2024, 6, 24),
+            ),
+            SearchResultsPartition(
+                name="search_results_p20240624",
+                start=datetime(2024, 6, 24),
+                end=datetime(2024, 7, 1),
+            ),
+        ]
+
+    @staticmethod
+    @pytest.mark.parametrize(
+        "retention_days, expired",
+        [
+            (None, []),
+            (30, []),
+            (1, ["search_results_legacy", "search_results_p20240617"]),
+        ],
+    )
+    def test_expires_partitions_past_retention(
+        retention_days: int | None, expired: list[str]
+    ) -> None:
+        legacy: SearchResultsPartition = SearchResultsPartition(
+            name="search_results_legacy", start=None, end=datetime(2024, 6, 17)
+        )
+        _, to_expire = SearchResultsPartitionMaintenance.plan(
+            [legacy, daily(17), daily(18), daily(19)],
+            NOW,
+            SearchResultsPartitionsConfig(premake=0, retention_days=retention_days),
+        )
+        assert [partition.name for partition in to_expire] == expired
@@ -0,0 +1,102 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from src.models.search_results import SearchResults
+from src.services.search_results_writer import (
+    SearchResultsWriter,
+    SearchResultsWriterConfig,
+)
+
+
+def dummy_results(count: int) -> list[SearchResults]:
+    return [
+        SearchResults.create(
+            user_id="dummy_user_id", search_term=f"tea {i}", result="tea html"
+        )
+        for i in range(count)
+    ]
+
+
+class TestSearchResultsWriter:
+    @pytest.mark.asyncio_cooperative
+    async def test_flushes_full_batches(self) -> None:
+        dao: AsyncMock = AsyncMock()
+        writer: SearchResultsWriter = SearchResultsWriter(
+            dao, SearchResultsWriterConfig(batch_size=2, flush_interval_ms=10_000)
+        )
+        await writer.start()
+        results: list[SearchResults] = dummy_results(4)
+        for result in results:
+            await writer.submit(result)
+        await writer.close()
+        assert [call.args[0] for call in dao.insert_searches.await_args_list] == [
+            results[:2],
+            results[2:],
+        ]
+        assert writer.stats.flushed_rows == 4
+        assert writer.stats.flushed_batches == 2
+
+    @pytest.mark.asyncio_cooperative
+    async def test_flushes_after_interval(self) -> None:
+        dao: AsyncMock = AsyncMock()
+        writer: SearchResultsWriter = SearchResultsWriter(
+            dao, SearchResultsWriterConfig(batch_size=100, flush_interval_ms=20)
+        )
+        await writer.start()
+        results: list[SearchResults] = dummy_results(3)
+        for result in results:
+            await writer.submit(result)
+        # other cooperative tests share the loop; poll rather than sleep a fixed time
+        flushed: list[SearchResults] = []
+        for _ in range(100):
+            flushed = [
+                result
+                for call in dao.insert_searches.await_args_list
+                for result in call.args[0]
+            ]
+            if len(flushed) == len(results):
+                break
+            await asyncio.sleep(0.01)
+        # flushed by the interval, before close() is called
+        assert flushed == results
+        await writer.close()
+
+    @pytest.mark.asyncio_cooperative
+    async def test_close_drains_queue(self) -> None:
+        dao: AsyncMock = AsyncMock()
+        writer: SearchResultsWriter = SearchResultsWriter(
+            dao, SearchResultsWriterConfig(batch_size=100, flush_interval_ms=10_000)
+        )
+        await writer.start()
+        for result in dummy_results(5):
+            await writer.submit(result)
+        await writer.close()
+        assert writer.stats.flushed_rows == 5
+        assert writer.queue_size == 0
+
+    @pytest.mark.asyncio_cooperative
+    async def test_failed_batch_is_counted(self) -> None:
+        dao: AsyncMock = AsyncMock()
+        dao.insert_searches.side_effect = OperationalError("", {}, Exception())
+        writer: SearchResultsWriter = SearchResultsWriter(
+            dao, SearchResultsWriterConfig(batch_size=2)
+        )
+        await writer.start()
+        for result in dummy_results(2):
+            await writer.submit(result)
+        await writer.close()
+        assert writer.stats.failed_rows == 2
+        assert writer.stats.flushed_rows == 0
+
+    @pytest.mark.asyncio_cooperative
+    async def test_inserts_directly_when_not_started(self) -> None:
+        dao: AsyncMock = AsyncMock()
+        writer: SearchResultsWriter = SearchResultsWriter(
+            dao, SearchResultsWriterConfig()
+        )
+        result: SearchResults = dummy_results(1)[0]
+        await writer.submit(result)
+        dao.insert_search.assert_awaited_once_with(result)
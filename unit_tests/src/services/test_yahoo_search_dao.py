@@ -0,0 +1,118 @@
+from datetime import datetime
+from typing import Any
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from src.models.records import SearchRecord
+from src.models.search_results import SearchResults
+from src.services.yahoo_search_dao import YahooSearchDAO
+from src.utils.compression import compress_result
+
+
+DB_CONFIG: dict[str, Any] = {
+    "host": "localhost",
+    "port": 5432,
+    "database": "yahoo_search_engine",
+}
+
+
+def dummy_search(minute: int) -> SearchResults:
+    return dummy_record(minute).to_model()
+
+
+def dummy_record(minute: int) -> SearchRecord:
+    return SearchRecord(
+        search_id=f"dummy_search_id_{minute}",
+        user_id="dummy_user_id",
+        search_term="tea",
+        result=None,
+        created_at=datetime(year=2024, month=4, day=10, hour=12, minute=minute),
+    )
+
+
+class TestYahooSearchDAO:
+    @pytest.mark.asyncio_cooperative
+    async def test_stream_searches_pages_by_keyset(self) -> None:
+        dao: YahooSearchDAO = YahooSearchDAO(DB_CONFIG)
+        pages: list[list[SearchRecord]] = [
+            [dummy_record(0), dummy_record(1)],
+            [dummy_record(2), dummy_record(3)],
+            [dummy_record(4)],
+        ]
+        with patch.object(
+            dao, "_fetch_searches_page", AsyncMock(side_effect=pages)
+        ) as mock_fetch_page:
+            streamed: list[SearchResults] = [
+                search
+                async for search in dao.stream_searches(
+                    batch_size=2, include_result=False
+                )
+            ]
+        assert streamed == [record.to_model() for page in pages for record in page]
+        # each page starts after the last (created_at, search_id) of the previous
+        assert [call.args for call in mock_fetch_page.await_args_list] == [
+            (2, False, None),
+            (2, False, (pages[0][1].created_at, pages[0][1].search_id)),
+            (2, False, (pages[1][1].created_at, pages[1][1].search_id)),
+        ]
+
+    @staticmethod
+    @pytest.mark.parametrize(
+        ["compress_results", "result", "expect_compressed"],
+        [
+            [False, "tea html", False],
+            [True, "tea html", True],
+            [True, None, False],
+        ],
+    )
+    def test_insert_search_params(
+        compress_results: bool, result: str | None, expect_compressed: bool
+    ) -> None:
+        dao: YahooSearchDAO = YahooSearchDAO(
+            {**DB_CONFIG, "compress_results": compress_results}
+        )
+        search: SearchResults = dummy_search(0).model_copy(update={"result": result})
+        params: dict[str, Any] = dao._insert_search_params(search)
+        if expect_compressed:
+            assert params["result"] is None
+            assert params["result_compressed"] == compress_result(result)
+        else:
+            assert params["result"] == result
+            assert params["result_compressed"] is None
+        # whichever column holds the html, it reads back the same
+        assert (
+            YahooSearchDAO._result_from_columns(
+                params["result"], params["result_compressed"]
+            )
+            == result
+        )
+
+    @staticmethod
+    def test_insert_search_params_normalize_the_term() -> None:
+        dao: YahooSearchDAO = YahooSearchDAO(DB_CONFIG)
+        search: SearchResults = dummy_search(0).model_copy(
+            update={"search_term": "  Euro  2024"}
+        )
+        assert dao._insert_search_params(search)["search_term"] == "euro 2024"
+
+    @staticmethod
+    def test_search_record_from_row() -> None:
+        record: SearchRecord = YahooSearchDAO._search_record(
+            (
+                "dummy_search_id_0",
+                "dummy_user_id",
+                "tea",
+                None,
+                compress_result("tea html"),
+                datetime(year=2024, month=4, day=10, hour=12),
+            )
+        )
+        assert record.result == "tea html"
+        assert record.to_model() == SearchResults(
+            search_id="dummy_search_id_0",
+            user_id="dummy_user_id",
+            search_term="tea",
+            result="tea html",
+            created_at=datetime(year=2024, month=4, day=10, hour=12),
+        )
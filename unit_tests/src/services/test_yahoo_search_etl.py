@@ -0,0 +1,47 @@
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import AsyncMock
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from src.models.extracted_search_result import ExtractedSearchResult
+from src.services.yahoo_search_etl import (
+    ETLReport,
+    YahooSearchETL,
+    YahooSearchETLConfig,
+)
+
+fixture_html: str = Path("unit_tests/fixtures/yahoo_search_tea.html").read_text()
+
+
+class TestYahooSearchETL:
+    @pytest.mark.asyncio_cooperative
+    async def test_transform(self) -> None:
+        searched_at: datetime = datetime(year=2024, month=4, day=10, hour=12)
+        etl: YahooSearchETL = YahooSearchETL(AsyncMock(), YahooSearchETLConfig())
+        extracted: list[ExtractedSearchResult] = await etl.transform(
+            [("dummy_search_id", fixture_html, searched_at)],
+            "dummy_user_id",
+        )
+        assert len(extracted) == 10
+        assert extracted[0].user_id == "dummy_user_id"
+        assert extracted[0].url == "https://en.wikipedia.org/wiki/Tea"
+        assert extracted[0].created_at == searched_at
+
+    @pytest.mark.asyncio_cooperative
+    async def test_run_reports_each_user(self) -> None:
+        dao: AsyncMock = AsyncMock()
+        dao.fetch_user_ids.return_value = ["user_a", "user_b", "user_c"]
+        dao.extract_searches_for_user.side_effect = [
+            (2, 20),
+            OperationalError("", {}, Exception()),
+            (1, 10),
+        ]
+        etl: YahooSearchETL = YahooSearchETL(dao, YahooSearchETLConfig(concurrency=2))
+        report: ETLReport = await etl.run()
+        assert report.users == 2
+        assert report.failed_users == 1
+        assert report.searches == 3
+        assert report.extracted == 30
+        assert dao.extract_searches_for_user.await_count == 3
@@ -0,0 +1,61 @@
+from pathlib import Path
+
+import pytest
+
+from src.models.search_hit import SearchHit
+from src.services.yahoo_search_parser import YahooSearchParser
+
+fixture_html: bytes = Path("unit_tests/fixtures/yahoo_search_tea.html").read_bytes()
+
+
+class TestYahooSearchParser:
+    @staticmethod
+    def test_parse_top_results() -> None:
+        hits: list[SearchHit] = YahooSearchParser.parse(fixture_html)
+        assert len(hits) == 10
+        assert hits[0] == SearchHit(
+            title="Tea - Wikipedia",
+            url="https://en.wikipedia.org/wiki/Tea",
+            date=None,
+            body="Tea is an aromatic beverage prepared by pouring hot or boiling water "
+            "over cured or fresh leaves of Camellia sinensis, "
+            "an evergreen shrub native to East Asia.",
+        )
+
+    @staticmethod
+    def test_parse_date_and_entities() -> None:
+        hit: SearchHit = YahooSearchParser.parse(fixture_html)[1]
+        assert hit.title == "Tea | Definition, Types, & Health Benefits | Britannica"
+        assert hit.date == "Apr 2, 2024"
+        assert hit.body is not None and hit.body.startswith("tea, beverage")
+
+    @staticmethod
+    def test_sponsored_results_are_skipped() -> None:
+        urls: list[str] = [hit.url for hit in YahooSearchParser.parse(fixture_html)]
+        assert "https://ads.example.com/tea" not in urls
+
+    @staticmethod
+    def test_parse_str_and_limit() -> None:
+        hits: list[SearchHit] = YahooSearchParser.parse(
+            fixture_html.decode("utf-8"), limit=3
+        )
+        assert len(hits) == 3
+
+    @staticmethod
+    def test_parse_page_without_results() -> None:
+        assert YahooSearchParser.parse("<html><body>No results</body></html>") == []
+
+    @staticmethod
+    @pytest.mark.parametrize(
+        ["href", "expected"],
+        [
+            [
+                "https://r.search.yahoo.com/_ylt=A;_ylu=B/RV=2/RE=1/RO=10/"
+                "RU=https%3a%2f%2fwww.twinings.com%2f/RK=2/RS=abc-",
+                "https://www.twinings.com/",
+            ],
+            ["https://www.twinings.com/", "https://www.twinings.com/"],
+        ],
+    )
+    def test_resolve_url(href: str, expected: str) -> None:
+        assert YahooSearchParser.resolve_url(href) == expected
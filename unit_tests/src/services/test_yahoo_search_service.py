@@ -1,4 +1,18 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import aiohttp
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from src.models.search_results import SearchResults
 from src.services.yahoo_search_service import YahooSearchService
+from src.utils.circuit_breaker import (
+    CircuitBreaker,
+    CircuitBreakerConfig,
+    CircuitOpenError,
+)
+from src.utils.deadline import DeadlineExceeded, stage_timeout, with_deadline
+from src.utils.http_client import HttpClientConfig
 import pytest
 import requests
 
@@ -19,9 +33,16 @@ class TestYahooSearchEngine:
         actual: str = YahooSearchService.create_url(input)
         assert actual == expected, "url is not formatted correctly"
 
+    @staticmethod
+    def test_create_url_with_base_url() -> None:
+        actual: str = YahooSearchService.create_url(
+            "green tea", "http://127.0.0.1:8081/search"
+        )
+        assert actual == "http://127.0.0.1:8081/search?q=green%20tea"
+
     @pytest.fixture
     def yahoo_search_engine(self) -> YahooSearchService:
-        return YahooSearchService()
+        return YahooSearchService(yahoo_search_dao=AsyncMock())
 
     @staticmethod
     def dummy_requests_get(url: str, *args, **kwargs) -> requests.Response:
@@ -29,3 +50,189 @@ class TestYahooSearchEngine:
         mock_response._content = b"Some content"
         mock_response.status_code = 200
         return mock_response
+
+    @pytest.mark.asyncio_cooperative
+    async def test_yahoo_search_served_from_cache(self) -> None:
+        dao: AsyncMock = AsyncMock()
+        cache: AsyncMock = AsyncMock()
+        cache.get.return_value = "cached html"
+        service: YahooSearchService = YahooSearchService(
+            yahoo_search_dao=dao, search_cache=cache
+        )
+        with patch.object(service, "_search") as mock_search:
+            result: SearchResults = await service.yahoo_search("dummy_user_id", "tea")
+            mock_search.assert_not_called()
+        assert result.user_id == "dummy_user_id"
+        assert result.result == "cached html"
+        dao.insert_search.assert_awaited_once_with(result)
+
+    @pytest.mark.asyncio_cooperative
+    async def test_yahoo_search_failure_stores_dummy_result(self) -> None:
+        dao: AsyncMock = AsyncMock()
+        service: YahooSearchService = YahooSearchService(yahoo_search_dao=dao)
+        with patch.object(
+            service, "_search", side_effect=aiohttp.ClientError("wifi down")
+        ):
+            result: SearchResults = await service.yahoo_search("dummy_user_id", "tea")
+        assert result.result is None
+        dao.insert_search.assert_awaited_once_with(result)
+
+    @pytest.mark.asyncio_cooperative
+    async def test_concurrent_searches_share_one_fetch(self) -> None:
+        service: YahooSearchService = YahooSearchService(yahoo_search_dao=AsyncMock())
+
+        async def slow_fetch(search_term: str) -> str:
+            await asyncio.sleep(0.01)
+            return "tea html"
+
+        with patch.object(service, "_fetch", side_effect=slow_fetch) as mock_fetch:
+            results: tuple[SearchResults, ...] = await asyncio.gather(
+                service._search("user_a", "tea"),
+                service._search("user_b", " Tea "),
+            )
+            mock_fetch.assert_called_once()
+        assert [result.user_id for result in results] == ["user_a", "user_b"]
+        assert results[0].search_id != results[1].search_id
+        assert all(result.result == "tea html" for result in results)
+        assert service.single_flight_stats.coalesced == 1
+
+    @pytest.mark.asyncio_cooperative
+    async def test_yahoo_search_batch(self) -> None:
+        dao: AsyncMock = AsyncMock()
+        service: YahooSearchService = YahooSearchService(yahoo_search_dao=dao)
+        in_flight: list[int] = [0, 0]
+
+        async def search(user_id: str, search_term: str) -> SearchResults:
+            in_flight[0] += 1
+            in_flight[1] = max(in_flight)
+            await asyncio.sleep(0.01)
+            in_flight[0] -= 1
+            if search_term == "coffee":
+                raise aiohttp.ClientError("wifi down")
+            return SearchResults.create(user_id, search_term, f"{search_term} html")
+
+        with patch.object(service, "_search", side_effect=search) as mock_search:
+            outcomes = [
+                outcome
+                async for outcome in service.yahoo_search_batch(
+                    "dummy_user_id", ["tea", "coffee", " Tea", "milo", "kopi"], 2
+                )
+            ]
+            # " Tea" is searched once, with "tea"
+            assert mock_search.await_count == 4
+        assert in_flight[1] == 2
+        assert sorted(outcome.indexes for outcome in outcomes) == [
+            [0, 2],
+            [1],
+            [3],
+            [4],
+        ]
+        failed = [outcome for outcome in outcomes if outcome.error is not None]
+        assert [outcome.indexes for outcome in failed] == [[1]]
+        assert failed[0].result.result is None
+        # every distinct search, failed ones included, in one bulk insert
+        dao.insert_searches.assert_awaited_once_with(
+            [outcome.result for outcome in outcomes]
+        )
+
+    @pytest.mark.asyncio_cooperative
+    async def test_open_circuit_serves_stale_without_persisting(self) -> None:
+        dao: AsyncMock = AsyncMock()
+        stored: SearchResults = SearchResults.create("other_user", "tea", "old html")
+        dao.fetch_recent_search.return_value = stored
+        service: YahooSearchService = YahooSearchService(
+            yahoo_search_dao=dao, circuit_breaker=CircuitBreaker(CircuitBreakerConfig())
+        )
+        with patch.object(
+            service, "_search", side_effect=CircuitOpenError("circuit open")
+        ):
+            result: SearchResults = await service.yahoo_search("dummy_user_id", "tea")
+        assert result.user_id == "dummy_user_id"
+        assert result.search_id != stored.search_id
+        assert (result.result, result.created_at) == ("old html", stored.created_at)
+        dao.insert_search.assert_not_awaited()
+
+    @pytest.mark.asyncio_cooperative
+    async def test_open_circuit_fails_fast_without_persisting(self) -> None:
+        dao: AsyncMock = AsyncMock()
+        dao.fetch_recent_search.return_value = None
+        service: YahooSearchService = YahooSearchService(
+            yahoo_search_dao=dao, circuit_breaker=CircuitBreaker(CircuitBreakerConfig())
+        )
+        with patch.object(
+            service, "_search", side_effect=CircuitOpenError("circuit open")
+        ):
+            with pytest.raises(CircuitOpenError):
+                await service.yahoo_search("dummy_user_id", "tea")
+        dao.insert_search.assert_not_awaited()
+
+    @pytest.mark.asyncio_cooperative
+    async def test_throttling_opens_the_circuit(self) -> None:
+        async def throttled(request: web.Request) -> web.Response:
+            return web.Response(status=429)
+
+        app: web.Application = web.Application()
+        app.router.add_get("/search", throttled)
+        circuit_breaker: CircuitBreaker = CircuitBreaker(
+            CircuitBreakerConfig(min_calls=1)
+        )
+        async with TestServer(app) as server:
+            service: YahooSearchService = YahooSearchService(
+                yahoo_search_dao=AsyncMock(),
+                http_client_config=HttpClientConfig(
+                    base_url=str(server.make_url("/search"))
+                ),
+                circuit_breaker=circuit_breaker,
+            )
+            try:
+                assert await service._fetch("tea") is None
+            finally:
+                await service.close()
+        # a 429 is Yahoo refusing us, not answering
+        assert circuit_breaker.stats.failures == 1
+        assert circuit_breaker.state == "open"
+
+    @pytest.mark.asyncio_cooperative
+    async def test_deadline_exceeded_is_not_persisted(self) -> None:
+        dao: AsyncMock = AsyncMock()
+        service: YahooSearchService = YahooSearchService(yahoo_search_dao=dao)
+        fetched: asyncio.Event = asyncio.Event()
+
+        async def slow_fetch(search_term: str) -> str:
+            await asyncio.sleep(0.1)
+            fetched.set()
+            return "tea html"
+
+        with patch.object(service, "_fetch", side_effect=slow_fetch):
+            with with_deadline(0.02):
+                with pytest.raises(DeadlineExceeded) as raised:
+                    await service.yahoo_search("dummy_user_id", "tea")
+            # the shared fetch outlives the caller that gave up on it
+            await asyncio.wait_for(fetched.wait(), 5)
+        assert raised.value.stage == "upstream"
+        dao.insert_search.assert_not_awaited()
+
+    @pytest.mark.asyncio_cooperative
+    async def test_coalesced_callers_keep_their_own_deadlines(self) -> None:
+        service: YahooSearchService = YahooSearchService(yahoo_search_dao=AsyncMock())
+
+        async def slow_fetch(search_term: str) -> str:
+            # as _fetch does, within whatever deadline its task runs under
+            async with stage_timeout("upstream_fetch"):
+                await asyncio.sleep(0.05)
+            return "tea html"
+
+        async def search(user_id: str, seconds: float) -> SearchResults:
+            with with_deadline(seconds):
+                return await service._search(user_id, "tea")
+
+        with patch.object(service, "_fetch", side_effect=slow_fetch) as mock_fetch:
+            hurried, patient = await asyncio.gather(
+                search("user_a", 0.01), search("user_b", 10), return_exceptions=True
+            )
+            mock_fetch.assert_called_once()
+        # the first caller runs out waiting; the fetch it started goes on
+        assert isinstance(hurried, DeadlineExceeded)
+        assert hurried.stage == "upstream"
+        assert isinstance(patient, SearchResults)
+        assert patient.result == "tea html"
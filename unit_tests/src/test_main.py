@@ -0,0 +1,424 @@
+import asyncio
+import json
+import socket
+from collections.abc import AsyncIterator
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any
+from unittest.mock import AsyncMock, patch
+
+import pytest
+import toml
+from aiohttp import ClientSession, web
+from aiohttp.test_utils import TestClient, TestServer, make_mocked_request
+
+from src.main import DEADLINE_CONFIG, SEARCH_ENGINE, create_app, request_budget
+from src.models.search_analytics import (
+    SearchPeriodCount,
+    SearchTermCount,
+    UserSearchCount,
+)
+from src.models.search_results import SearchResults
+from src.utils import ndjson_stream
+from src.utils.circuit_breaker import CircuitBreaker
+from src.utils.db_engine import DatabasePoolStats
+from src.utils.deadline import DeadlineConfig
+
+fixture_html: str = Path("unit_tests/fixtures/yahoo_search_tea.html").read_text()
+
+
+@pytest.fixture
+async def dao() -> AsyncMock:
+    return AsyncMock()
+
+
+def create_test_app(dao: AsyncMock, **sections: dict[str, Any]) -> web.Application:
+    """
+    The server's app, with dao in place of the database
+    - Nothing runs in the background, nor in another process
+    """
+    config: dict[str, Any] = toml.load("local_config/config.toml")
+    config["cpu_executor"] = {"kind": "inline"}
+    config["analytics"] = {"enabled": False}
+    config["search_cache"] = {"enabled": False}
+    config["search_results_writer"] = {"enabled": False}
+    config.update(sections)
+    with patch("src.main.YahooSearchDAO", return_value=dao):
+        return create_app(config)
+
+
+@pytest.fixture
+async def client(dao: AsyncMock) -> AsyncIterator[TestClient]:
+    async with TestClient(TestServer(create_test_app(dao))) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+async def open_circuit_client(dao: AsyncMock) -> AsyncIterator[TestClient]:
+    """
+    As client, with the circuit to Yahoo open; searches never reach _fetch
+    """
+    app: web.Application = create_test_app(
+        dao, circuit_breaker={"min_calls": 1, "open_seconds": 30}
+    )
+    circuit_breaker: CircuitBreaker | None = app[SEARCH_ENGINE].circuit_breaker
+    assert circuit_breaker is not None
+    circuit_breaker.before_call()
+    circuit_breaker.record(False)
+    async with TestClient(TestServer(app)) as test_client:
+        yield test_client
+
+
+async def fetch_fixture(search_term: str) -> str:
+    return fixture_html
+
+
+def mocked_request(
+    headers: dict[str, str], deadline_config: DeadlineConfig = DeadlineConfig()
+) -> web.Request:
+    app: web.Application = web.Application()
+    app[DEADLINE_CONFIG] = deadline_config
+    return make_mocked_request("POST", "/search", headers=headers, app=app)
+
+
+class TestRequestBudget:
+    @staticmethod
+    @pytest.mark.parametrize(
+        ["headers", "expected"],
+        [
+            [{}, 10.0],
+            [{"X-Request-Timeout": "2.5"}, 2.5],
+            # capped at max_seconds
+            [{"X-Request-Timeout": "600"}, 60.0],
+        ],
+    )
+    def test_request_budget(headers: dict[str, str], expected: float) -> None:
+        assert request_budget(mocked_request(headers), 10.0) == expected
+
+    @staticmethod
+    def test_default_is_capped_too() -> None:
+        request: web.Request = mocked_request({}, DeadlineConfig(max_seconds=5))
+        assert request_budget(request, 10.0) == 5.0
+
+    @staticmethod
+    def test_disabled() -> None:
+        request: web.Request = mocked_request(
+            {"X-Request-Timeout": "2.5"}, DeadlineConfig(enabled=False)
+        )
+        assert request_budget(request, 10.0) is None
+
+    @staticmethod
+    @pytest.mark.parametrize("header", ["soon", "0", "-1", "inf", "nan"])
+    def test_bad_header(header: str) -> None:
+        with pytest.raises(ValueError):
+            request_budget(mocked_request({"X-Request-Timeout": header}), 10.0)
+
+
+class TestAnalyticsHandlers:
+    @pytest.mark.asyncio_cooperative
+    async def test_top_search_terms(self, client: TestClient, dao: AsyncMock) -> None:
+        dao.fetch_top_search_terms.return_value = [
+            SearchTermCount(search_term="tea", searches=3)
+        ]
+        response = await client.get(
+            "/analytics/top_search_terms",
+            params={
+                "start": "2024-04-08 00:00:00",
+                "end": "2024-04-09 00:00:00",
+                "limit": "1000",
+            },
+        )
+        assert response.status == 200
+        assert await response.json() == [{"search_term": "tea", "searches": 3}]
+        # limit is capped at max_limit
+        dao.fetch_top_search_terms.assert_awaited_once_with(
+            datetime(2024, 4, 8), datetime(2024, 4, 9), 100
+        )
+
+    @pytest.mark.asyncio_cooperative
+    async def test_top_users(self, client: TestClient, dao: AsyncMock) -> None:
+        dao.fetch_top_users.return_value = [
+            UserSearchCount(user_id="user_a", searches=2)
+        ]
+        response = await client.get("/analytics/top_users")
+        assert response.status == 200
+        assert await response.json() == [{"user_id": "user_a", "searches": 2}]
+        # the last default_window_hours, by default
+        start, end, limit = dao.fetch_top_users.await_args.args
+        assert (end - start, limit) == (timedelta(hours=24), 10)
+
+    @pytest.mark.asyncio_cooperative
+    async def test_busiest_periods(self, client: TestClient, dao: AsyncMock) -> None:
+        dao.fetch_busiest_periods.return_value = [
+            SearchPeriodCount(period_start=datetime(2024, 4, 8), searches=5)
+        ]
+        response = await client.get(
+            "/analytics/busiest_periods",
+            params={"period": "day", "end": "2024-04-09 00:00:00"},
+        )
+        assert response.status == 200
+        assert await response.json() == [
+            {"period_start": "2024-04-08 00:00:00", "searches": 5}
+        ]
+        assert dao.fetch_busiest_periods.await_args.args[2] == "day"
+
+    @pytest.mark.asyncio_cooperative
+    async def test_aware_bounds_are_converted_to_utc(
+        self, client: TestClient, dao: AsyncMock
+    ) -> None:
+        dao.fetch_top_search_terms.return_value = []
+        response = await client.get(
+            "/analytics/top_search_terms",
+            # one naive (UTC) bound, one aware
+            params={"start": "2024-04-08 00:00:00", "end": "2024-04-08T15:00:00+08:00"},
+        )
+        assert response.status == 200
+        dao.fetch_top_search_terms.assert_awaited_once_with(
+            datetime(2024, 4, 8), datetime(2024, 4, 8, 7), 10
+        )
+
+    @pytest.mark.asyncio_cooperative
+    @pytest.mark.parametrize(
+        "params",
+        [
+            {"start": "yesterday"},
+            {"start": "2024-04-09 00:00:00", "end": "2024-04-08 00:00:00"},
+            {"limit": "0"},
+            {"period": "fortnight"},
+        ],
+    )
+    async def test_bad_query(self, client: TestClient, params: dict[str, str]) -> None:
+        response = await client.get("/analytics/busiest_periods", params=params)
+        assert response.status == 400
+
+    @pytest.mark.asyncio_cooperative
+    async def test_database_error(self, client: TestClient, dao: AsyncMock) -> None:
+        dao.fetch_top_users.side_effect = OSError("connection refused")
+        response = await client.get("/analytics/top_users")
+        assert response.status == 500
+        assert "connection refused" in (await response.json())["error"]
+
+
+class TestSearchHandler:
+    @pytest.mark.asyncio_cooperative
+    async def test_search(self, client: TestClient, dao: AsyncMock) -> None:
+        with patch.object(client.app[SEARCH_ENGINE], "_fetch", fetch_fixture):
+            response = await client.post(
+                "/search", json={"query": "tea", "user_id": "user_a"}
+            )
+        assert response.status == 200
+        body: dict[str, Any] = await response.json()
+        assert (body["user_id"], body["result"]) == ("user_a", fixture_html)
+        assert "hits" not in body
+        dao.insert_search.assert_awaited_once()
+
+    @pytest.mark.asyncio_cooperative
+    async def test_search_parse(self, client: TestClient) -> None:
+        with patch.object(client.app[SEARCH_ENGINE], "_fetch", fetch_fixture):
+            response = await client.post(
+                "/search", json={"query": "tea", "user_id": "user_a", "parse": True}
+            )
+        hits: list[dict[str, Any]] = (await response.json())["hits"]
+        assert len(hits) == 10
+        assert hits[0]["title"] == "Tea - Wikipedia"
+
+    @pytest.mark.asyncio_cooperative
+    async def test_search_missing_query(self, client: TestClient) -> None:
+        response = await client.post("/search", json={"user_id": "user_a"})
+        assert response.status == 400
+
+    @pytest.mark.asyncio_cooperative
+    async def test_stream_gzip(self, client: TestClient) -> None:
+        with patch.object(client.app[SEARCH_ENGINE], "_fetch", fetch_fixture):
+            response = await client.post(
+                "/search",
+                json={"query": "tea", "user_id": "user_a", "stream": True},
+                headers={"Accept-Encoding": "gzip"},
+            )
+            assert response.status == 200
+            assert response.headers["Content-Type"] == "application/x-ndjson"
+            assert response.headers["Content-Encoding"] == "gzip"
+            # the client decodes gzip as it reads
+            lines: list[dict[str, Any]] = [
+                json.loads(line) for line in (await response.text()).splitlines()
+            ]
+        assert lines[0]["search_term"] == "tea"
+        assert lines[0]["result_length"] == len(fixture_html)
+        assert "".join(line["result"] for line in lines[1:]) == fixture_html
+
+    @pytest.mark.asyncio_cooperative
+    async def test_stream_parse(self, client: TestClient) -> None:
+        with patch.object(client.app[SEARCH_ENGINE], "_fetch", fetch_fixture):
+            response = await client.post(
+                "/search",
+                json={
+                    "query": "tea",
+                    "user_id": "user_a",
+                    "stream": True,
+                    "parse": True,
+                },
+                headers={"Accept-Encoding": "gzip, br"},
+            )
+            expected: str = "br" if ndjson_stream.brotli is not None else "gzip"
+            assert response.headers["Content-Encoding"] == expected
+            lines: list[dict[str, Any]] = [
+                json.loads(line) for line in (await response.text()).splitlines()
+            ]
+        assert [list(line) for line in lines[1:]] == [["hit"]] * 10
+        assert lines[1]["hit"]["url"] == "https://en.wikipedia.org/wiki/Tea"
+
+    @pytest.mark.asyncio_cooperative
+    async def test_stream_identity(self, client: TestClient) -> None:
+        with patch.object(client.app[SEARCH_ENGINE], "_fetch", fetch_fixture):
+            response = await client.post(
+                "/search",
+                json={"query": "tea", "user_id": "user_a", "stream": True},
+                headers={"Accept-Encoding": "identity"},
+            )
+            assert "Content-Encoding" not in response.headers
+            assert (await response.text()).count("\n") == 2
+
+
+class TestSearchBatchHandler:
+    @pytest.mark.asyncio_cooperative
+    async def test_search_batch(self, client: TestClient, dao: AsyncMock) -> None:
+        async def fetch(search_term: str) -> str:
+            if search_term == "coffee":
+                raise ValueError("not html")
+            return f"{search_term.strip().lower()} html"
+
+        with patch.object(client.app[SEARCH_ENGINE], "_fetch", fetch):
+            response = await client.post(
+                "/search/batch",
+                json={"user_id": "user_a", "queries": ["tea", "coffee", " Tea"]},
+            )
+            lines: list[dict[str, Any]] = [
+                json.loads(line) for line in (await response.text()).splitlines()
+            ]
+        assert response.headers["Content-Type"] == "application/x-ndjson"
+        by_index: dict[int, dict[str, Any]] = {
+            line["index"]: line for line in lines[:-1]
+        }
+        # " Tea" is searched once, with "tea"; each keeps its own query
+        assert sorted(by_index) == [0, 1, 2]
+        assert by_index[0]["result"] == by_index[2]["result"] == "tea html"
+        assert (by_index[0]["query"], by_index[2]["query"]) == ("tea", " Tea")
+        assert "not html" in by_index[1]["error"]
+        # the failed search is persisted too, with result=None
+        assert lines[-1] == {"persisted": 2}
+        persisted: list[SearchResults] = dao.insert_searches.await_args.args[0]
+        assert sorted(result.result or "" for result in persisted) == ["", "tea html"]
+
+    @pytest.mark.asyncio_cooperative
+    async def test_search_batch_bad_queries(self, client: TestClient) -> None:
+        response = await client.post(
+            "/search/batch", json={"user_id": "user_a", "queries": "tea"}
+        )
+        assert response.status == 400
+
+    @pytest.mark.asyncio_cooperative
+    async def test_disconnect_cancels_searches(
+        self, client: TestClient, dao: AsyncMock
+    ) -> None:
+        cancelled: asyncio.Event = asyncio.Event()
+
+        async def resolve(user_id: str, search_term: str) -> SearchResults:
+            # the batch's own search task; a coalesced _fetch would be shielded
+            if search_term == "milo":
+                try:
+                    await asyncio.sleep(10)
+                except asyncio.CancelledError:
+                    cancelled.set()
+                    raise
+            if search_term == "coffee":
+                await asyncio.sleep(0.05)
+            return SearchResults.create(user_id, search_term, f"{search_term} html")
+
+        with patch.object(client.app[SEARCH_ENGINE], "resolve", resolve):
+            response = await client.post(
+                "/search/batch",
+                json={"user_id": "user_a", "queries": ["tea", "coffee", "milo"]},
+            )
+            first: dict[str, Any] = json.loads(await response.content.readline())
+            assert first["query"] == "tea"
+            # the client goes away; the next write finds it gone
+            response.close()
+            await asyncio.wait_for(cancelled.wait(), 5)
+        dao.insert_searches.assert_not_awaited()
+
+
+class TestWorkerMetrics:
+    @pytest.mark.asyncio_cooperative
+    async def test_served_on_the_worker_port(self, dao: AsyncMock) -> None:
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port: int = sock.getsockname()[1]
+        dao.pool_stats = DatabasePoolStats(checkouts=7, checked_out=3, capacity=4)
+        app: web.Application = create_test_app(
+            dao,
+            metrics={
+                "enabled": True,
+                "worker_port_base": port,
+                "worker_host": "127.0.0.1",
+            },
+        )
+        # create_app with no worker_index, as python -m src.main runs it: the base port
+        async with TestClient(TestServer(app)):
+            async with ClientSession() as session:
+                async with session.get(f"http://127.0.0.1:{port}/metrics") as response:
+                    assert response.status == 200
+                    text: str = await response.text()
+        assert "db_pool_checkouts_total 7.0" in text.splitlines()
+        assert "db_pool_saturation 0.75" in text.splitlines()
+        # closed with the app
+        async with ClientSession() as session:
+            with pytest.raises(OSError):
+                await session.get(f"http://127.0.0.1:{port}/metrics")
+
+
+class TestHealthHandler:
+    @pytest.mark.asyncio_cooperative
+    async def test_health(self, client: TestClient) -> None:
+        response = await client.get("/health")
+        assert response.status == 200
+        body: dict[str, Any] = await response.json()
+        assert body["status"] == "ok"
+        assert body["upstream_circuit"]["state"] == "closed"
+
+    @pytest.mark.asyncio_cooperative
+    async def test_health_degraded(self, open_circuit_client: TestClient) -> None:
+        response = await open_circuit_client.get("/health")
+        # still 200; see health_handle
+        assert response.status == 200
+        body: dict[str, Any] = await response.json()
+        assert body["status"] == "degraded"
+        assert body["upstream_circuit"]["state"] == "open"
+        assert body["upstream_circuit"]["retry_after_seconds"] > 0
+
+
+class TestOpenCircuit:
+    @pytest.mark.asyncio_cooperative
+    async def test_search_served_stale(
+        self, open_circuit_client: TestClient, dao: AsyncMock
+    ) -> None:
+        stored: SearchResults = SearchResults.create("user_b", "tea", "old html")
+        dao.fetch_recent_search.return_value = stored
+        response = await open_circuit_client.post(
+            "/search", json={"query": "tea", "user_id": "user_a"}
+        )
+        assert response.status == 200
+        body: dict[str, Any] = await response.json()
+        assert (body["user_id"], body["result"]) == ("user_a", "old html")
+        dao.insert_search.assert_not_awaited()
+
+    @pytest.mark.asyncio_cooperative
+    async def test_search_fails_fast(
+        self, open_circuit_client: TestClient, dao: AsyncMock
+    ) -> None:
+        dao.fetch_recent_search.return_value = None
+        response = await open_circuit_client.post(
+            "/search", json={"query": "tea", "user_id": "user_a"}
+        )
+        assert response.status == 503
+        assert 1 <= int(response.headers["Retry-After"]) <= 30
+        dao.insert_search.assert_not_awaited()
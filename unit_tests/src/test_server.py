@@ -0,0 +1,207 @@
+import multiprocessing
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from collections.abc import Callable, Iterator
+from pathlib import Path
+from typing import Any
+
+import pytest
+import toml
+from aiohttp import web
+
+from src.server import PreforkServer, ServerConfig
+
+
+def create_pid_app(index: int) -> web.Application:
+    async def pid_handle(request: web.Request) -> web.Response:
+        return web.Response(text=str(os.getpid()))
+
+    async def index_handle(request: web.Request) -> web.Response:
+        return web.Response(text=str(index))
+
+    app: web.Application = web.Application()
+    app.add_routes([web.get("/pid", pid_handle), web.get("/index", index_handle)])
+    return app
+
+
+def fetch_pid(port: int) -> int | None:
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/pid", timeout=1) as r:
+            return int(r.read())
+    except OSError:
+        return None
+
+
+def fetch_indexes(port: int, requests: int = 50) -> set[str]:
+    """
+    Any worker may accept a request; many requests reach both
+    """
+    indexes: set[str] = set()
+    for _ in range(requests):
+        try:
+            with urllib.request.urlopen(
+                f"http://127.0.0.1:{port}/index", timeout=1
+            ) as r:
+                indexes.add(r.read().decode())
+        except OSError:
+            pass
+    return indexes
+
+
+def free_ports(count: int) -> int:
+    """
+    :return: the first of count consecutive ports, free right now
+    """
+    while True:
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            first: int = sock.getsockname()[1]
+        try:
+            for port in range(first, first + count):
+                with socket.socket() as sock:
+                    sock.bind(("127.0.0.1", port))
+        except OSError:
+            continue
+        return first
+
+
+def is_served(url: str) -> bool:
+    try:
+        with urllib.request.urlopen(url, timeout=1) as r:
+            return bool(r.status == 200)
+    except OSError:
+        return False
+
+
+def poll(condition: Callable[[], bool], seconds: float = 10.0) -> bool:
+    deadline: float = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+@pytest.fixture
+def server() -> Iterator[tuple[multiprocessing.process.BaseProcess, int]]:
+    """
+    The master runs in its own (forked) process; it blocks signals and forks workers
+    """
+    prefork_server: PreforkServer = PreforkServer(
+        ServerConfig(host="127.0.0.1", port=0, workers=2, shutdown_timeout_seconds=1),
+        create_pid_app,
+    )
+    port: int = prefork_server.bind()
+    master: multiprocessing.process.BaseProcess = multiprocessing.get_context(
+        "fork"
+    ).Process(target=prefork_server.run)
+    master.start()
+    yield master, port
+    if master.is_alive():
+        os.kill(master.pid, signal.SIGTERM)  # type: ignore[arg-type]
+    master.join()
+
+
+class TestPreforkServer:
+    @staticmethod
+    def test_worker_count_defaults_to_cpus() -> None:
+        assert ServerConfig().worker_count == (os.cpu_count() or 1)
+        assert ServerConfig(workers=3).worker_count == 3
+
+    @staticmethod
+    def test_workers_serve_requests(
+        server: tuple[multiprocessing.process.BaseProcess, int],
+    ) -> None:
+        master, port = server
+        assert poll(lambda: fetch_pid(port) is not None)
+        pid: int | None = fetch_pid(port)
+        assert pid is not None
+        assert pid not in (os.getpid(), master.pid)
+
+    @staticmethod
+    def test_reload_replaces_workers(
+        server: tuple[multiprocessing.process.BaseProcess, int],
+    ) -> None:
+        master, port = server
+        assert poll(lambda: fetch_pid(port) is not None)
+        old_pid: int | None = fetch_pid(port)
+        os.kill(master.pid, signal.SIGHUP)  # type: ignore[arg-type]
+        # the old workers finish, and stop answering
+        assert poll(
+            lambda: all(fetch_pid(port) not in (None, old_pid) for _ in range(10))
+        )
+        assert master.is_alive()
+
+    @staticmethod
+    def test_workers_keep_their_indexes(
+        server: tuple[multiprocessing.process.BaseProcess, int],
+    ) -> None:
+        master, port = server
+        assert poll(lambda: fetch_indexes(port) == {"0", "1"})
+        old_pid: int | None = fetch_pid(port)
+        os.kill(master.pid, signal.SIGHUP)  # type: ignore[arg-type]
+        assert poll(
+            lambda: all(fetch_pid(port) not in (None, old_pid) for _ in range(10))
+        )
+        assert poll(lambda: fetch_indexes(port) == {"0", "1"})
+
+    @staticmethod
+    def test_workers_exit_with_their_master(
+        server: tuple[multiprocessing.process.BaseProcess, int],
+    ) -> None:
+        master, port = server
+        assert poll(lambda: fetch_pid(port) is not None)
+        os.kill(master.pid, signal.SIGKILL)  # type: ignore[arg-type]
+        master.join()
+        # the socket is still open in the workers, until they notice
+        assert poll(lambda: fetch_pid(port) is None)
+
+    @staticmethod
+    def test_shutdown_stops_workers(
+        server: tuple[multiprocessing.process.BaseProcess, int],
+    ) -> None:
+        master, port = server
+        assert poll(lambda: fetch_pid(port) is not None)
+        os.kill(master.pid, signal.SIGTERM)  # type: ignore[arg-type]
+        master.join(timeout=10)
+        assert master.exitcode == 0
+        assert fetch_pid(port) is None
+
+    @staticmethod
+    def test_workers_serve_metrics_on_ports_of_their_own(tmp_path: Path) -> None:
+        """
+        The production entry point, python -m src.server, with the app of src.main
+        - Searches are never made; nothing connects to the database
+        """
+        server_port, metrics_port = free_ports(1), free_ports(3)
+        config: dict[str, Any] = toml.load("local_config/config.toml")
+        config["server"] = {"host": "127.0.0.1", "shutdown_timeout_seconds": 1}
+        config["metrics"] = {
+            "enabled": True,
+            "worker_port_base": metrics_port,
+            "worker_host": "127.0.0.1",
+        }
+        config["logging"] = {"level": "WARNING"}
+        config["cpu_executor"] = {"kind": "inline"}
+        config["analytics"] = {"enabled": False}
+        config["search_results_writer"] = {"enabled": False}
+        config_path: Path = tmp_path / "config.toml"
+        config_path.write_text(toml.dumps(config))
+        master: subprocess.Popen[bytes] = subprocess.Popen(
+            [sys.executable, "-m", "src.server", "--config", str(config_path)]
+            + ["--port", str(server_port), "--workers", "2"]
+        )
+        try:
+            assert poll(lambda: is_served(f"http://127.0.0.1:{server_port}/health"))
+            # one port per worker, 0 and 1; not both on the first
+            for port in (metrics_port, metrics_port + 1):
+                assert poll(lambda: is_served(f"http://127.0.0.1:{port}/metrics"))
+            assert not is_served(f"http://127.0.0.1:{metrics_port + 2}/metrics")
+        finally:
+            master.send_signal(signal.SIGTERM)
+            assert master.wait(timeout=30) == 0
@@ -0,0 +1,105 @@
+import asyncio
+
+import aiohttp
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from src.utils.async_retry import async_retry, is_retriable, retry_stats
+from src.utils.deadline import DeadlineExceeded, StageTimeout, with_deadline
+
+
+class TestAsyncRetry:
+    @staticmethod
+    @pytest.mark.parametrize(
+        ["exception", "expected"],
+        [
+            [aiohttp.ClientConnectionError("connection reset"), True],
+            [asyncio.TimeoutError(), True],
+            [OperationalError("SELECT 1", {}, Exception("connection lost")), True],
+            [ValueError("bad input"), False],
+            [StageTimeout("upstream_fetch", 15.0), True],
+            [DeadlineExceeded("upstream_fetch"), False],
+        ],
+    )
+    def test_is_retriable(exception: BaseException, expected: bool) -> None:
+        assert is_retriable(exception) == expected
+
+    @pytest.mark.asyncio_cooperative
+    async def test_retries_exception_raised_on_await(self) -> None:
+        attempts: list[int] = []
+
+        @async_retry(name="test_retries_exception_raised_on_await", jitter=(0, 0))
+        async def flaky() -> str:
+            attempts.append(1)
+            await asyncio.sleep(0)
+            if len(attempts) < 3:
+                raise aiohttp.ClientConnectionError("connection reset")
+            return "tea html"
+
+        assert await flaky() == "tea html"
+        assert len(attempts) == 3
+        stats = retry_stats["test_retries_exception_raised_on_await"]
+        assert stats.calls == 1
+        assert stats.attempts == 3
+        assert stats.failed_attempts == 2
+        assert stats.exhausted == 0
+
+    @pytest.mark.asyncio_cooperative
+    async def test_gives_up_after_tries(self) -> None:
+        @async_retry(name="test_gives_up_after_tries", tries=3, jitter=(0, 0))
+        async def always_fails() -> str:
+            raise aiohttp.ClientConnectionError("connection reset")
+
+        with pytest.raises(aiohttp.ClientConnectionError):
+            await always_fails()
+        stats = retry_stats["test_gives_up_after_tries"]
+        assert stats.attempts == 3
+        assert stats.exhausted == 1
+
+    @pytest.mark.asyncio_cooperative
+    async def test_does_not_retry_other_exceptions(self) -> None:
+        @async_retry(name="test_does_not_retry_other_exceptions")
+        async def bad_input() -> str:
+            raise ValueError("bad input")
+
+        with pytest.raises(ValueError):
+            await bad_input()
+        assert retry_stats["test_does_not_retry_other_exceptions"].attempts == 1
+
+    @pytest.mark.asyncio_cooperative
+    async def test_gives_up_after_max_elapsed(self) -> None:
+        @async_retry(
+            name="test_gives_up_after_max_elapsed",
+            tries=100,
+            delay=0.05,
+            backoff=1,
+            jitter=(0, 0),
+            max_elapsed=0.12,
+        )
+        async def always_fails() -> str:
+            raise asyncio.TimeoutError()
+
+        with pytest.raises(asyncio.TimeoutError):
+            await always_fails()
+        # 0s, 0.05s, 0.10s; the 4th attempt would start after max_elapsed
+        assert retry_stats["test_gives_up_after_max_elapsed"].attempts <= 3
+
+    @pytest.mark.asyncio_cooperative
+    async def test_gives_up_at_the_deadline(self) -> None:
+        @async_retry(
+            name="test_gives_up_at_the_deadline",
+            tries=100,
+            delay=0.05,
+            backoff=1,
+            jitter=(0, 0),
+            max_elapsed=None,
+        )
+        async def always_fails() -> str:
+            raise aiohttp.ClientConnectionError("connection reset")
+
+        with with_deadline(0.12):
+            with pytest.raises(aiohttp.ClientConnectionError):
+                await always_fails()
+        stats = retry_stats["test_gives_up_at_the_deadline"]
+        assert stats.attempts <= 3
+        assert stats.exhausted == 1
@@ -0,0 +1,78 @@
+import time
+
+import pytest
+
+from src.utils.circuit_breaker import (
+    CircuitBreaker,
+    CircuitBreakerConfig,
+    CircuitOpenError,
+)
+
+
+def open_breaker(open_seconds: float = 60) -> CircuitBreaker:
+    breaker: CircuitBreaker = CircuitBreaker(
+        CircuitBreakerConfig(
+            min_calls=4, failure_rate=0.5, open_seconds=open_seconds, half_open_calls=2
+        )
+    )
+    for succeeded in (True, True, False, False):
+        breaker.before_call()
+        breaker.record(succeeded)
+    return breaker
+
+
+class TestCircuitBreaker:
+    @staticmethod
+    def test_stays_closed_below_min_calls() -> None:
+        breaker: CircuitBreaker = CircuitBreaker(CircuitBreakerConfig(min_calls=4))
+        for _ in range(3):
+            breaker.before_call()
+            breaker.record(False)
+        assert breaker.state == "closed"
+        assert breaker.failure_rate() == (3, 1.0)
+
+    @staticmethod
+    def test_opens_at_failure_rate_and_fails_fast() -> None:
+        breaker: CircuitBreaker = open_breaker()
+        assert breaker.state == "open"
+        assert breaker.retry_after_seconds > 59
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+        assert breaker.stats.rejected == 1
+        assert breaker.stats.opened == 1
+
+    @staticmethod
+    def test_half_open_probes_close_it() -> None:
+        breaker: CircuitBreaker = open_breaker(open_seconds=0.01)
+        time.sleep(0.02)
+        assert breaker.state == "half_open"
+        breaker.before_call()
+        breaker.before_call()
+        # only half_open_calls probes at a time
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+        breaker.record(True)
+        breaker.record(True)
+        assert breaker.state == "closed"
+        # the window starts afresh
+        assert breaker.failure_rate() == (0, 0.0)
+
+    @staticmethod
+    def test_failed_probe_reopens_it() -> None:
+        breaker: CircuitBreaker = open_breaker(open_seconds=0.01)
+        time.sleep(0.02)
+        breaker.before_call()
+        breaker.record(False)
+        assert breaker.stats.opened == 2
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+
+    @staticmethod
+    def test_abandoned_probe_is_given_back() -> None:
+        breaker: CircuitBreaker = open_breaker(open_seconds=0.01)
+        time.sleep(0.02)
+        breaker.before_call()
+        breaker.before_call()
+        breaker.record(None)
+        breaker.before_call()
+        assert breaker.state == "half_open"
@@ -0,0 +1,31 @@
+import pytest
+
+from src.utils.compression import compress_result, decompress_result
+
+
+class TestCompression:
+    @staticmethod
+    @pytest.mark.parametrize(
+        ["result", "level"],
+        [
+            ["<html><body>tea</body></html>" * 100, 1],
+            ["<html><body>茶 · thé</body></html>", 6],
+            ["", 9],
+        ],
+    )
+    def test_round_trip(result: str, level: int) -> None:
+        compressed: bytes | None = compress_result(result, level)
+        assert compressed is not None
+        assert decompress_result(compressed) == result
+
+    @staticmethod
+    def test_compresses_html() -> None:
+        result: str = '<div class="dd algo"><a href="#">tea</a></div>' * 100
+        compressed: bytes | None = compress_result(result)
+        assert compressed is not None
+        assert len(compressed) < len(result) / 10
+
+    @staticmethod
+    def test_none() -> None:
+        assert compress_result(None) is None
+        assert decompress_result(None) is None
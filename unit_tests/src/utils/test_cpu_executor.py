@@ -0,0 +1,35 @@
+from pathlib import Path
+
+import pytest
+
+from src.models.search_hit import SearchHit
+from src.services.yahoo_search_parser import parse_search_hits
+from src.utils.cpu_executor import CpuExecutor, CpuExecutorConfig
+
+fixture_html: bytes = Path("unit_tests/fixtures/yahoo_search_tea.html").read_bytes()
+
+
+class TestCpuExecutor:
+    @pytest.mark.asyncio_cooperative
+    @pytest.mark.parametrize(["kind"], [["process"], ["thread"], ["inline"]])
+    async def test_run(self, kind: str) -> None:
+        executor: CpuExecutor = CpuExecutor(
+            CpuExecutorConfig(kind=kind, max_workers=1)  # type: ignore[arg-type]
+        )
+        executor.start()
+        try:
+            hits: list[SearchHit] = await executor.run(parse_search_hits, fixture_html)
+        finally:
+            await executor.close()
+        assert executor.kind == "inline"
+        assert len(hits) == 10
+        assert hits[0].url == "https://en.wikipedia.org/wiki/Tea"
+
+    @staticmethod
+    def test_kind_after_start() -> None:
+        executor: CpuExecutor = CpuExecutor(
+            CpuExecutorConfig(kind="thread", max_workers=1)
+        )
+        assert executor.kind == "inline"
+        executor.start()
+        assert executor.kind == "thread"
@@ -0,0 +1,65 @@
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import PoolProxiedConnection
+from sqlalchemy.util import greenlet_spawn
+
+from src.utils.db_engine import (
+    DB_POOL_CHECKOUT_SECONDS,
+    DatabasePoolStats,
+    TimedQueuePool,
+    create_engine,
+)
+
+
+class TestDbEngine:
+    @staticmethod
+    def test_create_engine_applies_pool_config() -> None:
+        engine: AsyncEngine = create_engine(
+            {
+                "host": "localhost",
+                "port": 5432,
+                "database": "yahoo_search_engine",
+                "pool": {"pool_size": 3, "max_overflow": 2, "pool_timeout": 5},
+            }
+        )
+        pool: TimedQueuePool = engine.pool  # type: ignore[assignment]
+        assert isinstance(pool, TimedQueuePool)
+        assert pool.size() == 3
+        assert pool.timeout() == 5
+        assert pool._recycle == 1800
+        assert pool._pre_ping
+        stats: DatabasePoolStats = pool.snapshot()
+        assert (stats.capacity, stats.checked_out, stats.saturation) == (5, 0, 0.0)
+
+    @pytest.mark.asyncio_cooperative
+    async def test_times_checkouts(self) -> None:
+        # connections are MagicMocks; the pool never reaches a database
+        pool: TimedQueuePool = TimedQueuePool(
+            MagicMock, pool_size=1, max_overflow=0, timeout=0.2
+        )
+        observed: int = sum(DB_POOL_CHECKOUT_SECONDS.labels().counts)
+        first: PoolProxiedConnection = await greenlet_spawn(pool.connect)
+        assert pool.snapshot().saturation == 1.0
+
+        async def release_later() -> None:
+            await asyncio.sleep(0.05)
+            await greenlet_spawn(first.close)
+
+        # the second checkout waits for the first connection to be returned
+        _, second = await asyncio.gather(release_later(), greenlet_spawn(pool.connect))
+        stats: DatabasePoolStats = pool.snapshot()
+        assert stats.checkouts == 2
+        assert stats.max_checkout_wait_seconds >= 0.04
+        assert stats.mean_checkout_wait_ms >= 20
+        # and each one is observed in the histogram /metrics serves
+        assert sum(DB_POOL_CHECKOUT_SECONDS.labels().counts) == observed + 2
+
+        # nothing returns it this time; the third checkout times out
+        with pytest.raises(exc.TimeoutError):
+            await greenlet_spawn(pool.connect)
+        assert pool.snapshot().timeouts == 1
+        await greenlet_spawn(second.close)
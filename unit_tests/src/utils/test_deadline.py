@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from src.utils.deadline import (
+    STAGE_TIMEOUTS,
+    DeadlineExceeded,
+    StageTimeout,
+    clear_deadline,
+    remaining,
+    stage_timeout,
+    with_deadline,
+)
+
+
+class TestDeadline:
+    @staticmethod
+    def test_earlier_deadline_wins() -> None:
+        assert remaining() is None
+        with with_deadline(10):
+            with with_deadline(60):
+                left: float | None = remaining()
+                assert left is not None and left <= 10
+            with with_deadline(1):
+                left = remaining()
+                assert left is not None and left <= 1
+        assert remaining() is None
+
+    @pytest.mark.asyncio_cooperative
+    async def test_budget_runs_out(self) -> None:
+        before: float = STAGE_TIMEOUTS.labels("test_budget", "deadline").value
+        with with_deadline(0.02):
+            with pytest.raises(DeadlineExceeded) as raised:
+                async with stage_timeout("test_budget", cap=5):
+                    await asyncio.sleep(1)
+            assert raised.value.stage == "test_budget"
+            # nothing left; the next stage fails at once
+            with pytest.raises(DeadlineExceeded):
+                async with stage_timeout("test_budget"):
+                    pytest.fail("the stage must not start")
+        assert STAGE_TIMEOUTS.labels("test_budget", "deadline").value == before + 2
+
+    @pytest.mark.asyncio_cooperative
+    async def test_stage_cap_runs_out_first(self) -> None:
+        with with_deadline(5):
+            with pytest.raises(StageTimeout) as raised:
+                async with stage_timeout("test_cap", cap=0.02):
+                    await asyncio.sleep(1)
+        assert raised.value.stage == "test_cap"
+        assert isinstance(raised.value, asyncio.TimeoutError)
+        assert STAGE_TIMEOUTS.labels("test_cap", "stage").value >= 1
+
+    @pytest.mark.asyncio_cooperative
+    async def test_other_timeouts_pass_through(self) -> None:
+        with with_deadline(5):
+            with pytest.raises(TimeoutError) as raised:
+                async with stage_timeout("test_other"):
+                    raise TimeoutError("aiohttp read timeout")
+        assert not isinstance(raised.value, (StageTimeout, DeadlineExceeded))
+
+    @pytest.mark.asyncio_cooperative
+    async def test_tasks_inherit_the_deadline(self) -> None:
+        async def left() -> float | None:
+            return remaining()
+
+        with with_deadline(5):
+            inherited: float | None = await asyncio.create_task(left())
+        assert inherited is not None and 0 < inherited <= 5
+
+    @pytest.mark.asyncio_cooperative
+    async def test_clear_deadline_in_a_task(self) -> None:
+        async def left() -> float | None:
+            clear_deadline()
+            return remaining()
+
+        with with_deadline(5):
+            assert await asyncio.create_task(left()) is None
+            # the caller's own context keeps its deadline
+            assert remaining() is not None
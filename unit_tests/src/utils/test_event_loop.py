@@ -0,0 +1,64 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.utils import event_loop
+from src.utils.event_loop import EventLoopConfig, new_event_loop, run_event_loop
+
+
+class TestEventLoop:
+    @staticmethod
+    def test_asyncio_kind_never_uses_uvloop() -> None:
+        loop: asyncio.AbstractEventLoop = new_event_loop(
+            EventLoopConfig(kind="asyncio")
+        )
+        try:
+            assert type(loop).__module__.startswith("asyncio")
+        finally:
+            loop.close()
+
+    @staticmethod
+    def test_auto_falls_back_without_uvloop(monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setattr(event_loop, "uvloop", None)
+        assert not EventLoopConfig(kind="auto").uses_uvloop
+        loop: asyncio.AbstractEventLoop = new_event_loop(EventLoopConfig())
+        try:
+            assert type(loop).__module__.startswith("asyncio")
+        finally:
+            loop.close()
+
+    @staticmethod
+    def test_uvloop_kind_requires_uvloop(monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setattr(event_loop, "uvloop", None)
+        with pytest.raises(RuntimeError):
+            new_event_loop(EventLoopConfig(kind="uvloop"))
+
+    @staticmethod
+    def test_tunes_the_loop() -> None:
+        loop: asyncio.AbstractEventLoop = new_event_loop(
+            EventLoopConfig(
+                kind="asyncio",
+                default_executor_workers=2,
+                debug=True,
+                slow_callback_ms=20,
+            )
+        )
+        try:
+            assert loop.get_debug()
+            assert loop.slow_callback_duration == 0.02
+            executor: ThreadPoolExecutor = loop._default_executor  # type: ignore[attr-defined]
+            assert executor._max_workers == 2
+        finally:
+            loop.close()
+
+    @staticmethod
+    def test_run_event_loop_returns_and_closes() -> None:
+        loops: list[asyncio.AbstractEventLoop] = []
+
+        async def main() -> int:
+            loops.append(asyncio.get_running_loop())
+            return 42
+
+        assert run_event_loop(main(), EventLoopConfig(kind="asyncio")) == 42
+        assert loops[0].is_closed()
@@ -0,0 +1,35 @@
+import json
+from datetime import datetime
+
+from aiohttp import web
+
+from src.models.search_results import SearchResults
+from src.models.user import User
+from src.utils.json_response import json_response
+
+
+class TestJsonResponse:
+    @staticmethod
+    def test_formats_created_at() -> None:
+        user: User = User(
+            user_id="dummy_user_id", created_at=datetime(2024, 4, 8, 15, 37, 31, 123)
+        )
+        response: web.Response = json_response(user)
+        assert response.content_type == "application/json"
+        assert response.body == (
+            b'{"user_id":"dummy_user_id","created_at":"2024-04-08 15:37:31"}'
+        )
+        # model_dump() still gives back the datetime itself
+        assert user.model_dump()["created_at"] == datetime(2024, 4, 8, 15, 37, 31, 123)
+
+    @staticmethod
+    def test_same_json_as_json_response() -> None:
+        result: SearchResults = SearchResults.create(
+            "dummy_user_id", "tea", '<div class="algo">Teh tarik é \\ "</div>'
+        )
+        expected: dict = result.model_dump()
+        expected["created_at"] = expected["created_at"].strftime("%Y-%m-%d %H:%M:%S")
+        response: web.Response = json_response([result], status=201)
+        assert response.status == 201
+        assert isinstance(response.body, bytes)
+        assert json.loads(response.body) == [expected]
@@ -0,0 +1,109 @@
+import json
+import logging
+import queue
+import threading
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+from src.utils import logging_utils
+from src.utils.logging_utils import (
+    LoggingConfig,
+    configure_logging,
+    setup_logging,
+    stop_logging,
+)
+
+
+class ThreadRecordingArg:
+    """
+    Remembers the thread its message was built on
+    """
+
+    def __init__(self) -> None:
+        self.thread: threading.Thread | None = None
+
+    def __str__(self) -> str:
+        self.thread = threading.current_thread()
+        return "tea"
+
+
+@pytest.fixture
+def log_file(tmp_path: Path) -> Iterator[Path]:
+    path: Path = tmp_path / "test.logs"
+    configure_logging(LoggingConfig(log_to_file=True, file_path=str(path)))
+    yield path
+    configure_logging(LoggingConfig())
+
+
+class TestLoggingUtils:
+    @staticmethod
+    def test_setup_logging_is_idempotent() -> None:
+        logger: logging.Logger = logging.getLogger("test_setup_logging_is_idempotent")
+        setup_logging(logger)
+        setup_logging(logger)
+        assert len(logger.handlers) == 1
+        assert not logger.propagate
+
+    @staticmethod
+    def test_formats_on_the_listener_thread(log_file: Path) -> None:
+        logger: logging.Logger = logging.getLogger("test_formats_on_listener")
+        setup_logging(logger)
+        arg: ThreadRecordingArg = ThreadRecordingArg()
+        logger.info("Searched %s", arg)
+        stop_logging()
+        assert "test_formats_on_listener - INFO - Searched tea" in log_file.read_text()
+        assert arg.thread is not None
+        assert arg.thread is not threading.current_thread()
+
+    @staticmethod
+    def test_setup_logging_to_a_file(tmp_path: Path, log_file: Path) -> None:
+        path: Path = tmp_path / "tea.logs"
+        logger: logging.Logger = logging.getLogger("test_setup_logging_to_a_file")
+        other: logging.Logger = logging.getLogger("test_setup_logging_elsewhere")
+        try:
+            setup_logging(logger, log_to_file=True, file_path=str(path))
+            setup_logging(other)
+            arg: ThreadRecordingArg = ThreadRecordingArg()
+            logger.info("Searched %s", arg)
+            other.info("Searched coffee")
+            stop_logging()
+        finally:
+            del logging_utils._file_paths[logger.name]
+        assert "test_setup_logging_to_a_file - INFO - Searched tea" in path.read_text()
+        assert "coffee" not in path.read_text()
+        # the other logger still follows the [logging] config
+        assert "Searched coffee" in log_file.read_text()
+        assert "Searched tea" not in log_file.read_text()
+        assert arg.thread is not threading.current_thread()
+
+    @staticmethod
+    def test_json_format(tmp_path: Path) -> None:
+        path: Path = tmp_path / "test.logs"
+        configure_logging(
+            LoggingConfig(format="json", log_to_file=True, file_path=str(path))
+        )
+        try:
+            logger: logging.Logger = logging.getLogger("test_json_format")
+            setup_logging(logger)
+            logger.error("Cache lookup for %s failed", "tea", extra={"user_id": "u1"})
+            stop_logging()
+        finally:
+            configure_logging(LoggingConfig())
+        entry: dict[str, str] = json.loads(path.read_text().splitlines()[-1])
+        assert entry["name"] == "test_json_format"
+        assert entry["level"] == "ERROR"
+        assert entry["message"] == "Cache lookup for tea failed"
+        assert entry["user_id"] == "u1"
+        assert "time" in entry
+
+    @staticmethod
+    def test_full_queue_drops_records() -> None:
+        handler: logging_utils._LazyQueueHandler = logging_utils._LazyQueueHandler(
+            queue.Queue(1)
+        )
+        dropped: int = logging_utils.logging_stats.dropped
+        for _ in range(3):
+            handler.handle(logging.makeLogRecord({"msg": "tea"}))
+        assert logging_utils.logging_stats.dropped == dropped + 2
@@ -0,0 +1,81 @@
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+import pytest
+
+from src.services.search_cache import SearchCacheStats
+from src.utils.metrics import (
+    HTTP_REQUEST_SECONDS,
+    HTTP_REQUESTS,
+    HTTP_REQUESTS_IN_FLIGHT,
+    Histogram,
+    MetricsRegistry,
+    metrics_middleware,
+    render_metrics,
+    stats_metrics,
+)
+
+
+class TestMetrics:
+    @staticmethod
+    def test_histogram_buckets_are_cumulative() -> None:
+        registry: MetricsRegistry = MetricsRegistry()
+        histogram: Histogram = registry.histogram(
+            "stage_seconds", "Stage time", ("stage",), buckets=(0.1, 1.0)
+        )
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.labels("fetch").observe(value)
+        assert render_metrics(registry.collect()).splitlines() == [
+            "# HELP stage_seconds Stage time",
+            "# TYPE stage_seconds histogram",
+            'stage_seconds_bucket{stage="fetch",le="0.1"} 2',
+            'stage_seconds_bucket{stage="fetch",le="1.0"} 3',
+            'stage_seconds_bucket{stage="fetch",le="+Inf"} 4',
+            'stage_seconds_sum{stage="fetch"} 3.65',
+            'stage_seconds_count{stage="fetch"} 4',
+        ]
+
+    @staticmethod
+    def test_registering_twice_returns_the_first_metric() -> None:
+        registry: MetricsRegistry = MetricsRegistry()
+        first = registry.counter("searches_total", "Searches")
+        assert registry.counter("searches_total", "Searches") is first
+        with pytest.raises(ValueError):
+            first.labels("unexpected")
+
+    @staticmethod
+    def test_stats_metrics() -> None:
+        stats: SearchCacheStats = SearchCacheStats(memory_hits=3, misses=1)
+        text: str = render_metrics(
+            stats_metrics(
+                "search_cache",
+                stats,
+                counters=("memory_hits", "misses"),
+                labels=(("worker", '0"1'),),
+            )
+        )
+        assert "# TYPE search_cache_memory_hits_total counter" in text
+        assert 'search_cache_memory_hits_total{worker="0\\"1"} 3.0' in text
+        assert "# TYPE search_cache_evictions gauge" in text
+
+    @pytest.mark.asyncio_cooperative
+    async def test_middleware_times_requests_by_route(self) -> None:
+        async def tea_handle(request: web.Request) -> web.Response:
+            assert HTTP_REQUESTS_IN_FLIGHT.labels("/tea/{kind}").value == 1
+            return web.Response(text=request.match_info["kind"])
+
+        app: web.Application = web.Application(middlewares=[metrics_middleware])
+        app.router.add_get("/tea/{kind}", tea_handle)
+        ok_before: float = HTTP_REQUESTS.labels("GET", "/tea/{kind}", "200").value
+        not_found_before: float = HTTP_REQUESTS.labels("GET", "unmatched", "404").value
+        async with TestClient(TestServer(app)) as client:
+            for kind in ("green", "oolong"):
+                assert (await client.get(f"/tea/{kind}")).status == 200
+            assert (await client.get("/coffee")).status == 404
+        # both paths count under the one route pattern
+        assert HTTP_REQUESTS.labels("GET", "/tea/{kind}", "200").value == ok_before + 2
+        assert (
+            HTTP_REQUESTS.labels("GET", "unmatched", "404").value
+            == not_found_before + 1
+        )
+        assert HTTP_REQUESTS_IN_FLIGHT.labels("/tea/{kind}").value == 0
+        assert sum(HTTP_REQUEST_SECONDS.labels("GET", "/tea/{kind}").counts) >= 2
@@ -0,0 +1,41 @@
+import json
+import zlib
+
+import pytest
+
+from src.utils import ndjson_stream
+from src.utils.ndjson_stream import NdjsonStreamConfig, _Compressor, negotiate_encoding
+
+
+class TestNdjsonStream:
+    @staticmethod
+    @pytest.mark.parametrize(
+        ["accept_encoding", "expected"],
+        [
+            ["", None],
+            ["identity", None],
+            ["gzip, deflate", "gzip"],
+            ["GZIP;q=0.5", "gzip"],
+            ["gzip;q=0", None],
+            ["deflate, gzip;q=0, br;q=0", None],
+        ],
+    )
+    def test_negotiate_encoding(accept_encoding: str, expected: str | None) -> None:
+        assert negotiate_encoding(accept_encoding) == expected
+
+    @staticmethod
+    def test_negotiate_brotli_only_when_installed() -> None:
+        expected: str = "br" if ndjson_stream.brotli is not None else "gzip"
+        assert negotiate_encoding("gzip, deflate, br") == expected
+
+    @staticmethod
+    def test_gzip_lines_decode_as_they_arrive() -> None:
+        compressor: _Compressor = _Compressor("gzip", NdjsonStreamConfig())
+        decompressor = zlib.decompressobj(31)
+        lines: list[dict[str, str]] = [{"result": "tea " * 1000}, {"result": "leaf"}]
+        for line in lines:
+            data: bytes = (json.dumps(line) + "\n").encode("utf-8")
+            # every write is flushed; no need to wait for the end of the stream
+            assert decompressor.decompress(compressor.compress(data)) == data
+        assert decompressor.decompress(compressor.finish()) == b""
+        assert decompressor.eof
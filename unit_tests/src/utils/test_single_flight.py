@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+from src.utils.single_flight import SingleFlight
+
+
+class TestSingleFlight:
+    @pytest.mark.asyncio_cooperative
+    async def test_concurrent_calls_are_coalesced(self) -> None:
+        single_flight: SingleFlight[str] = SingleFlight()
+        calls: list[str] = []
+
+        async def fetch() -> str:
+            calls.append("fetch")
+            await asyncio.sleep(0.01)
+            return "tea html"
+
+        results: list[str] = await asyncio.gather(
+            *(single_flight.do("tea", fetch) for _ in range(5))
+        )
+        assert results == ["tea html"] * 5
+        assert calls == ["fetch"]
+        assert single_flight.stats.originated == 1
+        assert single_flight.stats.coalesced == 4
+        assert len(single_flight) == 0
+
+    @pytest.mark.asyncio_cooperative
+    async def test_sequential_calls_are_not_coalesced(self) -> None:
+        single_flight: SingleFlight[str] = SingleFlight()
+
+        async def fetch() -> str:
+            return "tea html"
+
+        await single_flight.do("tea", fetch)
+        await single_flight.do("tea", fetch)
+        assert single_flight.stats.originated == 2
+        assert single_flight.stats.coalesced == 0
+
+    @pytest.mark.asyncio_cooperative
+    async def test_exception_is_shared(self) -> None:
+        single_flight: SingleFlight[str] = SingleFlight()
+
+        async def fetch() -> str:
+            await asyncio.sleep(0.01)
+            raise ValueError("upstream down")
+
+        results: list[str | BaseException] = await asyncio.gather(
+            *(single_flight.do("tea", fetch) for _ in range(3)),
+            return_exceptions=True,
+        )
+        assert all(isinstance(result, ValueError) for result in results)
+        assert len(single_flight) == 0
+
+    @pytest.mark.asyncio_cooperative
+    async def test_cancelled_caller_does_not_cancel_fetch(self) -> None:
+        single_flight: SingleFlight[str] = SingleFlight()
+
+        async def fetch() -> str:
+            await asyncio.sleep(0.02)
+            return "tea html"
+
+        first: asyncio.Task[str] = asyncio.ensure_future(single_flight.do("tea", fetch))
+        second: asyncio.Task[str] = asyncio.ensure_future(
+            single_flight.do("tea", fetch)
+        )
+        await asyncio.sleep(0)
+        first.cancel()
+        assert await second == "tea html"
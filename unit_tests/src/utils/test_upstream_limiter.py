@@ -0,0 +1,101 @@
+import asyncio
+import time
+
+import pytest
+
+from src.utils.upstream_limiter import (
+    UpstreamLimiter,
+    UpstreamLimiterConfig,
+    UpstreamQueueTimeout,
+)
+
+
+class TestUpstreamLimiter:
+    @pytest.mark.asyncio_cooperative
+    async def test_caps_concurrency(self) -> None:
+        limiter: UpstreamLimiter = UpstreamLimiter(
+            UpstreamLimiterConfig(max_concurrency=2, rate_per_second=0)
+        )
+        most_in_flight: int = 0
+
+        async def fetch() -> None:
+            nonlocal most_in_flight
+            async with limiter.acquire():
+                most_in_flight = max(most_in_flight, limiter.stats.in_flight)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*(fetch() for _ in range(6)))
+        assert most_in_flight == 2
+        assert limiter.stats.acquired == 6
+        assert limiter.stats.in_flight == 0
+
+    @pytest.mark.asyncio_cooperative
+    async def test_rate_limits_starts(self) -> None:
+        # a burst of 2, then one every 20ms
+        limiter: UpstreamLimiter = UpstreamLimiter(
+            UpstreamLimiterConfig(rate_per_second=50, burst=2, adaptive=False)
+        )
+        start: float = time.monotonic()
+
+        async def fetch() -> None:
+            async with limiter.acquire():
+                pass
+
+        await asyncio.gather(*(fetch() for _ in range(5)))
+        assert time.monotonic() - start >= 0.05
+        assert limiter.stats.queue_wait_seconds > 0
+
+    @pytest.mark.asyncio_cooperative
+    async def test_queue_timeout(self) -> None:
+        limiter: UpstreamLimiter = UpstreamLimiter(
+            UpstreamLimiterConfig(
+                max_concurrency=1, rate_per_second=0, max_queue_wait_seconds=0.01
+            )
+        )
+        async with limiter.acquire():
+            with pytest.raises(UpstreamQueueTimeout):
+                async with limiter.acquire():
+                    pass
+        assert limiter.stats.queue_timeouts == 1
+        assert limiter.stats.waiting == 0
+        # the slot was given back; the next caller gets it
+        async with limiter.acquire():
+            assert limiter.stats.in_flight == 1
+
+    @staticmethod
+    def test_aimd() -> None:
+        limiter: UpstreamLimiter = UpstreamLimiter(
+            UpstreamLimiterConfig(
+                rate_per_second=10,
+                min_rate_per_second=2,
+                cooldown_seconds=60,
+                increase_interval_seconds=0,
+            )
+        )
+        limiter.on_response(429)
+        assert limiter.stats.rate_per_second == 5
+        # within the cooldown, more 429s are the same signal; and no increase
+        limiter.on_response(503)
+        limiter.on_response(200)
+        assert limiter.stats.rate_per_second == 5
+        assert limiter.stats.throttled == 2
+        assert limiter.stats.rate_decreases == 1
+
+    @staticmethod
+    def test_aimd_ramps_back_up() -> None:
+        limiter: UpstreamLimiter = UpstreamLimiter(
+            UpstreamLimiterConfig(
+                rate_per_second=4,
+                min_rate_per_second=1,
+                cooldown_seconds=0,
+                increase_interval_seconds=0,
+            )
+        )
+        for _ in range(3):
+            limiter.on_response(500)
+        assert limiter.stats.rate_per_second == 1
+        for _ in range(5):
+            limiter.on_response(200)
+        # back up by one per interval, and never above rate_per_second
+        assert limiter.stats.rate_per_second == 4
+        assert limiter.stats.rate_increases == 3